@@ -1,4 +1,63 @@
+import gc
+import os
+
 bind = "0.0.0.0:" + os.environ.get("PORT", "5000")
-workers = 2
-threads = 2
+
+
+def _dimensionar(nome, padrao, automatico):
+    # "auto" dimensiona pelo número de CPUs da máquina
+    valor = os.environ.get(nome, str(padrao))
+    return automatico(os.cpu_count() or 1) if valor == "auto" else int(valor)
+
+
+# GUNICORN_WORKERS=auto usa a recomendação do gunicorn (2 x CPUs + 1);
+# GUNICORN_THREADS=auto, uma thread por CPU (mínimo 2)
+workers = _dimensionar("GUNICORN_WORKERS", 2, lambda cpus: 2 * cpus + 1)
+threads = _dimensionar("GUNICORN_THREADS", 2, lambda cpus: max(cpus, 2))
 timeout = 60
+
+# Com preload, o processo mestre importa a aplicação e carrega os dados de
+# referência uma vez; os workers compartilham essa memória por copy-on-write.
+# Desative (GUNICORN_PRELOAD=false) para recarregar o código com HUP.
+preload_app = os.environ.get("GUNICORN_PRELOAD", "true").lower() == "true"
+
+if preload_app:
+    # Sem coletas no mestre durante a carga (até on_starting), os objetos
+    # carregados não são movidos nem têm os cabeçalhos do gc alterados
+    gc.disable()
+
+
+def on_starting(server):
+    if not server.cfg.preload_app:
+        return
+
+    # Aplicação já criada pelo preload (src.main:create_app())
+    from src.main import aquecer
+    aquecer(server.app.wsgi())
+
+    # Objetos do mestre ficam fora das coletas dos workers, que de outro
+    # modo copiariam as páginas ao percorrê-los
+    gc.freeze()
+
+    # Congelados os objetos carregados, o gc volta a valer no mestre (que
+    # vive todo o serviço) e nos workers, que o herdam já habilitado
+    gc.enable()
+
+
+def post_fork(server, worker):
+    if not server.cfg.preload_app:
+        return
+
+    # Pools novos no worker; as conexões do mestre não são reaproveitadas
+    from src.config.banco import descartar_conexoes
+    descartar_conexoes(server.app.wsgi(), fechar=False)
+
+
+def worker_exit(server, worker):
+    # Drena os logs de acesso ainda enfileirados antes de o worker terminar
+    from src.services.registro_acessos import encerrar_registros_acessos
+    encerrar_registros_acessos()
+    
+    # Fecha as conexões SMTP mantidas pelo entregador de emails
+    from src.services.entrega_email import encerrar_entregador
+    encerrar_entregador()
@@ -0,0 +1,75 @@
+"""
+Configuração do engine do banco de dados.
+
+Para SQLite, cada nova conexão recebe os PRAGMAs abaixo: WAL permite leituras
+concorrentes com um escritor, e o busy_timeout faz os escritores aguardarem a
+vez em vez de falharem com "database is locked" (gunicorn roda vários workers
+e threads sobre o mesmo arquivo). Para outros bancos são usadas as opções de
+pool de src/config/production.py.
+"""
+
+import os
+from sqlalchemy import event
+from src.models.mobilizacao import db
+
+
+def _config(app, nome, padrao):
+    return app.config.get(nome, os.environ.get(nome, padrao))
+
+
+def pragmas_sqlite(app):
+    """
+    Retorna os PRAGMAs aplicados a cada conexão SQLite, na ordem de execução.
+    """
+    return [
+        ('journal_mode', 'WAL'),
+        ('synchronous', 'NORMAL'),
+        ('busy_timeout', int(_config(app, 'SQLITE_BUSY_TIMEOUT_MS', 15000))),
+        # Valor negativo: tamanho em KiB
+        ('cache_size', -int(_config(app, 'SQLITE_CACHE_KB', 20000))),
+        ('mmap_size', int(_config(app, 'SQLITE_MMAP_BYTES', 256 * 1024 * 1024))),
+        ('temp_store', 'MEMORY')
+    ]
+
+
+def configurar_banco(app):
+    """
+    Define as opções do engine conforme o tipo de banco e inicializa o
+    SQLAlchemy na aplicação (substitui a chamada direta a db.init_app).
+    """
+    uri = app.config.get('SQLALCHEMY_DATABASE_URI', '')
+    sqlite = uri.startswith('sqlite')
+
+    if not sqlite:
+        from src.config import production
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+            **production.SQLALCHEMY_ENGINE_OPTIONS,
+            **app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {})
+        }
+
+    db.init_app(app)
+
+    if sqlite:
+        pragmas = pragmas_sqlite(app)
+
+        with app.app_context():
+            engine = db.engine
+
+        @event.listens_for(engine, 'connect')
+        def aplicar_pragmas(conexao_dbapi, registro):
+            cursor = conexao_dbapi.cursor()
+            for nome, valor in pragmas:
+                cursor.execute(f"PRAGMA {nome}={valor}")
+            cursor.close()
+
+
+def descartar_conexoes(app, fechar=True):
+    """
+    Descarta os pools de conexões da aplicação; novas conexões são abertas
+    sob demanda. Em um worker recém-criado por fork, use fechar=False: as
+    conexões herdadas pertencem ao processo pai e não devem ser fechadas
+    pelo filho, apenas abandonadas.
+    """
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=fechar)
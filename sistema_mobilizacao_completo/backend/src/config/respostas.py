@@ -0,0 +1,134 @@
+"""
+Serialização JSON e compressão das respostas da aplicação.
+
+O JSON das respostas (jsonify) é gerado pelo serializador escolhido em
+JSON_SERIALIZADOR: 'orjson' (padrão, quando o pacote está instalado) ou
+'stdlib' (json da biblioteca padrão, o provedor padrão do Flask). As
+respostas comprimíveis acima de COMPRESSAO_MIN_BYTES são comprimidas com
+brotli (se o pacote estiver instalado) ou gzip, conforme o Accept-Encoding
+do cliente. Com COMPRESSAO=false a compressão fica a cargo do proxy.
+"""
+
+import gzip
+import os
+from flask import request
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Tipos de conteúdo comprimidos (arquivos estáticos são enviados sem alteração)
+_MIMETYPES_COMPRIMIVEIS = {'application/json', 'application/javascript', 'text/html', 'text/css', 'text/plain'}
+
+
+def _config(app, nome, padrao):
+    return app.config.get(nome, os.environ.get(nome, padrao))
+
+
+class ProvedorJSONOrjson(DefaultJSONProvider):
+    """
+    Provedor JSON com orjson, com a mesma saída do provedor padrão do Flask
+    (chaves ordenadas; datas, Decimal e UUID pelo mesmo default), exceto que
+    o texto não ASCII é gravado em UTF-8 em vez de sequências \\uXXXX.
+    Chamadas com argumentos do json (ex: indent) usam a biblioteca padrão.
+    """
+
+    def _opcoes(self):
+        opcoes = orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            opcoes |= orjson.OPT_INDENT_2
+        return opcoes
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=self._opcoes()).decode()
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        dados = orjson.dumps(obj, default=self.default, option=self._opcoes() | orjson.OPT_APPEND_NEWLINE)
+        return self._app.response_class(dados, mimetype=self.mimetype)
+
+
+# Serializadores disponíveis para JSON_SERIALIZADOR
+SERIALIZADORES = {'stdlib': DefaultJSONProvider}
+if orjson is not None:
+    SERIALIZADORES['orjson'] = ProvedorJSONOrjson
+
+
+def codificadores(app):
+    """
+    Retorna as codificações de compressão suportadas, em ordem de preferência:
+    lista de (nome do Content-Encoding, função bytes -> bytes).
+    """
+    nivel_gzip = int(_config(app, 'COMPRESSAO_NIVEL_GZIP', 6))
+    lista = [('gzip', lambda dados: gzip.compress(dados, compresslevel=nivel_gzip, mtime=0))]
+
+    if brotli is not None:
+        qualidade = int(_config(app, 'COMPRESSAO_QUALIDADE_BROTLI', 4))
+        lista.insert(0, ('br', lambda dados: brotli.compress(dados, quality=qualidade)))
+
+    return lista
+
+
+def escolher_codificacao(aceitas, disponiveis):
+    """
+    Escolhe a codificação preferida pelo cliente (maior qualidade no
+    Accept-Encoding) entre as disponíveis; em empate, a ordem de disponiveis.
+
+    Returns:
+        (nome, função) ou None se o cliente não aceitar nenhuma
+    """
+    escolhida, melhor = None, 0
+    for nome, comprimir in disponiveis:
+        qualidade = aceitas[nome]
+        if qualidade > melhor:
+            escolhida, melhor = (nome, comprimir), qualidade
+    return escolhida
+
+
+def configurar_respostas(app):
+    """
+    Define o serializador JSON da aplicação e registra a compressão das
+    respostas para todos os blueprints.
+    """
+    nome = _config(app, 'JSON_SERIALIZADOR', 'orjson' if orjson is not None else 'stdlib')
+    if nome not in SERIALIZADORES:
+        raise ValueError(f"JSON_SERIALIZADOR inválido ou não instalado: {nome}")
+    app.json = SERIALIZADORES[nome](app)
+
+    if str(_config(app, 'COMPRESSAO', 'true')).lower() == 'false':
+        return
+
+    minimo = int(_config(app, 'COMPRESSAO_MIN_BYTES', 1024))
+    disponiveis = codificadores(app)
+
+    @app.after_request
+    def comprimir_resposta(response):
+        if (response.status_code != 200 or response.direct_passthrough or response.is_streamed
+                or 'Content-Encoding' in response.headers
+                or response.mimetype not in _MIMETYPES_COMPRIMIVEIS):
+            return response
+
+        dados = response.get_data()
+        if len(dados) < minimo:
+            return response
+
+        # Acima do limite, a resposta depende do Accept-Encoding
+        response.vary.add('Accept-Encoding')
+
+        codificacao = escolher_codificacao(request.accept_encodings, disponiveis)
+        if codificacao is None:
+            return response
+
+        nome, comprimir = codificacao
+        response.set_data(comprimir(dados))
+        response.headers['Content-Encoding'] = nome
+        return response
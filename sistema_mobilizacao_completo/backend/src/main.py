@@ -3,63 +3,166 @@ import sys
 # DON'T CHANGE THIS !!!
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
+import logging
+from importlib import import_module
+
 from flask import Flask, send_from_directory
 from flask_cors import CORS
 from src.models.mobilizacao import db
-from src.routes.auth import auth_bp
-from src.routes.cards import cards_bp
-from src.routes.etapas import etapas_bp
-from src.routes.usuarios import usuarios_bp
-from src.routes.dashboard import dashboard_bp
-from src.routes.permissoes import permissoes_bp
-from src.routes.notificacoes import notificacoes_bp
-
-app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
-app.config['SECRET_KEY'] = 'asdf#FGSgvasgf$5$WGT'
-
-# Habilitar CORS para todas as rotas
-CORS(app, origins="*")
-
-# Registrar blueprints
-app.register_blueprint(auth_bp, url_prefix='/api/auth')
-app.register_blueprint(cards_bp, url_prefix='/api/cards')
-app.register_blueprint(etapas_bp, url_prefix='/api/etapas')
-app.register_blueprint(usuarios_bp, url_prefix='/api/usuarios')
-app.register_blueprint(dashboard_bp, url_prefix='/api/dashboard')
-app.register_blueprint(permissoes_bp, url_prefix='/api/permissoes')
-app.register_blueprint(notificacoes_bp, url_prefix='/api/notificacoes')
-
-# Configuração do banco de dados
-app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-db.init_app(app)
-
-with app.app_context():
-    db.create_all()
-    # Criar dados iniciais se necessário
-    from src.utils.seed_data import criar_dados_iniciais
-    criar_dados_iniciais()
-    
-    # Inicializar permissões
-    from src.utils.init_permissoes import inicializar_permissoes
-    inicializar_permissoes()
-
-@app.route('/', defaults={'path': ''})
-@app.route('/<path:path>')
-def serve(path):
-    static_folder_path = app.static_folder
-    if static_folder_path is None:
+from src.config.banco import configurar_banco
+from src.config.respostas import configurar_respostas
+
+# Blueprints da API: (módulo, atributo, prefixo). Os módulos de rotas são
+# importados apenas por create_app, não ao importar este arquivo; este módulo
+# não cria nenhuma aplicação (gunicorn usa a fábrica "src.main:create_app()").
+BLUEPRINTS = [
+    ('src.routes.auth', 'auth_bp', '/api/auth'),
+    ('src.routes.cards', 'cards_bp', '/api/cards'),
+    ('src.routes.etapas', 'etapas_bp', '/api/etapas'),
+    ('src.routes.usuarios', 'usuarios_bp', '/api/usuarios'),
+    ('src.routes.dashboard', 'dashboard_bp', '/api/dashboard'),
+    ('src.routes.permissoes', 'permissoes_bp', '/api/permissoes'),
+    ('src.routes.notificacoes', 'notificacoes_bp', '/api/notificacoes'),
+]
+
+
+def registrar_blueprints(app):
+    for modulo, atributo, prefixo in BLUEPRINTS:
+        app.register_blueprint(getattr(import_module(modulo), atributo), url_prefix=prefixo)
+
+
+def create_app(config=None):
+    """
+    Cria a aplicação sem acessar o banco: o esquema, os dados iniciais e as
+    permissões ficam a cargo de bootstrap (comando `flask bootstrap`).
+
+    Args:
+        config: Dict com configurações que sobrescrevem as padrão
+    """
+    app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
+    app.config['SECRET_KEY'] = 'asdf#FGSgvasgf$5$WGT'
+
+    # Configuração do banco de dados
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get(
+        'DATABASE_URL',
+        f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
+    )
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config.update(config or {})
+
+    # Habilitar CORS para todas as rotas
+    CORS(app, origins="*")
+
+    registrar_blueprints(app)
+    configurar_banco(app)
+    # Serializador JSON e compressão das respostas de todos os blueprints
+    configurar_respostas(app)
+
+    # Gravação dos logs de acesso em lote, fora do caminho da requisição
+    from src.services.registro_acessos import iniciar_registro_acessos
+    iniciar_registro_acessos(app)
+
+    @app.route('/', defaults={'path': ''})
+    @app.route('/<path:path>')
+    def serve(path):
+        static_folder_path = app.static_folder
+        if static_folder_path is None:
             return "Static folder not configured", 404
 
-    if path != "" and os.path.exists(os.path.join(static_folder_path, path)):
-        return send_from_directory(static_folder_path, path)
-    else:
-        index_path = os.path.join(static_folder_path, 'index.html')
-        if os.path.exists(index_path):
-            return send_from_directory(static_folder_path, 'index.html')
+        if path != "" and os.path.exists(os.path.join(static_folder_path, path)):
+            return send_from_directory(static_folder_path, path)
         else:
-            return "index.html not found", 404
+            index_path = os.path.join(static_folder_path, 'index.html')
+            if os.path.exists(index_path):
+                return send_from_directory(static_folder_path, 'index.html')
+            else:
+                return "index.html not found", 404
+
+    @app.cli.command('bootstrap')
+    def comando_bootstrap():
+        """Cria o esquema, aplica as migrações e os dados iniciais."""
+        bootstrap(app)
+
+    return app
+
+
+def bootstrap(app, popular=True):
+    """
+    Prepara o banco da aplicação. Executar uma vez por deploy, antes de
+    iniciar os workers.
+
+    Args:
+        popular: Cria também os dados iniciais e as permissões padrão
+    """
+    with app.app_context():
+        db.create_all()
+
+        # Aplicar índices novos a bancos criados por versões anteriores
+        from src.utils.migracoes import migrar
+        migrar()
+
+        if not popular:
+            return
+
+        # Criar dados iniciais se necessário
+        from src.utils.seed_data import criar_dados_iniciais
+        criar_dados_iniciais()
+
+        # Inicializar permissões
+        from src.utils.init_permissoes import inicializar_permissoes
+        inicializar_permissoes()
+
+        # Corrigir eventuais divergências dos contadores do dashboard
+        from src.services.contadores_service import ContadoresService
+        ContadoresService.reconciliar()
+
+        # Workers já em execução recarregam o snapshot das etapas e as
+        # permissões; os ETags emitidos antes do bootstrap deixam de valer
+        from src.services.etapas_service import EtapasService
+        from src.utils.versoes import incrementar_versao
+        EtapasService.registrar_alteracao()
+        incrementar_versao('permissoes')
+        db.session.commit()
+
+
+def aquecer(app):
+    """
+    Prepara o processo mestre do gunicorn com preload_app, antes do fork dos
+    workers: configura os mappers e carrega em cache os dados de referência
+    (snapshot das etapas, usuários ativos e as suas permissões), que
+    os workers herdam por copy-on-write. As conexões abertas são fechadas,
+    pois não podem ser compartilhadas entre processos.
+    """
+    from sqlalchemy.orm import configure_mappers
+    from src.config.banco import descartar_conexoes
+    from src.models.mobilizacao import Usuario
+    from src.models.permissoes import obter_permissoes, obter_usuario_autenticado
+    from src.services.etapas_service import EtapasService
+    from src.utils.versoes import obter_versoes
+
+    configure_mappers()
+
+    try:
+        with app.app_context():
+            # Versões herdadas pelos workers: a primeira leitura delas em um
+            # worker não descarta os caches abaixo
+            obter_versoes(('etapas', 'permissoes', 'notificacoes'))
+            EtapasService.snapshot()
+
+            limite = int(os.environ.get('PRELOAD_USUARIOS_MAX', 1000))
+            for usuario_id, in db.session.query(Usuario.id).filter_by(ativo=True).order_by(Usuario.id).limit(limite):
+                obter_usuario_autenticado(usuario_id)
+                obter_permissoes(usuario_id)
+    except Exception as e:
+        # Banco ainda sem bootstrap: os workers carregam os dados sob demanda
+        logging.getLogger(__name__).warning(f"Dados de referência não carregados no preload: {str(e)}")
+    finally:
+        with app.app_context():
+            db.session.remove()
+        descartar_conexoes(app)
 
 
 if __name__ == '__main__':
+    app = create_app()
+    bootstrap(app)
     app.run(host='0.0.0.0', port=5000, debug=True)
@@ -2,6 +2,7 @@ from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime, timedelta
 from werkzeug.security import generate_password_hash, check_password_hash
 import re
+import json
 
 db = SQLAlchemy()
 
@@ -149,6 +150,14 @@ class ChecklistEtapa(db.Model):
 
 class CardMobilizacao(db.Model):
     __tablename__ = 'cards_mobilizacao'
+    __table_args__ = (
+        db.Index('ix_cards_etapa_status', 'etapa_atual_id', 'status_etapa'),
+        db.Index('ix_cards_status_prazo', 'status_etapa', 'prazo_etapa'),
+        db.Index('ix_cards_prazo', 'prazo_etapa'),
+        db.Index('ix_cards_responsavel', 'responsavel_atual'),
+        db.Index('ix_cards_ultima_atualizacao', 'ultima_atualizacao'),
+        db.Index('ix_cards_data_criacao', 'data_criacao', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     nome_colaborador = db.Column(db.String(100), nullable=False)
@@ -180,10 +189,12 @@ class CardMobilizacao(db.Model):
         self.calcular_prazo_etapa()
         self.criar_checklist_inicial()
     
-    def calcular_prazo_etapa(self):
-        if self.etapa_atual:
-            self.prazo_etapa = self.data_entrada_etapa + timedelta(days=self.etapa_atual.prazo_dias)
-            self.responsavel_atual = self.etapa_atual.dono_email
+    def calcular_prazo_etapa(self, etapa=None):
+        # etapa: EtapaProcesso ou EtapaSnapshot; por padrão, a etapa atual
+        etapa = etapa or self.etapa_atual
+        if etapa:
+            self.prazo_etapa = self.data_entrada_etapa + timedelta(days=etapa.prazo_dias)
+            self.responsavel_atual = etapa.dono_email
     
     def criar_checklist_inicial(self):
         if self.etapa_atual and not self.checklist_items:
@@ -196,7 +207,7 @@ class CardMobilizacao(db.Model):
                     )
                     self.checklist_items.append(checklist_card)
     
-    def mover_para_etapa(self, nova_etapa_id, usuario_id, motivo=None):
+    def mover_para_etapa(self, nova_etapa_id, usuario_id, motivo=None, etapa=None):
         etapa_anterior = self.etapa_atual_id
         self.etapa_atual_id = nova_etapa_id
         self.status_etapa = 'NAO_INICIADO'
@@ -205,7 +216,7 @@ class CardMobilizacao(db.Model):
         self.ultima_atualizacao = datetime.utcnow()
         
         # Recalcular prazo
-        self.calcular_prazo_etapa()
+        self.calcular_prazo_etapa(etapa)
         
         # Registrar no histórico
         historico = HistoricoMovimentacao(
@@ -218,15 +229,16 @@ class CardMobilizacao(db.Model):
         self.historico.append(historico)
         
         # Criar novo checklist
-        self.criar_checklist_para_nova_etapa()
+        self.criar_checklist_para_nova_etapa(etapa)
     
-    def criar_checklist_para_nova_etapa(self):
+    def criar_checklist_para_nova_etapa(self, etapa=None):
         # Remove checklist da etapa anterior
         ChecklistCard.query.filter_by(card_id=self.id).delete()
         
         # Cria checklist para nova etapa
-        if self.etapa_atual:
-            for item_etapa in self.etapa_atual.checklist_items:
+        etapa = etapa or self.etapa_atual
+        if etapa:
+            for item_etapa in etapa.checklist_items:
                 if item_etapa.ativo:
                     checklist_card = ChecklistCard(
                         card_id=self.id,
@@ -250,6 +262,10 @@ class CardMobilizacao(db.Model):
     def get_progresso_checklist(self):
         total = len(self.checklist_items)
         concluidos = len([item for item in self.checklist_items if item.concluido])
+        return CardMobilizacao.calcular_progresso(total, concluidos)
+    
+    @staticmethod
+    def calcular_progresso(total, concluidos):
         percentual = (concluidos / total * 100) if total > 0 else 0
         
         return {
@@ -272,7 +288,7 @@ class CardMobilizacao(db.Model):
             'salario': float(self.salario) if self.salario else None,
             'centro_custo': self.centro_custo,
             'data_admissao': self.data_admissao.isoformat() if self.data_admissao else None,
-            'etapa_atual': self.etapa_atual.to_dict() if self.etapa_atual else None,
+            'etapa_atual': self._etapa_atual_dict(),
             'status_etapa': self.status_etapa,
             'data_entrada_etapa': self.data_entrada_etapa.isoformat() if self.data_entrada_etapa else None,
             'prazo_etapa': self.prazo_etapa.isoformat() if self.prazo_etapa else None,
@@ -290,9 +306,40 @@ class CardMobilizacao(db.Model):
             })
         
         return base_dict
+    
+    def _etapa_atual_dict(self):
+        # Etapa do snapshot em memória (sem consultar etapas, grupos e checklist)
+        from src.services.etapas_service import EtapasService
+        etapa = EtapasService.snapshot().obter(self.etapa_atual_id)
+        return etapa.to_dict() if etapa else None
+    
+    def to_dict_listagem(self, nome_etapa, progresso_checklist):
+        # Versão enxuta para listagens: a etapa completa é enviada uma única
+        # vez na resposta e o progresso do checklist é calculado em lote
+        return {
+            'id': self.id,
+            'nome_colaborador': self.nome_colaborador,
+            'cpf': self.cpf,
+            'cargo': self.cargo,
+            'salario': float(self.salario) if self.salario else None,
+            'centro_custo': self.centro_custo,
+            'data_admissao': self.data_admissao.isoformat() if self.data_admissao else None,
+            'etapa_atual': {'id': self.etapa_atual_id, 'nome': nome_etapa},
+            'status_etapa': self.status_etapa,
+            'data_entrada_etapa': self.data_entrada_etapa.isoformat() if self.data_entrada_etapa else None,
+            'prazo_etapa': self.prazo_etapa.isoformat() if self.prazo_etapa else None,
+            'responsavel_atual': self.responsavel_atual,
+            'status_prazo': self.get_status_prazo(),
+            'checklist_progresso': progresso_checklist,
+            'observacoes': self.observacoes,
+            'data_criacao': self.data_criacao.isoformat() if self.data_criacao else None
+        }
 
 class ChecklistCard(db.Model):
     __tablename__ = 'checklist_card'
+    __table_args__ = (
+        db.Index('ix_checklist_card_card', 'card_id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     card_id = db.Column(db.Integer, db.ForeignKey('cards_mobilizacao.id'), nullable=False)
@@ -321,6 +368,11 @@ class ChecklistCard(db.Model):
 
 class HistoricoMovimentacao(db.Model):
     __tablename__ = 'historico_movimentacao'
+    __table_args__ = (
+        db.Index('ix_historico_origem_data', 'etapa_origem_id', 'data_movimentacao'),
+        db.Index('ix_historico_destino_data', 'etapa_destino_id', 'data_movimentacao'),
+        db.Index('ix_historico_card', 'card_id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     card_id = db.Column(db.Integer, db.ForeignKey('cards_mobilizacao.id'), nullable=False)
@@ -352,8 +404,29 @@ class HistoricoMovimentacao(db.Model):
             'status_destino': self.status_destino
         }
 
+class DashboardContador(db.Model):
+    __tablename__ = 'dashboard_contadores'
+    __table_args__ = (
+        db.UniqueConstraint('etapa_id', 'status_etapa', 'centro_custo', name='uq_dashboard_contador'),
+    )
+    
+    # Contagem materializada de cards por etapa x status x centro de custo,
+    # mantida pelas rotas de cards e recalculada pela reconciliação periódica.
+    # Status e centro de custo nulos são armazenados como ''.
+    id = db.Column(db.Integer, primary_key=True)
+    etapa_id = db.Column(db.Integer, db.ForeignKey('etapas_processo.id'), nullable=False)
+    status_etapa = db.Column(db.String(20), nullable=False, default='')
+    centro_custo = db.Column(db.String(50), nullable=False, default='')
+    total = db.Column(db.Integer, nullable=False, default=0)
+
 class Notificacao(db.Model):
     __tablename__ = 'notificacoes'
+    __table_args__ = (
+        db.Index('ix_notificacoes_destinatario', 'destinatario_email', 'lido', 'data_criacao'),
+        db.Index('ix_notificacoes_tipo_card', 'tipo', 'card_id', 'data_criacao'),
+        db.Index('ix_notificacoes_fila', 'enviado', 'proxima_tentativa'),
+        db.Index('ux_notificacoes_alerta', 'card_id', 'tipo', 'janela', unique=True),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     tipo = db.Column(db.String(50), nullable=False)
@@ -370,6 +443,17 @@ class Notificacao(db.Model):
     tentativas_envio = db.Column(db.Integer, default=0)
     erro_envio = db.Column(db.Text)
     
+    # Fila de envio (outbox): o worker reserva a notificação até lease_ate e,
+    # após uma falha, ela volta à fila a partir de proxima_tentativa
+    lease_dono = db.Column(db.String(100))
+    lease_ate = db.Column(db.DateTime)
+    proxima_tentativa = db.Column(db.DateTime)
+    
+    # Dia (UTC) de criação dos alertas periódicos (prazos, inatividade e
+    # checklist): o índice único impede que verificações concorrentes gravem
+    # o mesmo alerta duas vezes no dia. Nulo nas demais notificações
+    janela = db.Column(db.Date)
+    
     # Relacionamentos
     card = db.relationship('CardMobilizacao')
     etapa = db.relationship('EtapaProcesso')
@@ -386,3 +470,59 @@ class Notificacao(db.Model):
             'data_leitura': self.data_leitura.isoformat() if self.data_leitura else None
         }
 
+
+class ExecucaoAgendador(db.Model):
+    __tablename__ = 'execucoes_agendador'
+    
+    # Uma linha por tarefa do agendador de notificações: a instância que
+    # reserva a tarefa (lease) é a única a executá-la até lease_ate, e a
+    # próxima execução é compartilhada entre todas as instâncias
+    tarefa = db.Column(db.String(50), primary_key=True)
+    lease_dono = db.Column(db.String(100))
+    lease_ate = db.Column(db.DateTime)
+    proxima_execucao = db.Column(db.DateTime)
+    inicio_ultima_execucao = db.Column(db.DateTime)
+    fim_ultima_execucao = db.Column(db.DateTime)
+    duracao_ultima_execucao = db.Column(db.Float)
+    resultado_ultima_execucao = db.Column(db.Text)
+    erro_ultima_execucao = db.Column(db.Text)
+    execucoes = db.Column(db.Integer, nullable=False, default=0)
+    
+    def to_dict(self):
+        return {
+            'tarefa': self.tarefa,
+            'em_execucao': self.lease_ate is not None and self.lease_ate > datetime.utcnow(),
+            'proxima_execucao': self.proxima_execucao.isoformat() if self.proxima_execucao else None,
+            'inicio_ultima_execucao': self.inicio_ultima_execucao.isoformat() if self.inicio_ultima_execucao else None,
+            'fim_ultima_execucao': self.fim_ultima_execucao.isoformat() if self.fim_ultima_execucao else None,
+            'duracao_ultima_execucao': self.duracao_ultima_execucao,
+            'resultado_ultima_execucao': json.loads(self.resultado_ultima_execucao) if self.resultado_ultima_execucao else None,
+            'erro_ultima_execucao': self.erro_ultima_execucao,
+            'execucoes': self.execucoes
+        }
+
+class MarcaVerificacao(db.Model):
+    __tablename__ = 'marcas_verificacao'
+    
+    # Marca d'água das verificações incrementais: momento até o qual a
+    # verificação já considerou as mudanças (ex: prazos que venceram)
+    nome = db.Column(db.String(50), primary_key=True)
+    valor = db.Column(db.DateTime, nullable=False)
+
+class RevogacaoToken(db.Model):
+    __tablename__ = 'revogacoes_token'
+    
+    # Tokens JWT encerrados por /logout, identificados pelo sha256 do token
+    # e mantidos até a sua expiração
+    digest = db.Column(db.String(64), primary_key=True)
+    usuario_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'))
+    expira_em = db.Column(db.DateTime, nullable=False)
+    data_revogacao = db.Column(db.DateTime, default=datetime.utcnow)
+
+class VersaoDados(db.Model):
+    __tablename__ = 'versoes_dados'
+    
+    # Versão dos dados de referência mantidos em memória pelos processos
+    # (ex: etapas): cada alteração incrementa a versão na própria transação
+    nome = db.Column(db.String(50), primary_key=True)
+    versao = db.Column(db.Integer, nullable=False, default=0)
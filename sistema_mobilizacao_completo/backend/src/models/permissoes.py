@@ -1,6 +1,12 @@
-from src.models.mobilizacao import db, Usuario, Grupo
+from flask import current_app, has_app_context
+from sqlalchemy import select, literal, null, union_all
+from src.models.mobilizacao import db, Usuario, Grupo, usuario_grupo
+from src.utils.cache import CacheTTL
+from src.utils.versoes import ao_alterar
 from datetime import datetime
 from enum import Enum
+import threading
+import os
 
 class TipoPermissao(Enum):
     VISUALIZAR = 'visualizar'
@@ -102,6 +108,9 @@ class PermissaoEspecial(db.Model):
 
 class LogAcesso(db.Model):
     __tablename__ = 'log_acessos'
+    __table_args__ = (
+        db.Index('ix_log_acessos_data', 'data_acesso', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     usuario_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'))
@@ -130,6 +139,248 @@ class LogAcesso(db.Model):
             'detalhes': self.detalhes
         }
 
+# Permissões compiladas por usuário, mantidas em cache no processo.
+# O TTL limita o tempo em que outro worker pode ver um snapshot desatualizado.
+_cache_permissoes = CacheTTL(int(os.environ.get('PERMISSOES_CACHE_TTL', 60)))
+_versao_permissoes = {'global': 0}
+# Usuários autenticados, para o token_required
+_cache_usuarios = CacheTTL(int(os.environ.get('AUTENTICACAO_CACHE_TTL', 30)))
+_lock_versao = threading.Lock()
+
+class PermissoesCompiladas:
+    """
+    Snapshot imutável das permissões efetivas de um usuário.
+    
+    Attributes:
+        admin: True se o usuário pertence ao grupo Administrador
+        grupo: frozenset de (tipo, recurso) concedidos pelos grupos
+        concessoes: frozenset de (tipo, recurso, recurso_id) concedidos por permissões especiais
+        negacoes: frozenset de (tipo, recurso, recurso_id) negados por permissões especiais
+    """
+    __slots__ = ('admin', 'grupo', 'concessoes', 'negacoes')
+    
+    def __init__(self, admin, grupo, concessoes, negacoes):
+        self.admin = admin
+        self.grupo = frozenset(grupo)
+        self.concessoes = frozenset(concessoes)
+        self.negacoes = frozenset(negacoes)
+    
+    def permite(self, tipo, recurso, recurso_id=None):
+        if self.admin:
+            return True
+        
+        # Permissões especiais para o mesmo recurso_id têm precedência (negações primeiro)
+        chave = (tipo, recurso, recurso_id)
+        if chave in self.negacoes:
+            return False
+        if chave in self.concessoes:
+            return True
+        
+        return (tipo, recurso) in self.grupo
+    
+    def listar(self):
+        return self.grupo | {(tipo, recurso) for tipo, recurso, _ in self.concessoes}
+
+def compilar_permissoes(usuario_id):
+    """
+    Monta as permissões efetivas de um usuário com uma única consulta.
+    """
+    consulta_admin = select(
+        literal('admin').label('origem'),
+        null().label('tipo'),
+        null().label('recurso'),
+        null().label('recurso_id'),
+        literal(True).label('concedido')
+    ).select_from(
+        usuario_grupo.join(Grupo, Grupo.id == usuario_grupo.c.grupo_id)
+    ).where(
+        usuario_grupo.c.usuario_id == usuario_id,
+        Grupo.nome == 'Administrador'
+    )
+    
+    consulta_grupos = select(
+        literal('grupo'),
+        Permissao.tipo,
+        Permissao.recurso,
+        null(),
+        literal(True)
+    ).select_from(
+        Permissao.__table__
+        .join(permissao_grupo, permissao_grupo.c.permissao_id == Permissao.id)
+        .join(usuario_grupo, usuario_grupo.c.grupo_id == permissao_grupo.c.grupo_id)
+    ).where(
+        usuario_grupo.c.usuario_id == usuario_id,
+        Permissao.ativo == True
+    )
+    
+    consulta_especiais = select(
+        literal('especial'),
+        PermissaoEspecial.tipo,
+        PermissaoEspecial.recurso,
+        PermissaoEspecial.recurso_id,
+        PermissaoEspecial.concedido
+    ).where(
+        PermissaoEspecial.usuario_id == usuario_id
+    )
+    
+    admin = False
+    grupo, concessoes, negacoes = set(), set(), set()
+    
+    for origem, tipo, recurso, recurso_id, concedido in db.session.execute(
+        union_all(consulta_admin, consulta_grupos, consulta_especiais)
+    ):
+        if origem == 'admin':
+            admin = True
+        elif origem == 'grupo':
+            grupo.add((tipo, recurso))
+        elif concedido:
+            concessoes.add((tipo, recurso, recurso_id))
+        else:
+            negacoes.add((tipo, recurso, recurso_id))
+    
+    return PermissoesCompiladas(admin, grupo, concessoes, negacoes)
+
+def _versao_atual(usuario_id):
+    return (_versao_permissoes['global'], _versao_permissoes.get(usuario_id, 0))
+
+def obter_permissoes(usuario_id):
+    """
+    Retorna o snapshot de permissões do usuário, compilando-o se necessário.
+    """
+    versao = _versao_atual(usuario_id)
+    
+    item = _cache_permissoes.obter(usuario_id)
+    if item is not None and item[0] == versao:
+        return item[1]
+    
+    permissoes = compilar_permissoes(usuario_id)
+    
+    # Só guarda o snapshot se nenhuma invalidação ocorreu durante a compilação
+    with _lock_versao:
+        if _versao_atual(usuario_id) == versao:
+            _cache_permissoes.definir(usuario_id, (versao, permissoes))
+    
+    return permissoes
+
+def invalidar_permissoes(usuario_id=None):
+    """
+    Descarta snapshots de permissões (e do usuário autenticado) em cache.
+    
+    Args:
+        usuario_id: Invalida apenas este usuário; se omitido, invalida todos
+                    (ex: alteração das permissões de um grupo)
+    """
+    with _lock_versao:
+        if usuario_id is None:
+            _versao_permissoes['global'] += 1
+            _cache_permissoes.limpar()
+            _cache_usuarios.limpar()
+        else:
+            _versao_permissoes[usuario_id] = _versao_permissoes.get(usuario_id, 0) + 1
+            _cache_permissoes.invalidar(usuario_id)
+            _cache_usuarios.invalidar(usuario_id)
+
+# Alteração de permissões, grupos ou usuários feita por outro worker
+# (versão 'permissoes' em versoes_dados, lida pelo ETag das rotas)
+ao_alterar('permissoes', lambda versao: invalidar_permissoes())
+
+class UsuarioAutenticado:
+    """
+    Snapshot imutável do usuário de uma requisição (principal), mantido em
+    cache pelo token_required no lugar do modelo Usuario.
+    
+    Oferece os mesmos métodos de autorização de Usuario, resolvidos sem
+    acessar o banco. Para os demais campos, use carregar().
+    
+    Attributes:
+        id, nome, email, ativo: Campos do usuário
+        grupo_ids: frozenset com os ids dos grupos
+        grupos: tupla com os nomes dos grupos
+        admin: True se o usuário pertence ao grupo Administrador
+    """
+    __slots__ = ('id', 'nome', 'email', 'ativo', 'grupo_ids', 'grupos', 'admin')
+    
+    def __init__(self, id, nome, email, ativo, grupos):
+        self.id = id
+        self.nome = nome
+        self.email = email
+        self.ativo = ativo
+        self.grupo_ids = frozenset(grupo_id for grupo_id, _ in grupos)
+        self.grupos = tuple(sorted(nome_grupo for _, nome_grupo in grupos))
+        self.admin = 'Administrador' in self.grupos
+    
+    def is_admin(self):
+        return self.admin
+    
+    def pode_criar_cards(self):
+        return self.admin or 'Requisição' in self.grupos
+    
+    def pode_editar_etapa(self, etapa_id):
+        grupos_etapa = obter_grupos_etapa(etapa_id)
+        if grupos_etapa is None:
+            return False
+        return self.admin or not self.grupo_ids.isdisjoint(grupos_etapa)
+    
+    def tem_permissao(self, tipo_permissao, recurso, recurso_id=None):
+        return verificar_permissao(self, tipo_permissao, recurso, recurso_id)
+    
+    def listar_permissoes(self):
+        return list(obter_permissoes(self.id).listar())
+    
+    def carregar(self):
+        """Carrega o modelo Usuario completo"""
+        return db.session.get(Usuario, self.id)
+
+def carregar_usuario_autenticado(usuario_id):
+    """
+    Monta o snapshot do usuário e dos seus grupos com uma única consulta.
+    
+    Returns:
+        UsuarioAutenticado, ou None se o usuário não existir
+    """
+    linhas = db.session.execute(
+        select(Usuario.id, Usuario.nome, Usuario.email, Usuario.ativo, Grupo.id, Grupo.nome)
+        .select_from(Usuario)
+        .outerjoin(usuario_grupo, usuario_grupo.c.usuario_id == Usuario.id)
+        .outerjoin(Grupo, Grupo.id == usuario_grupo.c.grupo_id)
+        .where(Usuario.id == usuario_id)
+    ).all()
+    if not linhas:
+        return None
+    
+    id, nome, email, ativo = linhas[0][:4]
+    grupos = [(grupo_id, nome_grupo) for *_, grupo_id, nome_grupo in linhas if grupo_id is not None]
+    return UsuarioAutenticado(id, nome, email, ativo, grupos)
+
+def obter_usuario_autenticado(usuario_id):
+    """
+    Retorna o snapshot do usuário, do cache quando a versão do usuário não
+    mudou (a mesma de invalidar_permissoes).
+    """
+    versao = _versao_atual(usuario_id)
+    
+    item = _cache_usuarios.obter(usuario_id)
+    if item is not None and item[0] == versao:
+        return item[1]
+    
+    usuario = carregar_usuario_autenticado(usuario_id)
+    
+    with _lock_versao:
+        if usuario is not None and _versao_atual(usuario_id) == versao:
+            _cache_usuarios.definir(usuario_id, (versao, usuario))
+    
+    return usuario
+
+def obter_grupos_etapa(etapa_id):
+    """
+    Retorna o frozenset dos grupos permitidos na etapa (None se a etapa não
+    existir), a partir do snapshot das etapas.
+    """
+    from src.services.etapas_service import EtapasService
+    
+    etapa = EtapasService.snapshot().obter(etapa_id)
+    return etapa.grupo_ids if etapa else None
+
 # Funções auxiliares para verificação de permissões
 def verificar_permissao(usuario, tipo_permissao, recurso, recurso_id=None):
     """
@@ -144,31 +395,12 @@ def verificar_permissao(usuario, tipo_permissao, recurso, recurso_id=None):
     Returns:
         Boolean: True se tem permissão, False caso contrário
     """
-    if usuario.is_admin():
-        return True
-    
     if isinstance(tipo_permissao, TipoPermissao):
         tipo_permissao = tipo_permissao.value
     if isinstance(recurso, RecursoSistema):
         recurso = recurso.value
     
-    # Verificar permissões especiais (negações explícitas têm precedência)
-    permissao_especial = PermissaoEspecial.query.filter_by(
-        usuario_id=usuario.id,
-        tipo=tipo_permissao,
-        recurso=recurso
-    ).first()
-    
-    if permissao_especial and permissao_especial.recurso_id == recurso_id:
-        return permissao_especial.concedido
-    
-    # Verificar permissões por grupo
-    for grupo in usuario.grupos:
-        for permissao in grupo.permissoes:
-            if permissao.tipo == tipo_permissao and permissao.recurso == recurso and permissao.ativo:
-                return True
-    
-    return False
+    return obter_permissoes(usuario.id).permite(tipo_permissao, recurso, recurso_id)
 
 def registrar_acesso(usuario, tipo_operacao, recurso, recurso_id=None, ip_origem=None, 
                     user_agent=None, sucesso=True, detalhes=None):
@@ -184,22 +416,35 @@ def registrar_acesso(usuario, tipo_operacao, recurso, recurso_id=None, ip_origem
         user_agent: User-Agent do navegador
         sucesso: Boolean indicando se o acesso foi bem-sucedido
         detalhes: Detalhes adicionais sobre o acesso
+        
+    Returns:
+        LogAcesso gravado, ou None quando o registro foi enfileirado para
+        gravação em lote pelo registrador assíncrono da aplicação
     """
     if isinstance(tipo_operacao, TipoPermissao):
         tipo_operacao = tipo_operacao.value
     if isinstance(recurso, RecursoSistema):
         recurso = recurso.value
     
-    log = LogAcesso(
-        usuario_id=usuario.id if usuario else None,
-        tipo_operacao=tipo_operacao,
-        recurso=recurso,
-        recurso_id=recurso_id,
-        ip_origem=ip_origem,
-        user_agent=user_agent,
-        sucesso=sucesso,
-        detalhes=detalhes
-    )
+    dados = {
+        'usuario_id': usuario.id if usuario else None,
+        'tipo_operacao': tipo_operacao,
+        'recurso': recurso,
+        'recurso_id': recurso_id,
+        'data_acesso': datetime.utcnow(),
+        'ip_origem': ip_origem,
+        'user_agent': user_agent,
+        'sucesso': sucesso,
+        'detalhes': detalhes
+    }
+    
+    # Com o registrador assíncrono ativo, o log é gravado em lote fora da requisição
+    registrador = current_app.extensions.get('registro_acessos') if has_app_context() else None
+    if registrador is not None:
+        registrador.registrar(dados)
+        return None
+    
+    log = LogAcesso(**dados)
     
     db.session.add(log)
     db.session.commit()
@@ -217,24 +462,7 @@ def listar_permissoes(self):
     """
     Lista todas as permissões do usuário.
     """
-    permissoes = set()
-    
-    # Permissões de grupo
-    for grupo in self.grupos:
-        for permissao in grupo.permissoes:
-            if permissao.ativo:
-                permissoes.add((permissao.tipo, permissao.recurso))
-    
-    # Permissões especiais (apenas as concedidas)
-    permissoes_especiais = PermissaoEspecial.query.filter_by(
-        usuario_id=self.id,
-        concedido=True
-    ).all()
-    
-    for pe in permissoes_especiais:
-        permissoes.add((pe.tipo, pe.recurso))
-    
-    return list(permissoes)
+    return list(obter_permissoes(self.id).listar())
 
 # Adicionar os métodos à classe Usuario
 Usuario.tem_permissao = tem_permissao
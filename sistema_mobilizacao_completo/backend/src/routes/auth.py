@@ -1,11 +1,74 @@
 from flask import Blueprint, request, jsonify, current_app
 from functools import wraps
 import jwt
+import hashlib
+import os
+import time
+import uuid
 from datetime import datetime, timedelta
-from src.models.mobilizacao import db, Usuario
+from src.models.mobilizacao import db, Usuario, RevogacaoToken
+from src.models.permissoes import obter_usuario_autenticado
+from src.utils.cache import CacheTTL
 
 auth_bp = Blueprint('auth', __name__)
 
+# Claims de tokens já verificados, por sha256 do token, até no máximo a sua
+# expiração. O TTL limita o tempo em que outro worker ainda aceita um token
+# revogado por /logout (no worker que atendeu o logout, a revogação é imediata).
+_cache_tokens = CacheTTL(
+    int(os.environ.get('TOKENS_CACHE_TTL', 60)),
+    max_itens=int(os.environ.get('TOKENS_CACHE_MAX_ITENS', 10000))
+)
+
+class TokenRevogado(jwt.InvalidTokenError):
+    """Token encerrado por /logout"""
+
+def digest_token(token):
+    return hashlib.sha256(token.encode()).hexdigest()
+
+def decodificar_token(token):
+    """
+    Retorna as claims do token. Tokens já verificados vêm do cache, sem
+    recalcular a assinatura; os demais são verificados e consultados na
+    tabela de revogações.
+    
+    Raises:
+        jwt.ExpiredSignatureError, jwt.InvalidTokenError, TokenRevogado
+    """
+    digest = digest_token(token)
+    
+    data = _cache_tokens.obter(digest)
+    if data is not None:
+        return data
+    
+    data = jwt.decode(token, current_app.config['SECRET_KEY'], algorithms=['HS256'])
+    if db.session.get(RevogacaoToken, digest) is not None:
+        raise TokenRevogado('Token revogado')
+    
+    restante = data['exp'] - time.time() if 'exp' in data else _cache_tokens.ttl
+    if restante > 0:
+        _cache_tokens.definir(digest, data, ttl=min(restante, _cache_tokens.ttl))
+    return data
+
+def revogar_token(token):
+    """
+    Registra a revogação do token até a sua expiração e remove do banco as
+    revogações de tokens já expirados.
+    """
+    data = decodificar_token(token)
+    digest = digest_token(token)
+    agora = datetime.utcnow()
+    
+    RevogacaoToken.query.filter(RevogacaoToken.expira_em < agora).delete(synchronize_session=False)
+    db.session.merge(RevogacaoToken(
+        digest=digest,
+        usuario_id=data.get('user_id'),
+        expira_em=datetime.utcfromtimestamp(data['exp']) if 'exp' in data else agora + timedelta(hours=24)
+    ))
+    db.session.commit()
+    
+    _cache_tokens.invalidar(digest)
+
 def token_required(f):
     @wraps(f)
     def decorated(*args, **kwargs):
@@ -22,8 +85,9 @@ def token_required(f):
             return jsonify({'success': False, 'error': {'code': 'MISSING_TOKEN', 'message': 'Token de acesso requerido'}}), 401
         
         try:
-            data = jwt.decode(token, current_app.config['SECRET_KEY'], algorithms=['HS256'])
-            current_user = Usuario.query.get(data['user_id'])
+            data = decodificar_token(token)
+            # Snapshot do usuário em cache (UsuarioAutenticado), sem consulta por requisição
+            current_user = obter_usuario_autenticado(data['user_id'])
             if not current_user or not current_user.ativo:
                 return jsonify({'success': False, 'error': {'code': 'INVALID_USER', 'message': 'Usuário inválido ou inativo'}}), 401
                 
@@ -45,6 +109,8 @@ def token_required(f):
                 
         except jwt.ExpiredSignatureError:
             return jsonify({'success': False, 'error': {'code': 'EXPIRED_TOKEN', 'message': 'Token expirado'}}), 401
+        except TokenRevogado:
+            return jsonify({'success': False, 'error': {'code': 'REVOKED_TOKEN', 'message': 'Token revogado'}}), 401
         except jwt.InvalidTokenError:
             return jsonify({'success': False, 'error': {'code': 'INVALID_TOKEN', 'message': 'Token inválido'}}), 401
         
@@ -103,7 +169,9 @@ def login():
         token = jwt.encode({
             'user_id': usuario.id,
             'email': usuario.email,
-            'exp': datetime.utcnow() + timedelta(hours=24)
+            'exp': datetime.utcnow() + timedelta(hours=24),
+            # Identifica a sessão: o logout revoga só este token
+            'jti': uuid.uuid4().hex
         }, current_app.config['SECRET_KEY'], algorithm='HS256')
         
         return jsonify({
@@ -132,7 +200,8 @@ def refresh_token(current_user):
         token = jwt.encode({
             'user_id': current_user.id,
             'email': current_user.email,
-            'exp': datetime.utcnow() + timedelta(hours=24)
+            'exp': datetime.utcnow() + timedelta(hours=24),
+            'jti': uuid.uuid4().hex
         }, current_app.config['SECRET_KEY'], algorithm='HS256')
         
         return jsonify({
@@ -155,18 +224,35 @@ def refresh_token(current_user):
 @auth_bp.route('/logout', methods=['POST'])
 @token_required
 def logout(current_user):
-    # Em uma implementação real, você poderia adicionar o token a uma blacklist
-    return jsonify({
-        'success': True,
-        'message': 'Logout realizado com sucesso'
-    })
+    try:
+        revogar_token(request.headers['Authorization'].split(" ")[1])
+        
+        return jsonify({
+            'success': True,
+            'message': 'Logout realizado com sucesso'
+        })
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'error': {
+                'code': 'INTERNAL_ERROR',
+                'message': 'Erro interno do servidor'
+            }
+        }), 500
 
 @auth_bp.route('/me', methods=['GET'])
 @token_required
 def get_current_user(current_user):
+    # O snapshot em cache pode ser de um usuário já excluído
+    usuario = current_user.carregar()
+    if usuario is None:
+        return jsonify({'success': False, 'error': {'code': 'INVALID_USER', 'message': 'Usuário inválido ou inativo'}}), 401
+    
     return jsonify({
         'success': True,
-        'data': current_user.to_dict()
+        'data': usuario.to_dict()
     })
 
 
@@ -1,7 +1,12 @@
 from flask import Blueprint, request, jsonify
 from datetime import datetime
-from src.models.mobilizacao import db, CardMobilizacao, ChecklistCard, EtapaProcesso, Usuario
+from src.models.mobilizacao import db, CardMobilizacao, ChecklistCard, Usuario
 from src.routes.auth import token_required
+from src.services.contadores_service import ContadoresService
+from src.services.cards_service import CardsService
+from src.services.etapas_service import EtapasService
+from src.services.monitor_prazos import notificar_alteracao
+from src.utils.paginacao import paginar_por_cursor, CursorInvalido
 from sqlalchemy import or_, and_
 
 cards_bp = Blueprint('cards', __name__)
@@ -33,6 +38,28 @@ def listar_cards(current_user):
         if prazo_vencido:
             query = query.filter(CardMobilizacao.prazo_etapa < datetime.utcnow())
         
+        # Paginação por cursor (opcional): ?cursor= vazio inicia na primeira página
+        if 'cursor' in request.args:
+            pagina = paginar_por_cursor(
+                query,
+                [CardMobilizacao.data_criacao, CardMobilizacao.id],
+                request.args.get('cursor'),
+                limit,
+                incluir_total=request.args.get('incluir_total', 'false').lower() == 'true'
+            )
+            cards, etapas_referenciadas = CardsService.serializar_listagem(pagina.pop('itens'))
+            
+            return jsonify({
+                'success': True,
+                'data': {
+                    'cards': cards,
+                    'etapas': etapas_referenciadas,
+                    'limit': limit,
+                    'por_etapa': CardsService.contar_por_etapa(),
+                    **pagina
+                }
+            })
+        
         # Paginação
         cards_paginated = query.paginate(
             page=page, 
@@ -41,16 +68,15 @@ def listar_cards(current_user):
         )
         
         # Contar cards por etapa
-        cards_por_etapa = {}
-        etapas = EtapaProcesso.query.filter_by(ativo=True).all()
-        for etapa in etapas:
-            count = CardMobilizacao.query.filter_by(etapa_atual_id=etapa.id).count()
-            cards_por_etapa[str(etapa.id)] = count
+        cards_por_etapa = CardsService.contar_por_etapa()
+        
+        cards, etapas_referenciadas = CardsService.serializar_listagem(cards_paginated.items)
         
         return jsonify({
             'success': True,
             'data': {
-                'cards': [card.to_dict() for card in cards_paginated.items],
+                'cards': cards,
+                'etapas': etapas_referenciadas,
                 'total': cards_paginated.total,
                 'page': page,
                 'limit': limit,
@@ -59,6 +85,15 @@ def listar_cards(current_user):
             }
         })
         
+    except CursorInvalido as e:
+        return jsonify({
+            'success': False,
+            'error': {
+                'code': 'VALIDATION_ERROR',
+                'message': str(e)
+            }
+        }), 400
+        
     except Exception as e:
         return jsonify({
             'success': False,
@@ -135,7 +170,7 @@ def criar_card(current_user):
                 }), 422
         
         # Obter primeira etapa do processo
-        primeira_etapa = EtapaProcesso.query.filter_by(ativo=True).order_by(EtapaProcesso.ordem).first()
+        primeira_etapa = EtapasService.snapshot().primeira_ativa()
         
         if not primeira_etapa:
             return jsonify({
@@ -161,7 +196,10 @@ def criar_card(current_user):
         )
         
         db.session.add(card)
+        db.session.flush()
+        ContadoresService.registrar_transicao(None, ContadoresService.chave(card))
         db.session.commit()
+        CardsService.invalidar_contagem_por_etapa()
         
         return jsonify({
             'success': True,
@@ -204,6 +242,7 @@ def atualizar_card(current_user, card_id):
             }), 403
         
         data = request.get_json()
+        chave_anterior = ContadoresService.chave(card)
         
         # Atualizar campos permitidos
         if 'nome_colaborador' in data:
@@ -224,7 +263,9 @@ def atualizar_card(current_user, card_id):
         card.atualizado_por = current_user.id
         card.ultima_atualizacao = datetime.utcnow()
         
+        ContadoresService.registrar_transicao(chave_anterior, ContadoresService.chave(card))
         db.session.commit()
+        notificar_alteracao(card.id)
         
         return jsonify({
             'success': True,
@@ -270,7 +311,7 @@ def mover_card(current_user, card_id):
             }), 400
         
         # Verificar se etapa de destino existe
-        etapa_destino = EtapaProcesso.query.get(etapa_destino_id)
+        etapa_destino = EtapasService.snapshot().obter(etapa_destino_id)
         if not etapa_destino or not etapa_destino.ativo:
             return jsonify({
                 'success': False,
@@ -291,8 +332,12 @@ def mover_card(current_user, card_id):
             }), 403
         
         # Mover card
-        card.mover_para_etapa(etapa_destino_id, current_user.id, motivo)
+        chave_anterior = ContadoresService.chave(card)
+        card.mover_para_etapa(etapa_destino_id, current_user.id, motivo, etapa=etapa_destino)
+        ContadoresService.registrar_transicao(chave_anterior, ContadoresService.chave(card))
         db.session.commit()
+        CardsService.invalidar_contagem_por_etapa()
+        notificar_alteracao(card.id)
         
         return jsonify({
             'success': True,
@@ -413,8 +458,10 @@ def deletar_card(current_user, card_id):
                 }
             }), 404
         
+        ContadoresService.registrar_transicao(ContadoresService.chave(card), None)
         db.session.delete(card)
         db.session.commit()
+        CardsService.invalidar_contagem_por_etapa()
         
         return jsonify({
             'success': True,
@@ -1,14 +1,18 @@
 from flask import Blueprint, request, jsonify
 from src.models.mobilizacao import db, EtapaProcesso, ChecklistEtapa, Grupo
 from src.routes.auth import token_required, admin_required
+from src.services.cards_service import CardsService
+from src.services.etapas_service import EtapasService
+from src.utils.versoes import resposta_condicional
 
 etapas_bp = Blueprint('etapas', __name__)
 
 @etapas_bp.route('', methods=['GET'])
 @token_required
+@resposta_condicional('etapas')
 def listar_etapas(current_user):
     try:
-        etapas = EtapaProcesso.query.filter_by(ativo=True).order_by(EtapaProcesso.ordem).all()
+        etapas = EtapasService.snapshot().ativas()
         
         return jsonify({
             'success': True,
@@ -28,7 +32,7 @@ def listar_etapas(current_user):
 @token_required
 def obter_etapa(current_user, etapa_id):
     try:
-        etapa = EtapaProcesso.query.get(etapa_id)
+        etapa = EtapasService.snapshot().obter(etapa_id)
         
         if not etapa:
             return jsonify({
@@ -106,7 +110,9 @@ def criar_etapa(current_user):
             if grupo:
                 etapa.grupos_permitidos.append(grupo)
         
+        EtapasService.registrar_alteracao()
         db.session.commit()
+        CardsService.invalidar_contagem_por_etapa()
         
         return jsonify({
             'success': True,
@@ -163,7 +169,10 @@ def atualizar_etapa(current_user, etapa_id):
                 if grupo:
                     etapa.grupos_permitidos.append(grupo)
         
+        EtapasService.registrar_alteracao()
         db.session.commit()
+        if 'ativo' in data:
+            CardsService.invalidar_contagem_por_etapa()
         
         return jsonify({
             'success': True,
@@ -184,7 +193,7 @@ def atualizar_etapa(current_user, etapa_id):
 @token_required
 def listar_checklist_etapa(current_user, etapa_id):
     try:
-        etapa = EtapaProcesso.query.get(etapa_id)
+        etapa = EtapasService.snapshot().obter(etapa_id)
         
         if not etapa:
             return jsonify({
@@ -195,10 +204,7 @@ def listar_checklist_etapa(current_user, etapa_id):
                 }
             }), 404
         
-        checklist_items = ChecklistEtapa.query.filter_by(
-            etapa_id=etapa_id, 
-            ativo=True
-        ).order_by(ChecklistEtapa.ordem).all()
+        checklist_items = etapa.checklist_ativo()
         
         return jsonify({
             'success': True,
@@ -255,6 +261,7 @@ def criar_checklist_item(current_user, etapa_id):
         )
         
         db.session.add(checklist_item)
+        EtapasService.registrar_alteracao()
         db.session.commit()
         
         return jsonify({
@@ -305,6 +312,7 @@ def atualizar_checklist_item(current_user, etapa_id, item_id):
         if 'ativo' in data:
             checklist_item.ativo = data['ativo']
         
+        EtapasService.registrar_alteracao()
         db.session.commit()
         
         return jsonify({
@@ -342,6 +350,7 @@ def deletar_checklist_item(current_user, etapa_id, item_id):
             }), 404
         
         db.session.delete(checklist_item)
+        EtapasService.registrar_alteracao()
         db.session.commit()
         
         return jsonify({
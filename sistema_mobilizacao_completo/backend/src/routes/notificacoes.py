@@ -2,6 +2,9 @@ from flask import Blueprint, request, jsonify, current_app
 from src.models.mobilizacao import db, Notificacao, Usuario
 from src.routes.auth import token_required, admin_required, permissao_required
 from src.services.notificacao_service import NotificacaoService
+from src.services.agendador import AgendadorNotificacoes
+from src.utils.paginacao import paginar_por_cursor, CursorInvalido
+from src.utils.versoes import incrementar_versao, resposta_condicional
 from src.models.permissoes import TipoPermissao, RecursoSistema
 from datetime import datetime
 
@@ -15,6 +18,26 @@ def listar_notificacoes(current_user):
         lidas = request.args.get('lidas', 'false').lower() == 'true'
         limite = request.args.get('limite', 50, type=int)
         
+        # Paginação por cursor (opcional): ?cursor= vazio inicia na primeira página
+        if 'cursor' in request.args:
+            pagina = paginar_por_cursor(
+                NotificacaoService.consultar_notificacoes_usuario(current_user.email, lidas=lidas),
+                [Notificacao.data_criacao, Notificacao.id],
+                request.args.get('cursor'),
+                limite,
+                descendente=True,
+                incluir_total=request.args.get('incluir_total', 'false').lower() == 'true'
+            )
+            
+            return jsonify({
+                'success': True,
+                'data': {
+                    'notificacoes': [notificacao.to_dict() for notificacao in pagina.pop('itens')],
+                    'limite': limite,
+                    **pagina
+                }
+            })
+        
         notificacoes = NotificacaoService.listar_notificacoes_usuario(
             current_user.email,
             lidas=lidas,
@@ -26,6 +49,15 @@ def listar_notificacoes(current_user):
             'data': [notificacao.to_dict() for notificacao in notificacoes]
         })
         
+    except CursorInvalido as e:
+        return jsonify({
+            'success': False,
+            'error': {
+                'code': 'VALIDATION_ERROR',
+                'message': str(e)
+            }
+        }), 400
+        
     except Exception as e:
         current_app.logger.error(f"Erro ao listar notificações: {str(e)}")
         return jsonify({
@@ -38,6 +70,7 @@ def listar_notificacoes(current_user):
 
 @notificacoes_bp.route('/contagem', methods=['GET'])
 @token_required
+@resposta_condicional('notificacoes', por_usuario=True)
 def contar_notificacoes(current_user):
     """Conta notificações não lidas do usuário atual"""
     try:
@@ -120,6 +153,8 @@ def marcar_todas_como_lidas(current_user):
             notificacao.lido = True
             notificacao.data_leitura = datetime.utcnow()
         
+        if notificacoes:
+            incrementar_versao('notificacoes')
         db.session.commit()
         
         return jsonify({
@@ -144,7 +179,9 @@ def marcar_todas_como_lidas(current_user):
 def verificar_prazos(current_user):
     """Executa verificação de prazos vencidos e próximos de vencer"""
     try:
-        resultados = NotificacaoService.verificar_prazos_vencidos()
+        # Incremental por padrão; ?completo=true reavalia todos os cards
+        completo = request.args.get('completo', 'false').lower() == 'true'
+        resultados = NotificacaoService.verificar_prazos_vencidos(completo=completo)
         
         return jsonify({
             'success': True,
@@ -240,7 +277,8 @@ def processar_pendentes(current_user):
 def verificar_tudo(current_user):
     """Executa todas as verificações de uma vez"""
     try:
-        resultados = NotificacaoService.executar_verificacoes_periodicas()
+        completo = request.args.get('completo', 'false').lower() == 'true'
+        resultados = NotificacaoService.executar_verificacoes_periodicas(completo=completo)
         
         return jsonify({
             'success': True,
@@ -257,3 +295,26 @@ def verificar_tudo(current_user):
             }
         }), 500
 
+
+@notificacoes_bp.route('/agendador', methods=['GET'])
+@token_required
+@permissao_required(TipoPermissao.ADMINISTRAR, RecursoSistema.NOTIFICACAO)
+def estado_agendador(current_user):
+    """Retorna a última execução de cada tarefa do agendador de notificações"""
+    try:
+        return jsonify({
+            'success': True,
+            'data': {
+                'tarefas': AgendadorNotificacoes.estado()
+            }
+        })
+        
+    except Exception as e:
+        current_app.logger.error(f"Erro ao consultar o agendador: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': {
+                'code': 'INTERNAL_ERROR',
+                'message': 'Erro interno do servidor'
+            }
+        }), 500
@@ -1,11 +1,13 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from src.models.mobilizacao import db, Usuario, Grupo
 from src.models.permissoes import (
     Permissao, PermissaoEspecial, LogAcesso, 
     TipoPermissao, RecursoSistema, 
-    verificar_permissao, registrar_acesso
+    verificar_permissao, registrar_acesso, invalidar_permissoes
 )
 from src.routes.auth import token_required, admin_required
+from src.utils.paginacao import paginar_por_cursor, CursorInvalido
+from src.utils.versoes import incrementar_versao, resposta_condicional
 from datetime import datetime
 
 permissoes_bp = Blueprint('permissoes', __name__)
@@ -34,6 +36,7 @@ def listar_permissoes(current_user):
 
 @permissoes_bp.route('/tipos', methods=['GET'])
 @token_required
+@resposta_condicional()
 def listar_tipos_permissoes(current_user):
     """Lista todos os tipos de permissões disponíveis"""
     try:
@@ -128,7 +131,9 @@ def atualizar_permissoes_grupo(current_user, grupo_id):
             if permissao:
                 grupo.permissoes.append(permissao)
         
+        incrementar_versao('permissoes')
         db.session.commit()
+        invalidar_permissoes()
         
         # Registrar no log
         registrar_acesso(
@@ -256,7 +261,9 @@ def criar_permissao_especial(current_user):
         )
         
         db.session.add(permissao_especial)
+        incrementar_versao('permissoes')
         db.session.commit()
+        invalidar_permissoes(permissao_especial.usuario_id)
         
         # Registrar no log
         registrar_acesso(
@@ -300,9 +307,12 @@ def remover_permissao_especial(current_user, permissao_id):
             }), 404
         
         usuario_nome = permissao_especial.usuario.nome if permissao_especial.usuario else "Desconhecido"
+        usuario_id = permissao_especial.usuario_id
         
         db.session.delete(permissao_especial)
+        incrementar_versao('permissoes')
         db.session.commit()
+        invalidar_permissoes(usuario_id)
         
         # Registrar no log
         registrar_acesso(
@@ -369,6 +379,7 @@ def verificar_permissao_usuario(current_user):
 
 @permissoes_bp.route('/minhas', methods=['GET'])
 @token_required
+@resposta_condicional('permissoes', por_usuario=True)
 def listar_minhas_permissoes(current_user):
     """Lista todas as permissões do usuário atual"""
     try:
@@ -423,6 +434,26 @@ def listar_logs_acesso(current_user):
         if sucesso is not None:
             query = query.filter_by(sucesso=sucesso)
         
+        # Paginação por cursor (opcional): ?cursor= vazio inicia na primeira página
+        if 'cursor' in request.args:
+            pagina = paginar_por_cursor(
+                query,
+                [LogAcesso.data_acesso, LogAcesso.id],
+                request.args.get('cursor'),
+                limit,
+                descendente=True,
+                incluir_total=request.args.get('incluir_total', 'false').lower() == 'true'
+            )
+            
+            return jsonify({
+                'success': True,
+                'data': {
+                    'logs': [log.to_dict() for log in pagina.pop('itens')],
+                    'limit': limit,
+                    **pagina
+                }
+            })
+        
         # Ordenar por data de acesso (mais recente primeiro)
         query = query.order_by(LogAcesso.data_acesso.desc())
         
@@ -444,6 +475,15 @@ def listar_logs_acesso(current_user):
             }
         })
         
+    except CursorInvalido as e:
+        return jsonify({
+            'success': False,
+            'error': {
+                'code': 'VALIDATION_ERROR',
+                'message': str(e)
+            }
+        }), 400
+        
     except Exception as e:
         return jsonify({
             'success': False,
@@ -453,3 +493,24 @@ def listar_logs_acesso(current_user):
             }
         }), 500
 
+@permissoes_bp.route('/logs/estatisticas', methods=['GET'])
+@token_required
+@admin_required
+def obter_estatisticas_logs(current_user):
+    """Retorna os contadores da gravação em lote dos logs de acesso"""
+    try:
+        registrador = current_app.extensions.get('registro_acessos')
+        
+        return jsonify({
+            'success': True,
+            'data': registrador.estatisticas() if registrador else {'assincrono': False}
+        })
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': {
+                'code': 'INTERNAL_ERROR',
+                'message': 'Erro interno do servidor'
+            }
+        }), 500
@@ -1,6 +1,10 @@
 from flask import Blueprint, request, jsonify
 from src.models.mobilizacao import db, Usuario, Grupo
+from src.models.permissoes import invalidar_permissoes
 from src.routes.auth import token_required, admin_required
+from src.services.etapas_service import EtapasService
+from src.utils.paginacao import paginar_por_cursor, CursorInvalido
+from src.utils.versoes import incrementar_versao, resposta_condicional
 
 usuarios_bp = Blueprint('usuarios', __name__)
 
@@ -22,6 +26,25 @@ def listar_usuarios(current_user):
         if grupo:
             query = query.join(Usuario.grupos).filter(Grupo.nome == grupo)
         
+        # Paginação por cursor (opcional): ?cursor= vazio inicia na primeira página
+        if 'cursor' in request.args:
+            pagina = paginar_por_cursor(
+                query,
+                [Usuario.nome, Usuario.id],
+                request.args.get('cursor'),
+                limit,
+                incluir_total=request.args.get('incluir_total', 'false').lower() == 'true'
+            )
+            
+            return jsonify({
+                'success': True,
+                'data': {
+                    'usuarios': [usuario.to_dict() for usuario in pagina.pop('itens')],
+                    'limit': limit,
+                    **pagina
+                }
+            })
+        
         usuarios_paginated = query.paginate(
             page=page,
             per_page=limit,
@@ -39,6 +62,15 @@ def listar_usuarios(current_user):
             }
         })
         
+    except CursorInvalido as e:
+        return jsonify({
+            'success': False,
+            'error': {
+                'code': 'VALIDATION_ERROR',
+                'message': str(e)
+            }
+        }), 400
+        
     except Exception as e:
         return jsonify({
             'success': False,
@@ -123,7 +155,9 @@ def criar_usuario(current_user):
             if grupo:
                 usuario.grupos.append(grupo)
         
+        incrementar_versao('permissoes')
         db.session.commit()
+        invalidar_permissoes(usuario.id)
         
         return jsonify({
             'success': True,
@@ -187,7 +221,9 @@ def atualizar_usuario(current_user, usuario_id):
                 if grupo:
                     usuario.grupos.append(grupo)
         
+        incrementar_versao('permissoes')
         db.session.commit()
+        invalidar_permissoes(usuario.id)
         
         return jsonify({
             'success': True,
@@ -231,7 +267,9 @@ def deletar_usuario(current_user, usuario_id):
             }), 422
         
         db.session.delete(usuario)
+        incrementar_versao('permissoes')
         db.session.commit()
+        invalidar_permissoes(usuario_id)
         
         return jsonify({
             'success': True,
@@ -251,6 +289,7 @@ def deletar_usuario(current_user, usuario_id):
 # Rotas para grupos
 @usuarios_bp.route('/grupos', methods=['GET'])
 @token_required
+@resposta_condicional('permissoes')
 def listar_grupos(current_user):
     try:
         grupos = Grupo.query.filter_by(ativo=True).all()
@@ -304,6 +343,7 @@ def criar_grupo(current_user):
         )
         
         db.session.add(grupo)
+        incrementar_versao('permissoes')
         db.session.commit()
         
         return jsonify({
@@ -358,7 +398,13 @@ def atualizar_grupo(current_user, grupo_id):
         if 'ativo' in data:
             grupo.ativo = data['ativo']
         
+        if 'nome' in data:
+            # Os nomes dos grupos aparecem nas etapas (grupos_permitidos)
+            EtapasService.registrar_alteracao()
+        incrementar_versao('permissoes')
         db.session.commit()
+        # O nome do grupo define quem é administrador
+        invalidar_permissoes()
         
         return jsonify({
             'success': True,
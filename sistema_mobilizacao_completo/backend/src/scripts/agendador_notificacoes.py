@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Agendador residente das verificações de notificações.
+Mantém a aplicação e as conexões com o banco abertas e executa cada tarefa
+(prazos, inativos, checklist, pendentes) no seu próprio intervalo, definido
+pelas variáveis AGENDADOR_INTERVALO_<TAREFA>. Várias instâncias podem rodar
+sobre o mesmo banco: cada tarefa é reservada por uma só de cada vez.
+
+Substitui a execução de verificar_notificacoes.py via cron.
+
+Junto com o agendador roda o monitor de prazos (src/services/monitor_prazos.py),
+que gera os alertas de prazo e inatividade segundos depois de cada limite;
+entre as instâncias, só o monitor que detém o lease dispara os alertas.
+Defina MONITOR_PRAZOS_ATIVO=false para usar apenas as verificações periódicas.
+
+Uso: python src/scripts/agendador_notificacoes.py [--uma-vez]
+"""
+
+import os
+import signal
+import sys
+import logging
+import threading
+
+# Adicionar diretório raiz ao path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+# Configurar logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+def executar_agendador(uma_vez=False):
+    """Executa as tarefas continuamente (ou só as vencidas, com uma_vez)"""
+    from src.main import create_app
+    from src.services.agendador import AgendadorNotificacoes
+    from src.services.monitor_prazos import MonitorPrazos, registrar_monitor
+    from src.services.entrega_email import encerrar_entregador
+
+    # Mesma configuração da aplicação web (DATABASE_URL, opções do engine)
+    app = create_app()
+
+    parar = threading.Event()
+
+    def solicitar_parada(signum, frame):
+        logger.info("Encerrando após a tarefa atual...")
+        parar.set()
+
+    signal.signal(signal.SIGTERM, solicitar_parada)
+    signal.signal(signal.SIGINT, solicitar_parada)
+
+    agendador = AgendadorNotificacoes()
+    logger.info(f"Agendador {agendador.dono} iniciado: "
+                f"{ {nome: intervalo for nome, (_, intervalo) in agendador.tarefas.items()} }")
+
+    if uma_vez:
+        try:
+            with app.app_context():
+                return agendador.executar_pendentes()
+        finally:
+            encerrar_entregador()
+
+    monitor = None
+    if os.environ.get('MONITOR_PRAZOS_ATIVO', 'true').lower() == 'true':
+        monitor = MonitorPrazos()
+        registrar_monitor(monitor)
+
+        def executar_monitor():
+            with app.app_context():
+                monitor.executar(parar)
+
+        thread_monitor = threading.Thread(target=executar_monitor, name='monitor-prazos', daemon=True)
+        thread_monitor.start()
+
+    try:
+        with app.app_context():
+            agendador.executar(parar)
+    finally:
+        if monitor is not None:
+            thread_monitor.join(timeout=30)
+        encerrar_entregador()
+
+if __name__ == '__main__':
+    executar_agendador(uma_vez='--uma-vez' in sys.argv)
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Benchmark do endpoint /api/dashboard/indicadores.
+Mede o número de consultas SQL e o tempo de resposta à medida que a
+quantidade de etapas cresce, usando bancos SQLite temporários.
+
+Uso: python src/scripts/benchmark_dashboard.py [qtd_etapas ...]
+"""
+
+import os
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+from datetime import datetime, timedelta
+from io import StringIO
+
+# Adicionar diretório raiz ao path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+CARDS_POR_ETAPA = 20
+REPETICOES = 5
+
+
+def criar_app(caminho_banco):
+    """Cria uma aplicação Flask mínima para o benchmark"""
+    from flask import Flask
+    from src.models.mobilizacao import db
+    import src.models.permissoes  # noqa: F401 - registra as tabelas de permissões e logs
+    from src.routes.auth import auth_bp
+    from src.routes.dashboard import dashboard_bp
+
+    app = Flask(__name__)
+    app.config['SECRET_KEY'] = 'chave-de-benchmark-com-pelo-menos-32-bytes'
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{caminho_banco}"
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.register_blueprint(auth_bp, url_prefix='/api/auth')
+    app.register_blueprint(dashboard_bp, url_prefix='/api/dashboard')
+    db.init_app(app)
+
+    return app
+
+
+def popular(qtd_etapas):
+    """Cria etapas extras, cards e histórico de movimentação"""
+    from src.models.mobilizacao import db, EtapaProcesso, CardMobilizacao, HistoricoMovimentacao
+    from src.utils.seed_data import criar_dados_iniciais
+
+    with redirect_stdout(StringIO()):
+        criar_dados_iniciais()
+
+    ordem_inicial = db.session.query(db.func.max(EtapaProcesso.ordem)).scalar()
+    for i in range(qtd_etapas - EtapaProcesso.query.count()):
+        db.session.add(EtapaProcesso(
+            nome=f"Etapa extra {i + 1}",
+            ordem=ordem_inicial + i + 1,
+            prazo_dias=5,
+            dono_email='maria.rh@empresa.com'
+        ))
+    db.session.flush()
+
+    agora = datetime.utcnow()
+    status = ['NAO_INICIADO', 'EM_ANDAMENTO', 'FINALIZADO']
+    cards = []
+    historico = []
+    for etapa_id, in db.session.query(EtapaProcesso.id).all():
+        for i in range(CARDS_POR_ETAPA):
+            cards.append({
+                'nome_colaborador': f"Colaborador {etapa_id}-{i}",
+                'etapa_atual_id': etapa_id,
+                'status_etapa': status[i % 3],
+                'prazo_etapa': agora + timedelta(days=(i % 7) - 3),
+                'responsavel_atual': 'maria.rh@empresa.com',
+                'centro_custo': 'TI' if i % 2 else 'RH',
+                'data_criacao': agora - timedelta(days=i)
+            })
+    db.session.execute(CardMobilizacao.__table__.insert(), cards)
+
+    for card_id, etapa_id in db.session.query(CardMobilizacao.id, CardMobilizacao.etapa_atual_id).all():
+        historico.append({
+            'card_id': card_id,
+            'etapa_origem_id': etapa_id,
+            'etapa_destino_id': etapa_id,
+            'data_movimentacao': agora - timedelta(days=card_id % 20),
+            'tempo_permanencia_dias': card_id % 9
+        })
+    db.session.execute(HistoricoMovimentacao.__table__.insert(), historico)
+    db.session.commit()
+
+    # Cards inseridos em massa: contadores do dashboard calculados pela reconciliação
+    from src.services.contadores_service import ContadoresService
+    ContadoresService.reconciliar()
+
+
+def medir(qtd_etapas):
+    """Retorna (consultas por requisição, tempo médio em ms) para qtd_etapas"""
+    from sqlalchemy import event
+    from src.models.mobilizacao import db
+
+    diretorio = tempfile.mkdtemp(prefix='benchmark_dashboard_')
+    app = criar_app(os.path.join(diretorio, 'benchmark.db'))
+
+    with app.app_context():
+        db.create_all()
+        popular(qtd_etapas)
+        engine = db.engine
+
+    cliente = app.test_client()
+    token = cliente.post('/api/auth/login', json={
+        'email': 'admin@empresa.com', 'senha': 'admin123'
+    }).get_json()['data']['token']
+    headers = {'Authorization': f"Bearer {token}"}
+
+    consultas = []
+    event.listen(engine, 'before_cursor_execute', lambda *args: consultas.append(args[2]))
+
+    inicio = time.perf_counter()
+    for _ in range(REPETICOES):
+        response = cliente.get('/api/dashboard/indicadores?periodo=30d', headers=headers)
+        assert response.status_code == 200, response.get_json()
+    duracao = (time.perf_counter() - inicio) / REPETICOES
+
+    return len(consultas) // REPETICOES, duracao * 1000
+
+
+def main():
+    tamanhos = [int(valor) for valor in sys.argv[1:]] or [7, 25, 100, 400]
+
+    print(f"{'etapas':>8} {'cards':>8} {'consultas':>10} {'tempo (ms)':>12}")
+    for qtd_etapas in tamanhos:
+        consultas, tempo_ms = medir(qtd_etapas)
+        print(f"{qtd_etapas:>8} {qtd_etapas * CARDS_POR_ETAPA:>8} {consultas:>10} {tempo_ms:>12.1f}")
+
+
+if __name__ == '__main__':
+    main()
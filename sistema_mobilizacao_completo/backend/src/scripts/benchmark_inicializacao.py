@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Benchmark da inicialização de um worker.
+Em um processo novo por medição, compara create_app() sozinho (o que cada
+worker executa ao carregar "src.main:create_app()") com create_app() seguido
+de bootstrap(), o que a importação fazia antes do comando `flask bootstrap`:
+create_all, migrações, verificação dos dados iniciais e das permissões e
+reconciliação dos contadores. O banco SQLite temporário é preparado antes.
+
+Uso: python src/scripts/benchmark_inicializacao.py [repeticoes]
+"""
+
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from contextlib import redirect_stdout
+from io import StringIO
+
+# Adicionar diretório raiz ao path
+RAIZ = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, RAIZ)
+
+# Executado em um processo novo: importa a aplicação e imprime o tempo em
+# segundos e o número de consultas SQL
+MEDICAO = """
+import sys, time
+inicio = time.perf_counter()
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+consultas = []
+event.listen(Engine, 'before_cursor_execute', lambda *args: consultas.append(args[2]))
+from src.main import create_app, bootstrap
+app = create_app({{'SQLALCHEMY_DATABASE_URI': {uri!r}}})
+if {bootstrap}:
+    bootstrap(app)
+print(time.perf_counter() - inicio, len(consultas))
+"""
+
+
+def medir(uri, bootstrap, repeticoes):
+    """Retorna (mediana do tempo em ms, consultas) de repeticoes processos"""
+    tempos, consultas = [], 0
+    for _ in range(repeticoes):
+        saida = subprocess.run(
+            [sys.executable, '-c', MEDICAO.format(uri=uri, bootstrap=bootstrap)],
+            cwd=RAIZ, capture_output=True, text=True, check=True
+        ).stdout.split('\n')[-2]
+        tempo, consultas = saida.split()
+        tempos.append(float(tempo) * 1000)
+    return statistics.median(tempos), int(consultas)
+
+
+def main():
+    repeticoes = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+
+    from src.main import create_app, bootstrap
+
+    diretorio = tempfile.mkdtemp(prefix='benchmark_inicializacao_')
+    uri = f"sqlite:///{os.path.join(diretorio, 'benchmark.db')}"
+    with redirect_stdout(StringIO()):
+        bootstrap(create_app({'SQLALCHEMY_DATABASE_URI': uri}))
+
+    print(f"{'inicialização':>28} {'tempo (ms)':>11} {'consultas':>10}")
+    for nome, com_bootstrap in [('create_app', False), ('create_app + bootstrap', True)]:
+        tempo, consultas = medir(uri, com_bootstrap, repeticoes)
+        print(f"{nome:>28} {tempo:>11.1f} {consultas:>10}")
+
+
+if __name__ == '__main__':
+    main()
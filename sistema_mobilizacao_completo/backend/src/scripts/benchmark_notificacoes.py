@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Benchmark da geração de notificações de prazo e de checklist pendente
+(NotificacaoService.verificar_prazos_vencidos e verificar_checklist_pendentes).
+Cria cards com prazo vencido e checklist pendente em um banco SQLite temporário
+e mede o tempo, o número de consultas SQL e o pico de memória alocada de cada
+verificação, com entrega de email simulada.
+
+Uso: python src/scripts/benchmark_notificacoes.py [qtd_cards ...]
+"""
+
+import logging
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+from datetime import datetime, timedelta
+from io import StringIO
+
+# Adicionar diretório raiz ao path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+# Entrega simulada, sem registrar cada email no log
+os.environ['FLASK_ENV'] = 'development'
+
+
+def criar_app(caminho_banco):
+    """Cria uma aplicação Flask mínima para o benchmark"""
+    from flask import Flask
+    from src.config.banco import configurar_banco
+    import src.models.permissoes  # noqa: F401 - registra as tabelas de permissões e logs
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{caminho_banco}"
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    configurar_banco(app)
+
+    return app
+
+
+def popular(qtd_cards):
+    """
+    Cria cards com prazo vencido, metade deles já próximos do vencimento, com
+    os itens de checklist da etapa pendentes
+    """
+    from src.models.mobilizacao import db, EtapaProcesso, CardMobilizacao, ChecklistEtapa, ChecklistCard
+    from src.utils.seed_data import criar_dados_iniciais
+
+    with redirect_stdout(StringIO()):
+        criar_dados_iniciais()
+
+    etapa_ids = [etapa_id for etapa_id, in db.session.query(EtapaProcesso.id).all()]
+    agora = datetime.utcnow()
+    db.session.execute(CardMobilizacao.__table__.insert(), [
+        {
+            'nome_colaborador': f"Colaborador {i}",
+            'etapa_atual_id': etapa_ids[i % len(etapa_ids)],
+            'status_etapa': 'EM_ANDAMENTO',
+            'prazo_etapa': agora - timedelta(days=1) if i % 2 else agora + timedelta(days=1),
+            'responsavel_atual': f"responsavel{i % 50}@empresa.com"
+        }
+        for i in range(qtd_cards)
+    ])
+
+    itens_por_etapa = {}
+    for item_id, etapa_id in db.session.query(ChecklistEtapa.id, ChecklistEtapa.etapa_id):
+        itens_por_etapa.setdefault(etapa_id, []).append(item_id)
+
+    db.session.execute(ChecklistCard.__table__.insert(), [
+        {'card_id': card_id, 'checklist_etapa_id': item_id, 'concluido': False}
+        for card_id, etapa_id in db.session.query(CardMobilizacao.id, CardMobilizacao.etapa_atual_id)
+        for item_id in itens_por_etapa.get(etapa_id, [])
+    ])
+    db.session.commit()
+
+
+def medir(qtd_cards):
+    """
+    Retorna [(verificação, execução, notificações criadas, consultas, tempo em s,
+    pico de memória em MiB)] da primeira e da segunda execução de cada verificação
+    """
+    from sqlalchemy import event
+    from src.models.mobilizacao import db, Notificacao
+    from src.services.notificacao_service import NotificacaoService
+
+    diretorio = tempfile.mkdtemp(prefix='benchmark_notificacoes_')
+    app = criar_app(os.path.join(diretorio, 'benchmark.db'))
+
+    verificacoes = [
+        ('prazos', 'PRAZO_', NotificacaoService.verificar_prazos_vencidos),
+        ('checklist', 'CHECKLIST_PENDENTE', NotificacaoService.verificar_checklist_pendentes)
+    ]
+
+    execucoes = []
+    with app.app_context():
+        db.create_all()
+        popular(qtd_cards)
+
+        consultas = []
+        event.listen(db.engine, 'before_cursor_execute', lambda *args: consultas.append(args[2]))
+
+        for nome, tipo, verificar in verificacoes:
+            # A segunda execução não deve gerar nada (notificações das últimas 24h)
+            for numero in (1, 2):
+                antes = Notificacao.query.filter(Notificacao.tipo.startswith(tipo)).count()
+                consultas.clear()
+                db.session.expunge_all()
+
+                tracemalloc.start()
+                inicio = time.perf_counter()
+                verificar()
+                tempo = time.perf_counter() - inicio
+                pico = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+                tracemalloc.stop()
+
+                criadas = Notificacao.query.filter(Notificacao.tipo.startswith(tipo)).count() - antes
+                execucoes.append((nome, numero, criadas, len(consultas), tempo, pico))
+
+    return execucoes
+
+
+def main():
+    logging.getLogger('src.services.notificacao_service').setLevel(logging.WARNING)
+    tamanhos = [int(valor) for valor in sys.argv[1:]] or [1000, 10000]
+
+    print(f"{'cards':>8} {'verificação':>12} {'execução':>10} {'criadas':>9} {'consultas':>10} "
+          f"{'tempo (s)':>10} {'pico (MiB)':>11}")
+    for qtd_cards in tamanhos:
+        for nome, numero, criadas, consultas, tempo, pico in medir(qtd_cards):
+            print(f"{qtd_cards:>8} {nome:>12} {numero:>10} {criadas:>9} {consultas:>10} "
+                  f"{tempo:>10.2f} {pico:>11.1f}")
+
+
+if __name__ == '__main__':
+    main()
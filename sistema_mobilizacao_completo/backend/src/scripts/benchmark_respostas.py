@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Benchmark da serialização JSON e da compressão de respostas grandes.
+Sobre um banco SQLite temporário com qtd_cards cards, monta duas respostas:
+a listagem (/api/cards?limit=qtd_cards) e a lista dos mesmos cards com
+detalhes (to_dict(incluir_detalhes=True), como em obter_card). Para cada
+uma, compara o tempo de serialização dos provedores JSON disponíveis e os
+bytes enviados sem compressão, com gzip e com brotli (se instalado).
+
+Uso: python src/scripts/benchmark_respostas.py [qtd_cards] [repeticoes]
+"""
+
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import warnings
+from contextlib import redirect_stdout
+from datetime import datetime
+from io import StringIO
+
+# Adicionar diretório raiz ao path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+
+def cronometrar(funcao, repeticoes):
+    """Retorna a mediana do tempo de funcao() em ms"""
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    return statistics.median(tempos)
+
+
+def montar_respostas(app, qtd_cards):
+    """Cria os cards e retorna {nome: objeto da resposta}"""
+    from src.models.mobilizacao import db, CardMobilizacao, EtapaProcesso
+
+    with app.app_context():
+        etapas = EtapaProcesso.query.order_by(EtapaProcesso.ordem).all()
+        for i in range(qtd_cards - CardMobilizacao.query.count()):
+            db.session.add(CardMobilizacao(
+                nome_colaborador=f"Colaborador {i}",
+                cpf=f"9{i:010d}",
+                salario=3500,
+                cargo='Técnico de manutenção',
+                observacoes='Documentação entregue; aguardando exames admissionais.',
+                etapa_atual=etapas[i % len(etapas)],
+                data_entrada_etapa=datetime.utcnow()
+            ))
+        db.session.commit()
+
+        detalhes = {
+            'success': True,
+            'data': [card.to_dict(incluir_detalhes=True) for card in CardMobilizacao.query.limit(qtd_cards)]
+        }
+
+    cliente = app.test_client()
+    token = cliente.post('/api/auth/login', json={
+        'email': 'admin@empresa.com', 'senha': 'admin123'
+    }).get_json()['data']['token']
+    listagem = cliente.get(f"/api/cards?limit={qtd_cards}", headers={'Authorization': f"Bearer {token}"}).get_json()
+
+    return {'listagem': listagem, 'detalhes': detalhes}
+
+
+def main():
+    # Avisos da chave de desenvolvimento (curta) do JWT
+    warnings.simplefilter('ignore')
+
+    qtd_cards = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    repeticoes = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    diretorio = tempfile.mkdtemp(prefix='benchmark_respostas_')
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(diretorio, 'respostas.db')}"
+    os.environ['REGISTRO_ACESSOS_ASSINCRONO'] = 'false'
+
+    from src.main import create_app, bootstrap
+    from src.config.respostas import SERIALIZADORES, codificadores
+
+    app = create_app()
+    with redirect_stdout(StringIO()):
+        bootstrap(app)
+
+    respostas = montar_respostas(app, qtd_cards)
+
+    print(f"{qtd_cards} cards, mediana de {repeticoes} repetições")
+    print(f"{'resposta':>10} {'serializador':>13} {'tempo (ms)':>11} {'bytes':>10}")
+    for nome, obj in respostas.items():
+        with app.app_context():
+            for serializador, provedor in SERIALIZADORES.items():
+                provedor = provedor(app)
+                tempo = cronometrar(lambda: provedor.response(obj).get_data(), repeticoes)
+                tamanho = len(provedor.response(obj).get_data())
+                print(f"{nome:>10} {serializador:>13} {tempo:>11.2f} {tamanho:>10}")
+
+    print()
+    print(f"{'resposta':>10} {'codificação':>13} {'tempo (ms)':>11} {'bytes':>10} {'redução':>8}")
+    for nome, obj in respostas.items():
+        with app.app_context():
+            dados = app.json.response(obj).get_data()
+        for codificacao, comprimir in codificadores(app):
+            tempo = cronometrar(lambda: comprimir(dados), repeticoes)
+            tamanho = len(comprimir(dados))
+            print(f"{nome:>10} {codificacao:>13} {tempo:>11.2f} {tamanho:>10} {1 - tamanho / len(dados):>8.0%}")
+
+    # Conferência: os dois serializadores produzem o mesmo documento
+    with app.app_context():
+        for obj in respostas.values():
+            documentos = {json.dumps(json.loads(provedor(app).response(obj).get_data()), sort_keys=True)
+                          for provedor in SERIALIZADORES.values()}
+            assert len(documentos) == 1
+
+
+if __name__ == '__main__':
+    main()
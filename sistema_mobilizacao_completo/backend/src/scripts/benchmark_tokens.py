@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark da verificação de tokens JWT no token_required.
+Compara jwt.decode (cálculo do HMAC a cada requisição) com a leitura das
+claims no cache de tokens verificados (sha256 do token + busca no LRU), em
+microssegundos por verificação.
+
+Uso: python src/scripts/benchmark_tokens.py [repeticoes]
+"""
+
+import os
+import sys
+import timeit
+from datetime import datetime, timedelta
+
+# Adicionar diretório raiz ao path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+CHAVE = 'chave-de-benchmark-com-pelo-menos-32-bytes'
+
+
+def medir(repeticoes):
+    """
+    Retorna [(método, microssegundos por verificação)]
+    """
+    import jwt
+    from flask import Flask
+    from src.routes import auth
+
+    app = Flask(__name__)
+    app.config['SECRET_KEY'] = CHAVE
+
+    token = jwt.encode({
+        'user_id': 1,
+        'email': 'admin@empresa.com',
+        'exp': datetime.utcnow() + timedelta(hours=24)
+    }, CHAVE, algorithm='HS256')
+
+    with app.app_context():
+        # Primeira verificação preenche o cache (sem consultar revogações aqui)
+        auth._cache_tokens.definir(auth.digest_token(token), jwt.decode(token, CHAVE, algorithms=['HS256']))
+
+        metodos = [
+            ('jwt.decode', lambda: jwt.decode(token, CHAVE, algorithms=['HS256'])),
+            ('cache', lambda: auth.decodificar_token(token))
+        ]
+        return [
+            (nome, min(timeit.repeat(funcao, number=repeticoes, repeat=5)) / repeticoes * 1e6)
+            for nome, funcao in metodos
+        ]
+
+
+def main():
+    repeticoes = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+
+    resultados = medir(repeticoes)
+    base = resultados[0][1]
+
+    print(f"{'método':>12} {'µs/verificação':>15} {'speedup':>8}")
+    for nome, microssegundos in resultados:
+        print(f"{nome:>12} {microssegundos:>15.2f} {base / microssegundos:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Mede a memória por worker com e sem preload, reproduzindo o ciclo do
+gunicorn com os.fork (sem precisar do gunicorn instalado):
+
+- sem preload: cada worker cria a aplicação depois do fork;
+- com preload: o processo pai cria a aplicação, executa aquecer(),
+  gc.freeze() e reabilita o gc (como o hook on_starting de
+  gunicorn_config.py) e os workers só descartam os pools de conexões
+  herdados (post_fork).
+
+Cada worker atende algumas requisições e informa RSS, PSS (memória
+compartilhada dividida entre os processos que a usam) e memória privada,
+lidos de /proc/self/smaps_rollup (Linux). Com copy-on-write, o RSS dos
+workers muda pouco; a diferença aparece em PSS e na memória privada.
+
+Uso: python src/scripts/medir_memoria_workers.py [qtd_workers] [requisicoes]
+"""
+
+import gc
+import json
+import os
+import sys
+import tempfile
+import warnings
+from contextlib import redirect_stdout
+from io import StringIO
+
+# Adicionar diretório raiz ao path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+
+def memoria():
+    """Retorna (RSS, PSS, privada) do processo atual em MiB"""
+    campos = {}
+    with open('/proc/self/smaps_rollup') as arquivo:
+        for linha in arquivo:
+            partes = linha.split()
+            if len(partes) == 3 and partes[2] == 'kB':
+                campos[partes[0].rstrip(':')] = int(partes[1]) / 1024
+    return campos['Rss'], campos['Pss'], campos['Private_Clean'] + campos['Private_Dirty']
+
+
+def atender(app, requisicoes):
+    """Executa requisições autenticadas no worker"""
+    cliente = app.test_client()
+    token = cliente.post('/api/auth/login', json={
+        'email': 'admin@empresa.com', 'senha': 'admin123'
+    }).get_json()['data']['token']
+    headers = {'Authorization': f"Bearer {token}"}
+
+    for _ in range(requisicoes):
+        for url in ('/api/etapas', '/api/cards?limit=20', '/api/dashboard/indicadores'):
+            cliente.get(url, headers=headers)
+
+
+def worker(app, requisicoes, escrita):
+    if app is None:
+        from src.main import create_app
+        app = create_app()
+    else:
+        from src.config.banco import descartar_conexoes
+        descartar_conexoes(app, fechar=False)
+
+    atender(app, requisicoes)
+    os.write(escrita, (json.dumps(memoria()) + '\n').encode())
+    os._exit(0)
+
+
+def medir(preload, qtd_workers, requisicoes):
+    """Retorna a média de (RSS, PSS, privada) dos workers em MiB"""
+    app = None
+    if preload:
+        gc.disable()
+        from src.main import create_app, aquecer
+        app = create_app()
+        aquecer(app)
+        gc.freeze()
+        gc.enable()
+
+    leitura, escrita = os.pipe()
+    pids = []
+    for _ in range(qtd_workers):
+        pid = os.fork()
+        if pid == 0:
+            worker(app, requisicoes, escrita)
+        pids.append(pid)
+
+    # Uma linha de medição por worker
+    os.close(escrita)
+    dados = b''
+    while True:
+        bloco = os.read(leitura, 65536)
+        if not bloco:
+            break
+        dados += bloco
+    for pid in pids:
+        os.waitpid(pid, 0)
+
+    medidas = [json.loads(linha) for linha in dados.decode().splitlines()]
+    return [sum(valores) / len(valores) for valores in zip(*medidas)]
+
+
+def main():
+    # Avisos da chave de desenvolvimento (curta) do JWT
+    warnings.simplefilter('ignore')
+
+    qtd_workers = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    requisicoes = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    if len(sys.argv) > 3:
+        # Processo filho: uma medição por interpretador novo
+        rss, pss, privada = medir(sys.argv[3] == 'preload', qtd_workers, requisicoes)
+        print(f"{sys.argv[3]:>12} {qtd_workers:>8} {rss:>10.1f} {pss:>10.1f} {privada:>13.1f}")
+        return
+
+    import subprocess
+
+    # Banco temporário, herdado pelos processos de medição
+    diretorio = tempfile.mkdtemp(prefix='medir_memoria_')
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(diretorio, 'memoria.db')}"
+    os.environ['REGISTRO_ACESSOS_ASSINCRONO'] = 'false'
+
+    from src.main import create_app, bootstrap
+
+    with redirect_stdout(StringIO()):
+        bootstrap(create_app())
+
+    print(f"{'modo':>12} {'workers':>8} {'RSS (MiB)':>10} {'PSS (MiB)':>10} {'privada (MiB)':>13}")
+    for modo in ('sem_preload', 'preload'):
+        subprocess.run([sys.executable, __file__, str(qtd_workers), str(requisicoes), modo], check=True)
+
+
+if __name__ == '__main__':
+    main()
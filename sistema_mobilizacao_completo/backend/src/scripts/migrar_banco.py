@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Script de migração do banco de dados.
+Cria as tabelas novas e aplica as colunas e os índices declarados nos modelos a um
+app.db já existente. O mesmo passo faz parte do comando `flask bootstrap`
+(bootstrap em src/main.py), executado a cada deploy.
+
+Uso: python src/scripts/migrar_banco.py [caminho_do_banco]
+"""
+
+import os
+import sys
+import logging
+
+# Adicionar diretório raiz ao path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+# Configurar logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+def migrar_banco(caminho_banco):
+    """Cria tabelas ausentes e aplica colunas e índices novos"""
+    from flask import Flask
+    from src.models.mobilizacao import db
+    from src.config.banco import configurar_banco
+    import src.models.permissoes  # noqa: F401 - registra as tabelas de permissões e logs
+    from src.utils.migracoes import migrar
+    
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{caminho_banco}"
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    configurar_banco(app)
+    
+    with app.app_context():
+        db.create_all()
+        resultado = migrar()
+        logger.info(f"Migração concluída: {resultado}")
+        return resultado
+
+if __name__ == '__main__':
+    caminho_padrao = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'database', 'app.db')
+    migrar_banco(sys.argv[1] if len(sys.argv) > 1 else caminho_padrao)
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Script de reconciliação dos contadores do dashboard.
+Recalcula dashboard_contadores a partir dos cards e corrige divergências.
+Deve ser executado periodicamente (ex: via cron) para detectar desvios
+causados por alterações feitas fora da API.
+"""
+
+import os
+import sys
+import logging
+from datetime import datetime
+
+# Adicionar diretório raiz ao path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+# Configurar logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+def reconciliar_contadores():
+    """Executa a reconciliação e registra as divergências encontradas"""
+    from src.main import create_app
+    from src.services.contadores_service import ContadoresService
+    
+    # Mesma configuração da aplicação web (DATABASE_URL, opções do engine)
+    app = create_app()
+    
+    with app.app_context():
+        inicio = datetime.now()
+        
+        try:
+            resultado = ContadoresService.reconciliar()
+            
+            logger.info(f"Reconciliação concluída em {(datetime.now() - inicio).total_seconds():.2f} segundos")
+            logger.info(f"Divergências corrigidas: {resultado['divergencias']}")
+            for detalhe in resultado['detalhes']:
+                logger.info(f"  {detalhe}")
+            
+            return resultado
+            
+        except Exception as e:
+            logger.error(f"Erro ao reconciliar contadores: {str(e)}")
+            return None
+
+if __name__ == '__main__':
+    reconciliar_contadores()
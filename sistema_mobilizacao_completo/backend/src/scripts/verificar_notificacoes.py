@@ -3,6 +3,12 @@
 Script para executar verificações periódicas de notificações.
 Este script deve ser executado periodicamente (ex: via cron) para verificar prazos,
 cards inativos, checklist pendentes e enviar notificações.
+
+Para execução contínua, prefira src/scripts/agendador_notificacoes.py, que
+mantém a aplicação carregada e executa cada verificação no seu intervalo.
+
+Uso: python src/scripts/verificar_notificacoes.py [--completo]
+(--completo reavalia todos os prazos em vez de só as mudanças desde a última execução)
 """
 
 import os
@@ -24,17 +30,13 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-def executar_verificacoes():
+def executar_verificacoes(completo=False):
     """Executa todas as verificações periódicas"""
-    from flask import Flask
-    from src.models.mobilizacao import db
+    from src.main import create_app
     from src.services.notificacao_service import NotificacaoService
     
-    # Criar aplicação Flask temporária
-    app = Flask(__name__)
-    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(os.path.dirname(os.path.dirname(__file__)), 'database', 'app.db')}"
-    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-    db.init_app(app)
+    # Mesma configuração da aplicação web (DATABASE_URL, opções do engine)
+    app = create_app()
     
     with app.app_context():
         logger.info("Iniciando verificações periódicas...")
@@ -42,7 +44,7 @@ def executar_verificacoes():
         
         try:
             # Executar todas as verificações
-            resultados = NotificacaoService.executar_verificacoes_periodicas()
+            resultados = NotificacaoService.executar_verificacoes_periodicas(completo=completo)
             
             # Registrar resultados
             logger.info(f"Verificações concluídas em {(datetime.now() - inicio).total_seconds():.2f} segundos")
@@ -55,5 +57,5 @@ def executar_verificacoes():
             return None
 
 if __name__ == '__main__':
-    executar_verificacoes()
+    executar_verificacoes(completo='--completo' in sys.argv)
 
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Worker da fila de envio de notificações.
+Reserva lotes de notificações pendentes (com lease), envia os emails e
+registra o resultado; falhas voltam à fila com backoff exponencial.
+Vários workers podem rodar ao mesmo tempo sobre o mesmo banco.
+
+Uso: python src/scripts/worker_notificacoes.py [--uma-vez]
+"""
+
+import os
+import signal
+import sys
+import logging
+import time
+
+# Adicionar diretório raiz ao path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+# Configurar logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+_parar = False
+
+def _solicitar_parada(signum, frame):
+    global _parar
+    logger.info("Encerrando após o lote atual...")
+    _parar = True
+
+def executar_worker(uma_vez=False):
+    """Processa a fila continuamente (ou até esvaziá-la, com uma_vez)"""
+    from flask import Flask
+    from src.models.mobilizacao import db
+    from src.config.banco import configurar_banco
+    from src.services.notificacao_service import NotificacaoService
+    from src.services.entrega_email import encerrar_entregador
+    
+    intervalo = int(os.environ.get('NOTIFICACOES_WORKER_INTERVALO', 5))
+    
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get(
+        'DATABASE_URL',
+        f"sqlite:///{os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'database', 'app.db')}"
+    )
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    configurar_banco(app)
+    
+    signal.signal(signal.SIGTERM, _solicitar_parada)
+    signal.signal(signal.SIGINT, _solicitar_parada)
+    
+    try:
+        while not _parar:
+            with app.app_context():
+                try:
+                    resultado = NotificacaoService.processar_notificacoes_pendentes(max_lotes=1)
+                except Exception as e:
+                    db.session.rollback()
+                    logger.error(f"Erro ao processar a fila de notificações: {str(e)}")
+                    resultado = {'processadas': 0}
+            
+            if resultado['processadas']:
+                logger.info(f"Lote processado: {resultado}")
+            elif uma_vez:
+                break
+            else:
+                time.sleep(intervalo)
+    finally:
+        encerrar_entregador()
+
+if __name__ == '__main__':
+    executar_worker(uma_vez='--uma-vez' in sys.argv)
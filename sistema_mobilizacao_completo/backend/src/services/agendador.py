@@ -0,0 +1,214 @@
+"""
+Agendador residente das verificações de notificações.
+
+Substitui a execução via cron de src/scripts/verificar_notificacoes.py: um
+único processo mantém a aplicação e o engine carregados e executa cada
+tarefa no seu próprio intervalo (com jitter). A reserva de cada tarefa é
+feita na tabela execucoes_agendador com lease, de modo que várias instâncias
+do agendador podem rodar sem executar a mesma tarefa em paralelo; a reserva
+de uma instância que parou expira em lease_ate.
+"""
+
+import json
+import logging
+import os
+import random
+import socket
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import update, or_
+from sqlalchemy.exc import IntegrityError
+
+from src.models.mobilizacao import db, ExecucaoAgendador
+from src.services.notificacao_service import NotificacaoService
+
+logger = logging.getLogger(__name__)
+
+# Tarefas padrão: nome -> (função, variável de ambiente do intervalo, intervalo padrão em segundos)
+TAREFAS_PADRAO = {
+    # Incremental, com uma reavaliação completa (que repete os lembretes diários
+    # de prazos vencidos) a cada AGENDADOR_INTERVALO_PRAZOS_COMPLETO segundos.
+    # Uma só tarefa: as duas varreduras nunca rodam em paralelo
+    'prazos': (
+        lambda: NotificacaoService.verificar_prazos_vencidos(
+            intervalo_completo=int(os.environ.get('AGENDADOR_INTERVALO_PRAZOS_COMPLETO', 86400))
+        ),
+        'AGENDADOR_INTERVALO_PRAZOS', 900
+    ),
+    'inativos': (NotificacaoService.verificar_cards_inativos, 'AGENDADOR_INTERVALO_INATIVOS', 3600),
+    'checklist': (NotificacaoService.verificar_checklist_pendentes, 'AGENDADOR_INTERVALO_CHECKLIST', 3600),
+    'pendentes': (NotificacaoService.processar_notificacoes_pendentes, 'AGENDADOR_INTERVALO_PENDENTES', 60)
+}
+
+
+class AgendadorNotificacoes:
+    """
+    Executa as tarefas de notificação vencidas, uma instância por processo.
+    """
+
+    def __init__(self, tarefas=None, jitter=None, duracao_lease=None):
+        """
+        Args:
+            tarefas: Dict nome -> (função, intervalo em segundos); por padrão,
+                as verificações de TAREFAS_PADRAO com os intervalos do ambiente
+            jitter: Fração do intervalo sorteada para mais ou para menos
+            duracao_lease: Segundos de reserva de uma tarefa em execução
+        """
+        if tarefas is None:
+            tarefas = {
+                nome: (funcao, int(os.environ.get(variavel, padrao)))
+                for nome, (funcao, variavel, padrao) in TAREFAS_PADRAO.items()
+            }
+        self.tarefas = tarefas
+        self.jitter = float(os.environ.get('AGENDADOR_JITTER', 0.1)) if jitter is None else jitter
+        self.duracao_lease = duracao_lease or int(os.environ.get('AGENDADOR_LEASE_SEGUNDOS', 1800))
+        self.dono = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+    def _garantir_registros(self):
+        """Cria as linhas das tarefas ainda sem registro (executam na primeira oportunidade)"""
+        existentes = {tarefa for tarefa, in db.session.query(ExecucaoAgendador.tarefa)}
+        for nome in self.tarefas:
+            if nome in existentes:
+                continue
+            try:
+                db.session.add(ExecucaoAgendador(tarefa=nome))
+                db.session.commit()
+            except IntegrityError:
+                # Outra instância criou a linha ao mesmo tempo
+                db.session.rollback()
+
+    def reservar(self, nome, agora=None):
+        """
+        Reserva a tarefa se ela estiver vencida e sem reserva válida.
+
+        Returns:
+            True se esta instância deve executar a tarefa
+        """
+        agora = agora or datetime.utcnow()
+        resultado = db.session.execute(
+            update(ExecucaoAgendador).where(
+                ExecucaoAgendador.tarefa == nome,
+                or_(ExecucaoAgendador.proxima_execucao.is_(None), ExecucaoAgendador.proxima_execucao <= agora),
+                or_(ExecucaoAgendador.lease_ate.is_(None), ExecucaoAgendador.lease_ate < agora)
+            ).values(
+                lease_dono=self.dono,
+                lease_ate=agora + timedelta(seconds=self.duracao_lease)
+            ).execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        return resultado.rowcount == 1
+
+    def proximo_intervalo(self, nome):
+        """Intervalo da tarefa com jitter, para que as instâncias não sincronizem"""
+        intervalo = self.tarefas[nome][1]
+        return intervalo * (1 + random.uniform(-self.jitter, self.jitter))
+
+    def executar_tarefa(self, nome):
+        """
+        Executa uma tarefa já reservada e registra duração, resultado e a
+        próxima execução.
+
+        Returns:
+            Resultado da tarefa (None em caso de erro)
+        """
+        funcao = self.tarefas[nome][0]
+        inicio = datetime.utcnow()
+        cronometro = time.perf_counter()
+
+        resultado, erro = None, None
+        try:
+            resultado = funcao()
+        except Exception as e:
+            db.session.rollback()
+            erro = str(e)
+            logger.error(f"Erro na tarefa {nome} do agendador: {erro}")
+
+        duracao = time.perf_counter() - cronometro
+        fim = datetime.utcnow()
+
+        execucao = db.session.get(ExecucaoAgendador, nome)
+        execucao.inicio_ultima_execucao = inicio
+        execucao.fim_ultima_execucao = fim
+        execucao.duracao_ultima_execucao = duracao
+        execucao.resultado_ultima_execucao = json.dumps(
+            resultado if isinstance(resultado, dict) or resultado is None else {'total': resultado}
+        )
+        execucao.erro_ultima_execucao = erro
+        execucao.execucoes = (execucao.execucoes or 0) + 1
+        execucao.proxima_execucao = fim + timedelta(seconds=self.proximo_intervalo(nome))
+
+        # Libera a reserva apenas se ainda for desta instância: com o lease
+        # expirado durante a tarefa, outra instância pode tê-la assumido
+        liberada = db.session.execute(
+            update(ExecucaoAgendador).where(
+                ExecucaoAgendador.tarefa == nome,
+                ExecucaoAgendador.lease_dono == self.dono
+            ).values(
+                lease_dono=None,
+                lease_ate=None
+            ).execution_options(synchronize_session=False)
+        ).rowcount == 1
+        db.session.commit()
+
+        if not liberada:
+            logger.warning(f"Reserva da tarefa {nome} expirou durante a execução e foi assumida por outra instância")
+
+        logger.info(f"Tarefa {nome} executada em {duracao:.2f}s: {resultado if erro is None else erro}")
+        return resultado
+
+    def executar_pendentes(self):
+        """
+        Executa as tarefas vencidas que esta instância conseguir reservar.
+
+        Returns:
+            Dict nome -> resultado das tarefas executadas
+        """
+        self._garantir_registros()
+
+        executadas = {}
+        for nome in self.tarefas:
+            if self.reservar(nome):
+                executadas[nome] = self.executar_tarefa(nome)
+        return executadas
+
+    def segundos_ate_proxima(self):
+        """Segundos até a próxima tarefa vencer (0 se alguma já venceu)"""
+        agora = datetime.utcnow()
+        proximas = [
+            proxima for proxima, in db.session.query(ExecucaoAgendador.proxima_execucao).filter(
+                ExecucaoAgendador.tarefa.in_(list(self.tarefas))
+            )
+        ]
+        if len(proximas) < len(self.tarefas) or None in proximas:
+            return 0.0
+        return max((min(proximas) - agora).total_seconds(), 0.0)
+
+    def executar(self, parar, espera_max=None):
+        """
+        Laço do agendador: executa as tarefas vencidas e aguarda a próxima,
+        até o evento parar ser acionado.
+        """
+        espera_max = espera_max or int(os.environ.get('AGENDADOR_ESPERA_MAX', 30))
+
+        while not parar.is_set():
+            try:
+                self.executar_pendentes()
+                espera = min(self.segundos_ate_proxima(), espera_max)
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"Erro no agendador de notificações: {str(e)}")
+                espera = espera_max
+            finally:
+                # Sessão nova a cada ciclo: o mapa de identidade não cresce com o tempo
+                db.session.remove()
+
+            parar.wait(espera)
+
+    @staticmethod
+    def estado():
+        """
+        Retorna a última execução de cada tarefa (duração, resultado, erro).
+        """
+        return [execucao.to_dict() for execucao in ExecucaoAgendador.query.order_by(ExecucaoAgendador.tarefa)]
@@ -0,0 +1,100 @@
+from src.models.mobilizacao import db, CardMobilizacao, ChecklistCard, EtapaProcesso
+from src.services.etapas_service import EtapasService
+from src.utils.cache import CacheTTL
+from sqlalchemy import func, case
+import os
+
+# Contagem de cards por etapa do quadro, compartilhada entre as requisições do processo
+_cache_por_etapa = CacheTTL(int(os.environ.get('CARDS_POR_ETAPA_CACHE_TTL', 10)))
+
+
+class CardsService:
+    """
+    Serialização de listagens de cards com número fixo de consultas.
+    """
+
+    @staticmethod
+    def contar_por_etapa():
+        """
+        Conta os cards de cada etapa ativa com uma única consulta agrupada.
+        O resultado fica em cache por CARDS_POR_ETAPA_CACHE_TTL segundos.
+
+        Returns:
+            Dict {str(etapa_id): total}
+        """
+        contagem = _cache_por_etapa.obter('por_etapa')
+        if contagem is None:
+            contagem = {
+                str(etapa_id): total
+                for etapa_id, total in db.session.query(
+                    EtapaProcesso.id,
+                    func.count(CardMobilizacao.id)
+                ).outerjoin(
+                    CardMobilizacao, CardMobilizacao.etapa_atual_id == EtapaProcesso.id
+                ).filter(
+                    EtapaProcesso.ativo == True
+                ).group_by(EtapaProcesso.id).all()
+            }
+            _cache_por_etapa.definir('por_etapa', contagem)
+
+        return dict(contagem)
+
+    @staticmethod
+    def invalidar_contagem_por_etapa():
+        """
+        Descarta a contagem por etapa em cache (chamar após o commit).
+        """
+        _cache_por_etapa.limpar()
+
+    @staticmethod
+    def progresso_checklist(card_ids):
+        """
+        Calcula o progresso do checklist de vários cards com uma consulta agrupada.
+
+        Returns:
+            Dict {card_id: {total, concluidos, percentual}}
+        """
+        if not card_ids:
+            return {}
+
+        contagens = db.session.query(
+            ChecklistCard.card_id,
+            func.count(ChecklistCard.id),
+            func.sum(case((ChecklistCard.concluido == True, 1), else_=0))
+        ).filter(
+            ChecklistCard.card_id.in_(card_ids)
+        ).group_by(ChecklistCard.card_id).all()
+
+        return {
+            card_id: CardMobilizacao.calcular_progresso(total, concluidos or 0)
+            for card_id, total, concluidos in contagens
+        }
+
+    @staticmethod
+    def serializar_listagem(cards):
+        """
+        Serializa uma página de cards.
+
+        Cada etapa referenciada vem do snapshot de etapas e é devolvida na
+        tabela auxiliar 'etapas', indexada por id; os cards trazem apenas o id
+        e o nome da etapa atual.
+
+        Returns:
+            Tupla (lista de cards, dict {etapa_id: etapa})
+        """
+        snapshot = EtapasService.snapshot()
+        etapas = [snapshot.obter(etapa_id) for etapa_id in {card.etapa_atual_id for card in cards}]
+        etapas_por_id = {etapa.id: etapa for etapa in etapas if etapa is not None}
+
+        progresso = CardsService.progresso_checklist([card.id for card in cards])
+        sem_checklist = CardMobilizacao.calcular_progresso(0, 0)
+
+        cards_dict = []
+        for card in cards:
+            etapa = etapas_por_id.get(card.etapa_atual_id)
+            cards_dict.append(card.to_dict_listagem(
+                etapa.nome if etapa else None,
+                progresso.get(card.id, sem_checklist)
+            ))
+
+        return cards_dict, {str(etapa.id): etapa.to_dict() for etapa in etapas_por_id.values()}
@@ -0,0 +1,133 @@
+from src.models.mobilizacao import db, CardMobilizacao, DashboardContador
+from src.utils.consultas import incrementar
+from sqlalchemy import func
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class ContadoresService:
+    """
+    Manutenção dos contadores materializados do dashboard (dashboard_contadores).
+    """
+
+    @staticmethod
+    def chave(card):
+        """
+        Retorna a chave (etapa_id, status_etapa, centro_custo) do card nos contadores.
+        """
+        return (card.etapa_atual_id, card.status_etapa or '', card.centro_custo or '')
+
+    @staticmethod
+    def registrar_transicao(antes, depois):
+        """
+        Ajusta os contadores na transação atual quando um card muda de chave.
+
+        Args:
+            antes: Chave do card antes da alteração (None na criação)
+            depois: Chave do card após a alteração (None na exclusão)
+        """
+        if antes == depois:
+            return
+
+        tabela = DashboardContador.__table__
+        if antes is not None:
+            incrementar(tabela, ContadoresService._colunas(antes), 'total', -1)
+        if depois is not None:
+            incrementar(tabela, ContadoresService._colunas(depois), 'total', 1)
+
+    @staticmethod
+    def _colunas(chave):
+        etapa_id, status_etapa, centro_custo = chave
+        return {
+            'etapa_id': etapa_id,
+            'status_etapa': status_etapa,
+            'centro_custo': centro_custo
+        }
+
+    @staticmethod
+    def ler_por_etapa(centro_custo=None):
+        """
+        Lê os contadores agregados por etapa e status.
+
+        Returns:
+            Dict {etapa_id: {status_etapa: total}}
+        """
+        query = db.session.query(
+            DashboardContador.etapa_id,
+            DashboardContador.status_etapa,
+            func.sum(DashboardContador.total)
+        )
+
+        if centro_custo:
+            query = query.filter(DashboardContador.centro_custo == centro_custo)
+
+        resultado = {}
+        for etapa_id, status_etapa, total in query.group_by(
+            DashboardContador.etapa_id, DashboardContador.status_etapa
+        ).all():
+            if total:
+                resultado.setdefault(etapa_id, {})[status_etapa] = total
+
+        return resultado
+
+    @staticmethod
+    def reconciliar():
+        """
+        Recalcula os contadores a partir de cards_mobilizacao e corrige divergências.
+
+        Returns:
+            Dict com o número de divergências e seus detalhes (chave, esperado, registrado)
+        """
+        esperado = {}
+        for etapa_id, status_etapa, centro_custo, total in db.session.query(
+            CardMobilizacao.etapa_atual_id,
+            CardMobilizacao.status_etapa,
+            CardMobilizacao.centro_custo,
+            func.count(CardMobilizacao.id)
+        ).group_by(
+            CardMobilizacao.etapa_atual_id,
+            CardMobilizacao.status_etapa,
+            CardMobilizacao.centro_custo
+        ).all():
+            chave = (etapa_id, status_etapa or '', centro_custo or '')
+            esperado[chave] = esperado.get(chave, 0) + total
+
+        registrados = {
+            (contador.etapa_id, contador.status_etapa, contador.centro_custo): contador
+            for contador in DashboardContador.query.all()
+        }
+
+        detalhes = []
+        for chave in set(esperado) | set(registrados):
+            total_esperado = esperado.get(chave, 0)
+            contador = registrados.get(chave)
+            total_registrado = contador.total if contador else 0
+
+            if total_esperado == total_registrado:
+                continue
+
+            detalhes.append({
+                'etapa_id': chave[0],
+                'status_etapa': chave[1],
+                'centro_custo': chave[2],
+                'esperado': total_esperado,
+                'registrado': total_registrado
+            })
+
+            if contador is None:
+                db.session.add(DashboardContador(**ContadoresService._colunas(chave), total=total_esperado))
+            elif total_esperado == 0:
+                db.session.delete(contador)
+            else:
+                contador.total = total_esperado
+
+        db.session.commit()
+
+        if detalhes:
+            logger.warning(f"Contadores do dashboard divergentes corrigidos: {len(detalhes)}")
+
+        return {
+            'divergencias': len(detalhes),
+            'detalhes': detalhes
+        }
@@ -0,0 +1,305 @@
+"""
+Entrega de emails com conexões SMTP reutilizáveis.
+
+Um PoolSMTP mantém sessões já autenticadas (STARTTLS + LOGIN feitos uma vez
+por conexão) e o EntregadorEmail divide cada lote entre algumas threads, cada
+uma enviando sua parte em sequência pela mesma sessão. Quedas de conexão e
+respostas 421 (serviço encerrando a sessão) levam à reconexão e nova
+tentativa da mensagem; as demais respostas 4xx e 5xx são falhas apenas da
+mensagem, e a sessão segue com as próximas.
+
+As threads só conversam com o servidor SMTP: a atualização das notificações
+no banco fica com quem chamou enviar_lote.
+"""
+
+import logging
+import os
+import smtplib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+
+class PoolSMTP:
+    """
+    Pool de conexões SMTP autenticadas, seguro entre threads.
+    """
+
+    def __init__(self, host, porta, usuario=None, senha=None, usar_tls=True, tamanho=4,
+                 timeout=30, max_mensagens_por_conexao=500, ociosidade_max=60):
+        self.host = host
+        self.porta = porta
+        self.usuario = usuario
+        self.senha = senha
+        self.usar_tls = usar_tls
+        self.tamanho = max(tamanho, 1)
+        self.timeout = timeout
+        self.max_mensagens_por_conexao = max_mensagens_por_conexao
+        self.ociosidade_max = ociosidade_max
+
+        # Conexões livres: (smtp, mensagens enviadas, momento da devolução)
+        self._livres = []
+        self._lock = threading.Lock()
+        self._vagas = threading.BoundedSemaphore(self.tamanho)
+
+        self.conexoes_abertas = 0
+
+    def _conectar(self):
+        smtp = smtplib.SMTP(self.host, self.porta, timeout=self.timeout)
+        try:
+            if self.usar_tls:
+                smtp.starttls()
+            if self.usuario:
+                smtp.login(self.usuario, self.senha)
+        except Exception:
+            PoolSMTP._fechar(smtp)
+            raise
+
+        with self._lock:
+            self.conexoes_abertas += 1
+        return smtp
+
+    @staticmethod
+    def _fechar(smtp):
+        try:
+            smtp.quit()
+        except Exception:
+            smtp.close()
+
+    def obter(self):
+        """
+        Retorna (smtp, mensagens enviadas) de uma conexão livre ou nova.
+        Bloqueia enquanto todas as conexões do pool estiverem em uso.
+        """
+        self._vagas.acquire()
+        try:
+            while True:
+                with self._lock:
+                    item = self._livres.pop() if self._livres else None
+
+                if item is None:
+                    return self._conectar(), 0
+
+                smtp, enviadas, devolvida_em = item
+                if time.monotonic() - devolvida_em < self.ociosidade_max:
+                    return smtp, enviadas
+
+                # Conexão ociosa há muito tempo: o servidor pode tê-la encerrado
+                try:
+                    if smtp.noop()[0] == 250:
+                        return smtp, enviadas
+                except smtplib.SMTPException:
+                    pass
+                PoolSMTP._fechar(smtp)
+        except Exception:
+            self._vagas.release()
+            raise
+
+    def devolver(self, smtp, enviadas, valida=True):
+        """
+        Devolve a conexão ao pool; conexões inválidas ou muito usadas são fechadas.
+        """
+        try:
+            if valida and enviadas < self.max_mensagens_por_conexao:
+                with self._lock:
+                    self._livres.append((smtp, enviadas, time.monotonic()))
+            else:
+                PoolSMTP._fechar(smtp)
+        finally:
+            self._vagas.release()
+
+    def fechar(self):
+        """
+        Encerra as conexões livres.
+        """
+        with self._lock:
+            livres, self._livres = self._livres, []
+        for smtp, _, _ in livres:
+            PoolSMTP._fechar(smtp)
+
+
+def _erro_de_sessao(erro):
+    """
+    Indica se o erro invalida a sessão SMTP (queda, timeout ou 421), caso em
+    que a mensagem é tentada de novo em outra conexão. Recusas 4xx/5xx de um
+    remetente, destinatário ou conteúdo não afetam a sessão.
+    """
+    if isinstance(erro, smtplib.SMTPServerDisconnected):
+        return True
+    if isinstance(erro, smtplib.SMTPRecipientsRefused):
+        return any(codigo == 421 for codigo, _ in erro.recipients.values())
+    if isinstance(erro, smtplib.SMTPResponseException):
+        return erro.smtp_code == 421
+    # Erros de socket; as demais SMTPException (também OSError) são da mensagem
+    return isinstance(erro, OSError) and not isinstance(erro, smtplib.SMTPException)
+
+
+class EntregadorEmail:
+    """
+    Envia lotes de mensagens em paralelo sobre as conexões de um PoolSMTP.
+    """
+
+    def __init__(self, pool, paralelismo=4, tentativas=3):
+        self.pool = pool
+        self.paralelismo = max(paralelismo, 1)
+        self.tentativas = max(tentativas, 1)
+
+        self._lock = threading.Lock()
+
+        # Contadores acumulados expostos em estatisticas()
+        self.enviadas = 0
+        self.falhas = 0
+        self.reconexoes = 0
+        self.lotes = 0
+
+    def enviar_lote(self, mensagens):
+        """
+        Envia as mensagens e retorna o resultado de cada uma.
+
+        Args:
+            mensagens: Lista de (chave, email.message.Message)
+
+        Returns:
+            Dict com 'resultados' ({chave: None se enviada, ou o erro}),
+            'enviadas', 'falhas', 'reconexoes', 'duracao' e 'mensagens_por_segundo'
+        """
+        inicio = time.perf_counter()
+        resultados = {}
+        reconexoes = 0
+
+        if mensagens:
+            partes = min(self.paralelismo, len(mensagens))
+            blocos = [mensagens[indice::partes] for indice in range(partes)]
+
+            if partes == 1:
+                parciais = [self._enviar_sequencial(blocos[0])]
+            else:
+                with ThreadPoolExecutor(max_workers=partes, thread_name_prefix='entrega-email') as executor:
+                    parciais = list(executor.map(self._enviar_sequencial, blocos))
+
+            for parcial, reconexoes_parcial in parciais:
+                resultados.update(parcial)
+                reconexoes += reconexoes_parcial
+
+        duracao = time.perf_counter() - inicio
+        enviadas = sum(1 for erro in resultados.values() if erro is None)
+        falhas = len(resultados) - enviadas
+
+        with self._lock:
+            self.enviadas += enviadas
+            self.falhas += falhas
+            self.reconexoes += reconexoes
+            self.lotes += 1
+
+        return {
+            'resultados': resultados,
+            'enviadas': enviadas,
+            'falhas': falhas,
+            'reconexoes': reconexoes,
+            'duracao': duracao,
+            'mensagens_por_segundo': enviadas / duracao if duracao > 0 else 0.0
+        }
+
+    def _enviar_sequencial(self, mensagens):
+        """Envia as mensagens de um bloco reaproveitando uma única sessão SMTP"""
+        resultados = {}
+        reconexoes = 0
+        smtp = None
+        enviadas_na_conexao = 0
+
+        for indice, (chave, mensagem) in enumerate(mensagens):
+            erro = None
+            for _ in range(self.tentativas):
+                if smtp is None:
+                    try:
+                        smtp, enviadas_na_conexao = self.pool.obter()
+                    except Exception as e:
+                        # Servidor indisponível: as demais mensagens do bloco ficam para a próxima tentativa
+                        logger.error(f"Erro ao conectar ao servidor SMTP: {str(e)}")
+                        for chave_pendente, _ in mensagens[indice:]:
+                            resultados[chave_pendente] = e
+                        return resultados, reconexoes
+
+                try:
+                    smtp.send_message(mensagem)
+                    enviadas_na_conexao += 1
+                    erro = None
+                    break
+                except Exception as e:
+                    erro = e
+                    if not _erro_de_sessao(e):
+                        # Falha apenas da mensagem (ex: 450 de greylisting, 550): a sessão continua utilizável
+                        break
+                    self.pool.devolver(smtp, enviadas_na_conexao, valida=False)
+                    smtp = None
+                    reconexoes += 1
+
+            resultados[chave] = erro
+            if erro is not None:
+                logger.error(f"Erro ao enviar email: {str(erro)}")
+
+        if smtp is not None:
+            self.pool.devolver(smtp, enviadas_na_conexao)
+
+        return resultados, reconexoes
+
+    def estatisticas(self):
+        """
+        Retorna os contadores acumulados do entregador.
+        """
+        with self._lock:
+            return {
+                'enviadas': self.enviadas,
+                'falhas': self.falhas,
+                'reconexoes': self.reconexoes,
+                'lotes': self.lotes,
+                'conexoes_abertas': self.pool.conexoes_abertas
+            }
+
+
+# Entregador compartilhado pelo processo (criado na primeira entrega)
+_entregador = None
+_pid_entregador = None
+_lock_entregador = threading.Lock()
+
+
+def obter_entregador():
+    """
+    Retorna o entregador do processo, configurado pelas variáveis de ambiente SMTP_*.
+    """
+    global _entregador, _pid_entregador
+
+    with _lock_entregador:
+        # Após um fork, o filho não reaproveita as conexões herdadas do pai
+        if _entregador is None or _pid_entregador != os.getpid():
+            _pid_entregador = os.getpid()
+            pool = PoolSMTP(
+                host=os.environ.get('SMTP_SERVER', 'smtp.example.com'),
+                porta=int(os.environ.get('SMTP_PORT', 587)),
+                usuario=os.environ.get('SMTP_USER', 'user@example.com'),
+                senha=os.environ.get('SMTP_PASSWORD', 'password'),
+                usar_tls=os.environ.get('SMTP_STARTTLS', 'true').lower() == 'true',
+                tamanho=int(os.environ.get('SMTP_POOL_TAMANHO', 4)),
+                timeout=int(os.environ.get('SMTP_TIMEOUT', 30))
+            )
+            _entregador = EntregadorEmail(
+                pool,
+                paralelismo=int(os.environ.get('SMTP_PARALELISMO', 4)),
+                tentativas=int(os.environ.get('SMTP_TENTATIVAS', 3))
+            )
+
+        return _entregador
+
+
+def encerrar_entregador():
+    """
+    Fecha as conexões do entregador do processo (usado no desligamento do worker).
+    """
+    global _entregador
+
+    with _lock_entregador:
+        if _entregador is not None:
+            _entregador.pool.fechar()
+            _entregador = None
@@ -0,0 +1,189 @@
+from src.models.mobilizacao import db, EtapaProcesso, ChecklistEtapa, Grupo, VersaoDados, etapa_grupo
+from src.utils.versoes import ao_alterar, incrementar_versao
+from sqlalchemy import event
+import os
+import threading
+import time
+
+# Snapshot das etapas do processo, compartilhado entre as requisições do
+# processo. A versão em versoes_dados é consultada no máximo a cada
+# ETAPAS_VERSAO_INTERVALO segundos para detectar alterações de outros workers.
+_INTERVALO_VERSAO = float(os.environ.get('ETAPAS_VERSAO_INTERVALO', 5))
+_estado = {'snapshot': None, 'verificado_em': 0.0}
+_lock = threading.Lock()
+
+
+class ItemChecklistSnapshot:
+    """
+    Item de checklist (modelo) de uma etapa, imutável.
+    """
+    __slots__ = ('id', 'tarefa', 'descricao', 'obrigatorio', 'ordem', 'ativo')
+
+    def __init__(self, id, tarefa, descricao, obrigatorio, ordem, ativo):
+        self.id = id
+        self.tarefa = tarefa
+        self.descricao = descricao
+        self.obrigatorio = obrigatorio
+        self.ordem = ordem
+        self.ativo = ativo
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'tarefa': self.tarefa,
+            'descricao': self.descricao,
+            'obrigatorio': self.obrigatorio,
+            'ordem': self.ordem,
+            'ativo': self.ativo
+        }
+
+
+class EtapaSnapshot:
+    """
+    Etapa do processo, imutável, com os mesmos campos de EtapaProcesso.
+
+    Attributes:
+        grupos_permitidos: Tupla com os nomes dos grupos permitidos
+        grupo_ids: frozenset com os ids dos grupos permitidos
+        checklist_items: Tupla de ItemChecklistSnapshot ordenada por ordem
+    """
+    __slots__ = ('id', 'nome', 'descricao', 'ordem', 'prazo_dias', 'dias_alerta_inatividade',
+                 'dono_email', 'ativo', 'grupos_permitidos', 'grupo_ids', 'checklist_items')
+
+    def __init__(self, etapa, grupos, checklist_items):
+        self.id = etapa.id
+        self.nome = etapa.nome
+        self.descricao = etapa.descricao
+        self.ordem = etapa.ordem
+        self.prazo_dias = etapa.prazo_dias
+        self.dias_alerta_inatividade = etapa.dias_alerta_inatividade
+        self.dono_email = etapa.dono_email
+        self.ativo = etapa.ativo
+        self.grupos_permitidos = tuple(nome for _, nome in grupos)
+        self.grupo_ids = frozenset(grupo_id for grupo_id, _ in grupos)
+        self.checklist_items = tuple(checklist_items)
+
+    def checklist_ativo(self):
+        return [item for item in self.checklist_items if item.ativo]
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'nome': self.nome,
+            'descricao': self.descricao,
+            'ordem': self.ordem,
+            'prazo_dias': self.prazo_dias,
+            'dias_alerta_inatividade': self.dias_alerta_inatividade,
+            'dono_email': self.dono_email,
+            'ativo': self.ativo,
+            'grupos_permitidos': list(self.grupos_permitidos),
+            'checklist': [item.to_dict() for item in self.checklist_ativo()]
+        }
+
+
+class SnapshotEtapas:
+    """
+    Todas as etapas do processo (ativas e inativas) em uma versão.
+    """
+    __slots__ = ('versao', 'etapas', '_por_id')
+
+    def __init__(self, versao, etapas):
+        self.versao = versao
+        self.etapas = tuple(sorted(etapas, key=lambda etapa: etapa.ordem))
+        self._por_id = {etapa.id: etapa for etapa in self.etapas}
+
+    def obter(self, etapa_id):
+        return self._por_id.get(etapa_id)
+
+    def ativas(self):
+        return [etapa for etapa in self.etapas if etapa.ativo]
+
+    def primeira_ativa(self):
+        return next((etapa for etapa in self.etapas if etapa.ativo), None)
+
+
+class EtapasService:
+    """
+    Snapshot em memória das etapas do processo (ordem, checklist e grupos
+    permitidos), lido pelas rotas no lugar de consultas a etapas_processo.
+    """
+
+    @staticmethod
+    def _versao_atual():
+        return db.session.query(VersaoDados.versao).filter_by(nome='etapas').scalar() or 0
+
+    @staticmethod
+    def carregar(versao):
+        """
+        Monta o snapshot com três consultas (etapas, grupos e checklist).
+        """
+        grupos = {}
+        for etapa_id, grupo_id, nome in db.session.query(
+            etapa_grupo.c.etapa_id, Grupo.id, Grupo.nome
+        ).join(Grupo, Grupo.id == etapa_grupo.c.grupo_id).order_by(Grupo.id):
+            grupos.setdefault(etapa_id, []).append((grupo_id, nome))
+
+        itens = {}
+        for item in db.session.query(ChecklistEtapa).order_by(ChecklistEtapa.ordem, ChecklistEtapa.id):
+            itens.setdefault(item.etapa_id, []).append(ItemChecklistSnapshot(
+                item.id, item.tarefa, item.descricao, item.obrigatorio, item.ordem, item.ativo
+            ))
+
+        etapas = [
+            EtapaSnapshot(etapa, grupos.get(etapa.id, []), itens.get(etapa.id, []))
+            for etapa in db.session.query(EtapaProcesso)
+        ]
+
+        return SnapshotEtapas(versao, etapas)
+
+    @staticmethod
+    def snapshot():
+        """
+        Retorna o snapshot das etapas, recarregando-o se a versão mudou.
+        """
+        snapshot = _estado['snapshot']
+        if snapshot is not None and time.monotonic() - _estado['verificado_em'] < _INTERVALO_VERSAO:
+            return snapshot
+
+        with _lock:
+            versao = EtapasService._versao_atual()
+            snapshot = _estado['snapshot']
+            if snapshot is None or snapshot.versao != versao:
+                snapshot = EtapasService.carregar(versao)
+                _estado['snapshot'] = snapshot
+            _estado['verificado_em'] = time.monotonic()
+
+        return snapshot
+
+    @staticmethod
+    def registrar_alteracao():
+        """
+        Incrementa a versão das etapas na transação atual (chamar antes do
+        commit de qualquer alteração de etapas, checklist ou nomes de grupos).
+        Após o commit, o snapshot deste processo é descartado; os demais
+        processos o recarregam na próxima verificação da versão.
+        """
+        incrementar_versao('etapas')
+        event.listen(db.session(), 'after_commit', lambda sessao: EtapasService.invalidar(), once=True)
+
+    @staticmethod
+    def invalidar():
+        """
+        Descarta o snapshot do processo (ex: outro banco nos testes).
+        """
+        with _lock:
+            _estado['snapshot'] = None
+            _estado['verificado_em'] = 0.0
+
+    @staticmethod
+    def verificar_versao(versao):
+        """
+        Descarta o snapshot se a versão lida no banco (ex: pelo ETag das
+        rotas) for diferente da sua.
+        """
+        snapshot = _estado['snapshot']
+        if snapshot is not None and snapshot.versao != versao:
+            EtapasService.invalidar()
+
+
+ao_alterar('etapas', EtapasService.verificar_versao)
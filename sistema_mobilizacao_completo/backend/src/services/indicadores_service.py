@@ -0,0 +1,203 @@
+from src.models.mobilizacao import db, CardMobilizacao, EtapaProcesso, HistoricoMovimentacao
+from src.services.contadores_service import ContadoresService
+from datetime import datetime, timedelta
+from sqlalchemy import func, and_, case, select
+
+
+def _contar_se(condicao):
+    return func.sum(case((condicao, 1), else_=0))
+
+
+class IndicadoresService:
+    """
+    Cálculo dos indicadores do dashboard com consultas agrupadas.
+    O número de consultas não depende da quantidade de etapas.
+    """
+
+    @staticmethod
+    def calcular(centro_custo=None, data_inicio=None):
+        """
+        Calcula resumo, indicadores por etapa, tempo médio, responsáveis e tendências.
+        """
+        agora = datetime.utcnow()
+        limite_vencendo = agora + timedelta(days=2)
+
+        etapas = EtapaProcesso.query.filter_by(ativo=True).order_by(EtapaProcesso.ordem).all()
+
+        por_etapa_id = IndicadoresService.contar_por_etapa(agora, limite_vencendo, centro_custo)
+
+        # Resumo geral (inclui cards em etapas inativas)
+        resumo = {
+            'total_cards': 0,
+            'cards_em_andamento': 0,
+            'cards_finalizados': 0,
+            'cards_atrasados': 0,
+            'cards_vencendo': 0
+        }
+        for contagem in por_etapa_id.values():
+            resumo['total_cards'] += contagem['total']
+            resumo['cards_em_andamento'] += contagem['nao_finalizado']
+            resumo['cards_finalizados'] += contagem['finalizado']
+            resumo['cards_atrasados'] += contagem['atrasados']
+            resumo['cards_vencendo'] += contagem['vencendo']
+
+        # Cards por etapa
+        por_etapa = []
+        for etapa in etapas:
+            contagem = por_etapa_id.get(etapa.id, {})
+            por_etapa.append({
+                'etapa': etapa.nome,
+                'total': contagem.get('total', 0),
+                'nao_iniciado': contagem.get('nao_iniciado', 0),
+                'em_andamento': contagem.get('em_andamento', 0),
+                'finalizado': contagem.get('finalizado', 0),
+                'atrasados': contagem.get('atrasados', 0)
+            })
+
+        # Tempo médio por etapa (baseado no histórico)
+        medias = dict(
+            db.session.query(
+                HistoricoMovimentacao.etapa_origem_id,
+                func.avg(HistoricoMovimentacao.tempo_permanencia_dias)
+            ).group_by(HistoricoMovimentacao.etapa_origem_id).all()
+        )
+
+        tempo_medio_etapas = []
+        for etapa in etapas:
+            tempo_medio = medias.get(etapa.id)
+            tempo_medio_etapas.append({
+                'etapa': etapa.nome,
+                'tempo_medio_dias': round(float(tempo_medio), 1) if tempo_medio else 0,
+                'prazo_configurado': etapa.prazo_dias
+            })
+
+        return {
+            'resumo': resumo,
+            'por_etapa': por_etapa,
+            'tempo_medio_etapas': tempo_medio_etapas,
+            'cards_por_responsavel': IndicadoresService.cards_por_responsavel(agora),
+            'tendencias': IndicadoresService.tendencias(data_inicio, centro_custo) if data_inicio else {}
+        }
+
+    @staticmethod
+    def contar_por_etapa(agora, limite_vencendo, centro_custo=None):
+        """
+        Conta cards por etapa e status.
+
+        Os totais por status vêm dos contadores materializados (dashboard_contadores);
+        atrasados e vencendo dependem do horário atual e são contados no banco,
+        restritos aos cards não finalizados com prazo até limite_vencendo.
+
+        Returns:
+            Dict {etapa_id: {total, nao_iniciado, em_andamento, finalizado,
+                             nao_finalizado, atrasados, vencendo}}
+        """
+        resultado = {}
+        for etapa_id, por_status in ContadoresService.ler_por_etapa(centro_custo).items():
+            finalizado = por_status.get('FINALIZADO', 0)
+            sem_status = por_status.get('', 0)
+            total = sum(por_status.values())
+            resultado[etapa_id] = {
+                'total': total,
+                'nao_iniciado': por_status.get('NAO_INICIADO', 0),
+                'em_andamento': por_status.get('EM_ANDAMENTO', 0),
+                'finalizado': finalizado,
+                'nao_finalizado': total - finalizado - sem_status,
+                'atrasados': 0,
+                'vencendo': 0
+            }
+
+        query = db.session.query(
+            CardMobilizacao.etapa_atual_id,
+            _contar_se(CardMobilizacao.prazo_etapa < agora),
+            _contar_se(CardMobilizacao.prazo_etapa >= agora)
+        ).filter(
+            CardMobilizacao.status_etapa != 'FINALIZADO',
+            CardMobilizacao.prazo_etapa <= limite_vencendo
+        )
+
+        if centro_custo:
+            query = query.filter(CardMobilizacao.centro_custo == centro_custo)
+
+        for etapa_id, atrasados, vencendo in query.group_by(CardMobilizacao.etapa_atual_id).all():
+            contagem = resultado.setdefault(etapa_id, {
+                'total': 0, 'nao_iniciado': 0, 'em_andamento': 0,
+                'finalizado': 0, 'nao_finalizado': 0
+            })
+            contagem['atrasados'] = atrasados or 0
+            contagem['vencendo'] = vencendo or 0
+
+        return resultado
+
+    @staticmethod
+    def cards_por_responsavel(agora):
+        """
+        Conta cards e atrasos por responsável atual.
+        """
+        cards_por_responsavel = db.session.query(
+            CardMobilizacao.responsavel_atual,
+            func.count(CardMobilizacao.id).label('total'),
+            _contar_se(
+                and_(CardMobilizacao.prazo_etapa < agora,
+                     CardMobilizacao.status_etapa != 'FINALIZADO')
+            ).label('atrasados')
+        ).filter(
+            CardMobilizacao.responsavel_atual.isnot(None)
+        ).group_by(CardMobilizacao.responsavel_atual).all()
+
+        return [
+            {
+                'responsavel': responsavel,
+                'total': total,
+                'atrasados': atrasados or 0
+            }
+            for responsavel, total, atrasados in cards_por_responsavel
+        ]
+
+    @staticmethod
+    def tendencias(data_inicio, centro_custo=None):
+        """
+        Calcula criação, finalização e tempo médio do processo a partir de data_inicio.
+        """
+        cards_query = CardMobilizacao.query
+        if centro_custo:
+            cards_query = cards_query.filter(CardMobilizacao.centro_custo == centro_custo)
+
+        cards_criados_periodo = cards_query.filter(
+            CardMobilizacao.data_criacao >= data_inicio
+        ).count()
+
+        # Última etapa do processo, avaliada no próprio banco
+        ultima_ordem = select(func.max(EtapaProcesso.ordem)).scalar_subquery()
+
+        cards_finalizados_periodo = HistoricoMovimentacao.query.join(
+            EtapaProcesso, HistoricoMovimentacao.etapa_destino_id == EtapaProcesso.id
+        ).filter(
+            and_(
+                HistoricoMovimentacao.data_movimentacao >= data_inicio,
+                EtapaProcesso.ordem == ultima_ordem
+            )
+        ).count()
+
+        # Tempo médio do processo completo
+        tempo_medio_processo = db.session.query(
+            func.avg(
+                func.julianday(HistoricoMovimentacao.data_movimentacao) -
+                func.julianday(CardMobilizacao.data_criacao)
+            )
+        ).join(
+            CardMobilizacao, HistoricoMovimentacao.card_id == CardMobilizacao.id
+        ).join(
+            EtapaProcesso, HistoricoMovimentacao.etapa_destino_id == EtapaProcesso.id
+        ).filter(
+            and_(
+                HistoricoMovimentacao.data_movimentacao >= data_inicio,
+                EtapaProcesso.ordem == ultima_ordem
+            )
+        ).scalar()
+
+        return {
+            'cards_criados_periodo': cards_criados_periodo,
+            'cards_finalizados_periodo': cards_finalizados_periodo,
+            'tempo_medio_processo': round(float(tempo_medio_processo), 1) if tempo_medio_processo else 0
+        }
@@ -0,0 +1,305 @@
+"""
+Monitor de prazos em memória.
+
+Mantém um heap com os próximos momentos em que cada card ativo passa a
+merecer um alerta: prazo - 2 dias (PRAZO_VENCENDO), prazo (PRAZO_VENCIDO) e
+última atualização + dias_alerta_inatividade da etapa (CARD_INATIVO). O heap
+é carregado uma vez e atualizado a partir dos cards alterados desde a última
+sincronização (consulta pelo índice de ultima_atualizacao, que as rotas de
+atualizar e mover atualizam), de modo que os alertas saem segundos depois do
+limite sem varrer a tabela de cards periodicamente.
+
+Cada entrada carrega a versão do card (prazo, última atualização, etapa,
+status) do momento em que foi criada; entradas de versões antigas são
+descartadas ao sair do heap.
+
+Com várias instâncias do agendador, só o monitor que detém o lease da linha
+monitor_prazos de execucoes_agendador (renovado a cada sincronização)
+dispara alertas; os demais aguardam em espera e carregam o heap ao assumir
+o lease. Disparos simultâneos com as verificações periódicas (ou de um
+monitor cujo lease expirou) são barrados pelo índice único dos alertas em
+notificacoes.
+
+As verificações periódicas do agendador continuam responsáveis pelos
+lembretes diários e por mudanças que o monitor não acompanha (ex:
+dias_alerta_inatividade alterado na etapa).
+"""
+
+import heapq
+import itertools
+import logging
+import os
+import socket
+import threading
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import update, or_
+from sqlalchemy.exc import IntegrityError
+
+from src.models.mobilizacao import db, CardMobilizacao, EtapaProcesso, ExecucaoAgendador
+from src.services.notificacao_service import NotificacaoService
+
+logger = logging.getLogger(__name__)
+
+# Linha de execucoes_agendador com o lease do monitor
+TAREFA_MONITOR = 'monitor_prazos'
+
+
+class MonitorPrazos:
+    """
+    Heap de alertas de prazo e inatividade de um processo.
+    """
+
+    def __init__(self, intervalo_sincronizacao=None, tamanho_bloco=None, duracao_lease=None):
+        self.intervalo_sincronizacao = intervalo_sincronizacao or int(
+            os.environ.get('MONITOR_PRAZOS_SINCRONIZACAO', 5)
+        )
+        self.tamanho_bloco = tamanho_bloco or int(os.environ.get('MONITOR_PRAZOS_BLOCO', 1000))
+        # Alterações gravadas com ultima_atualizacao um pouco anterior ao
+        # commit continuam visíveis para a sincronização seguinte
+        self.margem = timedelta(seconds=int(os.environ.get('MONITOR_PRAZOS_MARGEM', 60)))
+        # Deve cobrir com folga o intervalo de sincronização (e a carga do heap)
+        self.duracao_lease = duracao_lease or int(os.environ.get('MONITOR_PRAZOS_LEASE', 60))
+        self.dono = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        # Indica se este monitor detém o lease e mantém o heap atualizado
+        self.ativo = False
+
+        # (momento, sequência, card_id, tipo, versão)
+        self._heap = []
+        self._sequencia = itertools.count()
+        # card_id -> versão atual do card
+        self._versoes = {}
+        self._marca = None
+
+        # Cards alterados neste processo, avisados pelas rotas
+        self._alterados = set()
+        self._lock = threading.Lock()
+
+        self.disparos = 0
+
+    def _consulta(self):
+        return db.session.query(
+            CardMobilizacao.id,
+            CardMobilizacao.prazo_etapa,
+            CardMobilizacao.ultima_atualizacao,
+            CardMobilizacao.etapa_atual_id,
+            CardMobilizacao.status_etapa,
+            EtapaProcesso.dias_alerta_inatividade,
+            EtapaProcesso.ativo.label('etapa_ativa')
+        ).outerjoin(
+            EtapaProcesso, CardMobilizacao.etapa_atual_id == EtapaProcesso.id
+        )
+
+    def _registrar(self, card, agora, incluir_vencidos):
+        """
+        Atualiza a versão do card e empilha os seus próximos alertas. Com
+        incluir_vencidos, limites já ultrapassados disparam na próxima passagem.
+        """
+        if card.status_etapa == 'FINALIZADO':
+            self._versoes.pop(card.id, None)
+            return
+
+        versao = (card.prazo_etapa, card.ultima_atualizacao, card.etapa_atual_id, card.status_etapa)
+        if self._versoes.get(card.id) == versao:
+            return
+        self._versoes[card.id] = versao
+
+        momentos = []
+        if card.prazo_etapa:
+            momentos.append((card.prazo_etapa - timedelta(days=2), 'PRAZO_VENCENDO'))
+            momentos.append((card.prazo_etapa, 'PRAZO_VENCIDO'))
+        if card.dias_alerta_inatividade and card.etapa_ativa and card.ultima_atualizacao:
+            momentos.append((card.ultima_atualizacao + timedelta(days=card.dias_alerta_inatividade), 'CARD_INATIVO'))
+
+        for momento, tipo in momentos:
+            if momento > agora or incluir_vencidos:
+                heapq.heappush(self._heap, (momento, next(self._sequencia), card.id, tipo, versao))
+
+    def carregar(self):
+        """
+        Monta o heap com todos os cards ativos. Apenas limites futuros entram:
+        os já ultrapassados são das verificações periódicas.
+        """
+        agora = datetime.utcnow()
+        self._heap = []
+        self._versoes = {}
+
+        consulta = self._consulta().filter(CardMobilizacao.status_etapa != 'FINALIZADO')
+        for card in db.session.execute(consulta.statement, execution_options={'yield_per': self.tamanho_bloco}):
+            self._registrar(card, agora, incluir_vencidos=False)
+
+        self._marca = agora - self.margem
+        logger.info(f"Monitor de prazos carregado: {len(self._versoes)} cards, {len(self._heap)} alertas")
+
+    def reservar(self, agora=None):
+        """
+        Reserva ou renova o lease do monitor, se estiver livre, expirado ou
+        já com este monitor.
+
+        Returns:
+            True se este monitor deve disparar os alertas
+        """
+        agora = agora or datetime.utcnow()
+
+        if db.session.get(ExecucaoAgendador, TAREFA_MONITOR) is None:
+            try:
+                db.session.add(ExecucaoAgendador(tarefa=TAREFA_MONITOR))
+                db.session.commit()
+            except IntegrityError:
+                # Outra instância criou a linha ao mesmo tempo
+                db.session.rollback()
+
+        resultado = db.session.execute(
+            update(ExecucaoAgendador).where(
+                ExecucaoAgendador.tarefa == TAREFA_MONITOR,
+                or_(
+                    ExecucaoAgendador.lease_dono == self.dono,
+                    ExecucaoAgendador.lease_ate.is_(None),
+                    ExecucaoAgendador.lease_ate < agora
+                )
+            ).values(
+                lease_dono=self.dono,
+                lease_ate=agora + timedelta(seconds=self.duracao_lease)
+            ).execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        return resultado.rowcount == 1
+
+    def liberar(self):
+        """Libera o lease, se ainda for deste monitor"""
+        db.session.execute(
+            update(ExecucaoAgendador).where(
+                ExecucaoAgendador.tarefa == TAREFA_MONITOR,
+                ExecucaoAgendador.lease_dono == self.dono
+            ).values(
+                lease_dono=None,
+                lease_ate=None
+            ).execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+
+    def marcar_alterado(self, card_id):
+        """Antecipa a atualização de um card alterado neste processo"""
+        with self._lock:
+            self._alterados.add(card_id)
+
+    def sincronizar(self):
+        """
+        Atualiza o heap com os cards alterados desde a última sincronização.
+
+        Returns:
+            Número de cards lidos
+        """
+        agora = datetime.utcnow()
+        with self._lock:
+            alterados, self._alterados = self._alterados, set()
+
+        condicao = CardMobilizacao.ultima_atualizacao >= self._marca
+        if alterados:
+            condicao = condicao | CardMobilizacao.id.in_(list(alterados))
+
+        cards = self._consulta().filter(condicao).all()
+        for card in cards:
+            self._registrar(card, agora, incluir_vencidos=True)
+
+        self._marca = agora - self.margem
+        return len(cards)
+
+    def disparar(self, agora=None):
+        """
+        Retira do heap os alertas vencidos e gera as notificações.
+
+        Returns:
+            Dict tipo -> notificações criadas
+        """
+        agora = agora or datetime.utcnow()
+
+        por_tipo = {}
+        while self._heap and self._heap[0][0] <= agora:
+            _, _, card_id, tipo, versao = heapq.heappop(self._heap)
+            if self._versoes.get(card_id) == versao:
+                por_tipo.setdefault(tipo, set()).add(card_id)
+
+        criadas = {}
+        for tipo, card_ids in por_tipo.items():
+            criadas[tipo] = len(NotificacaoService.notificar_cards(tipo, card_ids, agora))
+            self.disparos += criadas[tipo]
+        return criadas
+
+    def segundos_ate_proximo(self):
+        """Segundos até o próximo alerta do heap (None se vazio)"""
+        if not self._heap:
+            return None
+        return max((self._heap[0][0] - datetime.utcnow()).total_seconds(), 0.0)
+
+    def executar(self, parar):
+        """
+        Até o evento parar: enquanto detém o lease, sincroniza as alterações
+        e dispara os alertas vencidos; sem o lease, aguarda em espera. O heap
+        é carregado sempre que o monitor assume o lease.
+        """
+        try:
+            while not parar.is_set():
+                try:
+                    if self.reservar():
+                        if self.ativo:
+                            self.sincronizar()
+                        else:
+                            self.carregar()
+                            self.ativo = True
+                            logger.info(f"Monitor de prazos {self.dono} ativo")
+
+                        criadas = self.disparar()
+                        if criadas:
+                            logger.info(f"Monitor de prazos: notificações criadas {criadas}")
+                    elif self.ativo:
+                        # Lease assumido por outro monitor: o heap deixa de ser atualizado
+                        logger.info(f"Monitor de prazos {self.dono} em espera")
+                        self.ativo = False
+                        self._heap = []
+                        self._versoes = {}
+                except Exception as e:
+                    db.session.rollback()
+                    logger.error(f"Erro no monitor de prazos: {str(e)}")
+                finally:
+                    db.session.remove()
+
+                proximo = self.segundos_ate_proximo()
+                parar.wait(self.intervalo_sincronizacao if proximo is None else min(proximo, self.intervalo_sincronizacao))
+        finally:
+            if self.ativo:
+                try:
+                    self.liberar()
+                except Exception as e:
+                    db.session.rollback()
+                    logger.error(f"Erro ao liberar o lease do monitor de prazos: {str(e)}")
+                finally:
+                    db.session.remove()
+
+    def estatisticas(self):
+        return {
+            'ativo': self.ativo,
+            'cards': len(self._versoes),
+            'alertas': len(self._heap),
+            'disparos': self.disparos
+        }
+
+
+# Monitor em execução neste processo (se houver)
+_monitor = None
+
+
+def registrar_monitor(monitor):
+    """Define o monitor do processo, que passa a receber os avisos das rotas"""
+    global _monitor
+    _monitor = monitor
+
+
+def notificar_alteracao(card_id):
+    """
+    Avisa o monitor do processo que o card mudou. Monitores de outros processos
+    recebem a alteração pela sincronização periódica.
+    """
+    if _monitor is not None:
+        _monitor.marcar_alterado(card_id)
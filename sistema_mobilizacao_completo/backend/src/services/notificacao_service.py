@@ -1,107 +1,462 @@
-from src.models.mobilizacao import db, Notificacao, CardMobilizacao, EtapaProcesso, Usuario
+from src.models.mobilizacao import db, Notificacao, CardMobilizacao, EtapaProcesso, Usuario, ChecklistCard, ChecklistEtapa, MarcaVerificacao
 from datetime import datetime, timedelta
-import smtplib
+from sqlalchemy import select, insert, update, union, or_, func, literal, DateTime
+from sqlalchemy.dialects import postgresql, sqlite
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 import logging
 import os
+import random
+import socket
+import uuid
+
+from src.services.entrega_email import obter_entregador
+from src.utils.consultas import DiasDecorridos
+from src.utils.versoes import incrementar_versao
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Modos de entrega (NOTIFICACOES_MODO_ENTREGA): 'fila' grava a notificação como
+# pendente e deixa o envio para o worker; 'imediata' envia logo após o commit;
+# 'resumo' também usa a fila, mas o worker envia um email por destinatário
+MODO_ENTREGA_FILA = 'fila'
+MODO_ENTREGA_IMEDIATA = 'imediata'
+MODO_ENTREGA_RESUMO = 'resumo'
+
+# Títulos das seções do email de resumo
+TITULOS_RESUMO = {
+    'PRAZO_VENCIDO': 'Prazos vencidos',
+    'PRAZO_VENCENDO': 'Prazos próximos do vencimento',
+    'CARD_INATIVO': 'Cards sem atualização',
+    'CHECKLIST_PENDENTE': 'Checklists com itens obrigatórios pendentes',
+    'CARD_MOVIDO': 'Cards movidos'
+}
+
+# Alertas gerados pelas verificações e pelo MonitorPrazos: no máximo um por
+# card, tipo e dia (índice único ux_notificacoes_alerta), além do NOT EXISTS
+# das consultas, que não protege contra verificações concorrentes
+TIPOS_ALERTA = {'PRAZO_VENCIDO', 'PRAZO_VENCENDO', 'CARD_INATIVO', 'CHECKLIST_PENDENTE'}
+
+# INSERT com ON CONFLICT DO NOTHING por banco
+_INSERT_SEM_CONFLITO = {'postgresql': postgresql.insert, 'sqlite': sqlite.insert}
+
+def _config_int(nome, padrao):
+    return int(os.environ.get(nome, padrao))
+
 class NotificacaoService:
     """
     Serviço para gerenciar notificações e alertas do sistema.
     """
     
     @staticmethod
-    def verificar_prazos_vencidos():
+    def verificar_prazos_vencidos(completo=False, intervalo_completo=None):
         """
         Verifica cards com prazos vencidos ou próximos de vencer e gera notificações.
+        
+        Os candidatos são obtidos com uma consulta por tipo que já exclui os cards
+        notificados nas últimas 24h; as notificações são inseridas em uma única
+        transação e entregues em lote.
+        
+        No modo incremental (padrão), a partir da marca d'água da execução
+        anterior só são considerados os cards cujo prazo cruzou agora ou
+        agora + 2 dias desde então, ou que foram atualizados (inclusive
+        movidos de etapa) desde então. O modo completo, usado também quando
+        ainda não há marca, reavalia todos os cards e volta a lembrar os
+        prazos vencidos já notificados há mais de 24h. Com intervalo_completo
+        (segundos), a verificação passa a ser completa sempre que a última
+        completa tiver mais que esse intervalo.
+        
+        Returns:
+            Dict com o modo, os cards 'vencidos' e 'vencendo' considerados
+            (no modo completo, todos) e as notificações criadas
         """
-        hoje = datetime.utcnow().date()
+        agora = datetime.utcnow()
+        prazo_alerta = agora + timedelta(days=2)
+        
+        if not completo and intervalo_completo is not None:
+            ultima_completa = NotificacaoService._ler_marca('prazos_completo')
+            completo = ultima_completa is None or agora - ultima_completa >= timedelta(seconds=intervalo_completo)
+        
+        marca = None if completo else NotificacaoService._ler_marca('prazos')
+        
+        filtros_vencidos = NotificacaoService._filtros_alerta('PRAZO_VENCIDO', agora)
+        filtros_vencendo = NotificacaoService._filtros_alerta('PRAZO_VENCENDO', agora)
+        
+        if marca is not None:
+            # Cards que cruzaram o limite desde a marca, ou atualizados desde ela.
+            # O UNION deixa cada parte usar o seu índice (prazo e última
+            # atualização), sem percorrer todo o backlog vencido.
+            atualizados = select(CardMobilizacao.id).where(CardMobilizacao.ultima_atualizacao >= marca)
+            filtros_vencidos.append(CardMobilizacao.id.in_(union(
+                select(CardMobilizacao.id).where(
+                    CardMobilizacao.prazo_etapa >= marca, CardMobilizacao.prazo_etapa < agora
+                ),
+                atualizados
+            )))
+            filtros_vencendo.append(CardMobilizacao.id.in_(union(
+                select(CardMobilizacao.id).where(
+                    CardMobilizacao.prazo_etapa > marca + timedelta(days=2),
+                    CardMobilizacao.prazo_etapa <= prazo_alerta
+                ),
+                atualizados
+            )))
+        
+        candidatos_vencidos = NotificacaoService._candidatos('PRAZO_VENCIDO', agora, *filtros_vencidos)
+        candidatos_vencendo = NotificacaoService._candidatos('PRAZO_VENCENDO', agora, *filtros_vencendo)
+        
+        dados = [
+            NotificacaoService._dados_prazo_vencido(card, card.nome_etapa)
+            for card in candidatos_vencidos
+        ] + [
+            NotificacaoService._dados_prazo_vencendo(card, card.nome_etapa, agora)
+            for card in candidatos_vencendo
+        ]
+        
+        NotificacaoService._criar_notificacoes_em_lote(dados)
+        # A marca recua NOTIFICACOES_MARGEM_MARCA segundos: cards gravados com
+        # ultima_atualizacao anterior a agora, mas confirmados depois da leitura
+        # acima, entram na próxima execução (os já notificados são descartados
+        # pelo NOT EXISTS)
+        NotificacaoService._gravar_marca('prazos', agora - timedelta(seconds=_config_int('NOTIFICACOES_MARGEM_MARCA', 60)))
+        
+        if marca is None:
+            NotificacaoService._gravar_marca('prazos_completo', agora)
+            return {
+                'modo': 'completo',
+                'vencidos': CardMobilizacao.query.filter(*filtros_vencidos).count(),
+                'vencendo': CardMobilizacao.query.filter(*filtros_vencendo).count(),
+                'notificacoes_criadas': len(dados)
+            }
         
-        # Cards com prazo vencido
-        cards_vencidos = CardMobilizacao.query.filter(
-            CardMobilizacao.prazo_etapa < datetime.utcnow(),
-            CardMobilizacao.status_etapa != 'FINALIZADO'
-        ).all()
+        return {
+            'modo': 'incremental',
+            'vencidos': len(candidatos_vencidos),
+            'vencendo': len(candidatos_vencendo),
+            'notificacoes_criadas': len(dados)
+        }
+    
+    @staticmethod
+    def _filtros_alerta(tipo, agora):
+        """
+        Condições para um card receber o alerta do tipo (PRAZO_VENCIDO,
+        PRAZO_VENCENDO ou CARD_INATIVO); as de CARD_INATIVO exigem o join
+        com EtapaProcesso.
+        """
+        nao_finalizado = CardMobilizacao.status_etapa != 'FINALIZADO'
         
-        # Cards com prazo próximo de vencer (2 dias)
-        prazo_alerta = datetime.utcnow() + timedelta(days=2)
-        cards_vencendo = CardMobilizacao.query.filter(
-            CardMobilizacao.prazo_etapa <= prazo_alerta,
-            CardMobilizacao.prazo_etapa >= datetime.utcnow(),
-            CardMobilizacao.status_etapa != 'FINALIZADO'
-        ).all()
+        if tipo == 'PRAZO_VENCIDO':
+            return [CardMobilizacao.prazo_etapa < agora, nao_finalizado]
+        
+        if tipo == 'PRAZO_VENCENDO':
+            # Prazo próximo de vencer (2 dias)
+            return [
+                CardMobilizacao.prazo_etapa <= agora + timedelta(days=2),
+                CardMobilizacao.prazo_etapa >= agora,
+                nao_finalizado
+            ]
+        
+        return [
+            EtapaProcesso.dias_alerta_inatividade > 0,
+            EtapaProcesso.ativo == True,
+            nao_finalizado,
+            DiasDecorridos(CardMobilizacao.ultima_atualizacao, literal(agora, DateTime)) > EtapaProcesso.dias_alerta_inatividade
+        ]
+    
+    @staticmethod
+    def notificar_cards(tipo, card_ids, agora=None):
+        """
+        Gera o alerta do tipo para os cards informados que ainda atendem às
+        condições e não foram notificados nas últimas 24h (usado pelo
+        MonitorPrazos ao atingir o momento de cada alerta).
         
-        # Gerar notificações para cards vencidos
-        for card in cards_vencidos:
-            NotificacaoService.criar_notificacao_prazo_vencido(card)
+        Returns:
+            Lista das notificações criadas
+        """
+        if not card_ids:
+            return []
+        
+        agora = agora or datetime.utcnow()
+        candidatos = NotificacaoService._candidatos(
+            tipo, agora, CardMobilizacao.id.in_(list(card_ids)),
+            *NotificacaoService._filtros_alerta(tipo, agora)
+        )
         
-        # Gerar notificações para cards próximos de vencer
-        for card in cards_vencendo:
-            NotificacaoService.criar_notificacao_prazo_vencendo(card)
+        montar = {
+            'PRAZO_VENCIDO': lambda card: NotificacaoService._dados_prazo_vencido(card, card.nome_etapa),
+            'PRAZO_VENCENDO': lambda card: NotificacaoService._dados_prazo_vencendo(card, card.nome_etapa, agora),
+            'CARD_INATIVO': lambda card: NotificacaoService._dados_card_inativo(card, card.nome_etapa, agora)
+        }[tipo]
+        
+        return NotificacaoService._criar_notificacoes_em_lote([montar(card) for card in candidatos])
+    
+    @staticmethod
+    def _ler_marca(nome):
+        marca = db.session.get(MarcaVerificacao, nome)
+        return marca.valor if marca else None
+    
+    @staticmethod
+    def _gravar_marca(nome, valor):
+        db.session.merge(MarcaVerificacao(nome=nome, valor=valor))
+        db.session.commit()
+    
+    @staticmethod
+    def _candidatos(tipo, agora, *filtros):
+        """
+        Retorna os cards que atendem aos filtros e não receberam notificação do
+        tipo nas últimas 24h (anti-join via NOT EXISTS), com o nome da etapa.
+        """
+        notificacao_recente = NotificacaoService._notificacao_recente(tipo, agora)
+        
+        return db.session.query(
+            CardMobilizacao.id,
+            CardMobilizacao.nome_colaborador,
+            CardMobilizacao.etapa_atual_id,
+            CardMobilizacao.prazo_etapa,
+            CardMobilizacao.ultima_atualizacao,
+            CardMobilizacao.responsavel_atual,
+            EtapaProcesso.nome.label('nome_etapa')
+        ).join(
+            EtapaProcesso, CardMobilizacao.etapa_atual_id == EtapaProcesso.id
+        ).filter(
+            *filtros,
+            CardMobilizacao.responsavel_atual.isnot(None),
+            ~notificacao_recente.exists()
+        ).all()
+    
+    @staticmethod
+    def _notificacao_recente(tipo, agora):
+        """Subconsulta correlacionada: notificações do tipo para o card nas últimas 24h"""
+        return select(Notificacao.id).where(
+            Notificacao.tipo == tipo,
+            Notificacao.card_id == CardMobilizacao.id,
+            Notificacao.data_criacao >= agora - timedelta(hours=24)
+        )
+    
+    @staticmethod
+    def modo_entrega():
+        return os.environ.get('NOTIFICACOES_MODO_ENTREGA', MODO_ENTREGA_FILA)
+    
+    @staticmethod
+    def _reserva_entrega_imediata():
+        """
+        No modo de entrega imediata, retorna a reserva (lease_dono e lease_ate)
+        gravada no próprio INSERT das notificações: até o envio em linha, o
+        worker da fila não as reivindica. Nos demais modos, retorna None.
+        """
+        if NotificacaoService.modo_entrega() != MODO_ENTREGA_IMEDIATA:
+            return None
         
         return {
-            'vencidos': len(cards_vencidos),
-            'vencendo': len(cards_vencendo)
+            'lease_dono': f"imediata:{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}",
+            'lease_ate': datetime.utcnow() + timedelta(seconds=_config_int('NOTIFICACOES_LEASE_SEGUNDOS', 300))
         }
     
     @staticmethod
-    def verificar_cards_inativos():
+    def _entregar_reservadas(dono):
         """
-        Verifica cards sem atividade recente e gera notificações.
+        Envia, em blocos, as notificações ainda reservadas para dono (a reserva
+        pode ter expirado e passado a outro worker).
+        """
+        ultimo_id = 0
+        while True:
+            notificacoes = Notificacao.query.filter(
+                Notificacao.lease_dono == dono,
+                Notificacao.enviado == False,
+                Notificacao.id > ultimo_id
+            ).order_by(Notificacao.id).limit(500).all()
+            if not notificacoes:
+                break
+            
+            ultimo_id = notificacoes[-1].id
+            NotificacaoService.entregar_notificacoes(notificacoes)
+    
+    @staticmethod
+    def _preparar(dados, reserva=None):
+        """
+        Completa os dicts de colunas com a data de criação, a janela dos alertas
+        e a reserva de entrega imediata (se houver).
+        """
+        agora = datetime.utcnow()
+        return [
+            dict(item, data_criacao=agora, janela=agora.date() if item['tipo'] in TIPOS_ALERTA else None, **(reserva or {}))
+            for item in dados
+        ]
+    
+    @staticmethod
+    def _insert():
+        """
+        INSERT das notificações que ignora os alertas já gravados no mesmo dia
+        por uma verificação concorrente (conflito no índice único).
         """
-        cards_inativos = []
+        insert_sem_conflito = _INSERT_SEM_CONFLITO.get(db.session.get_bind().dialect.name)
+        if insert_sem_conflito is None:
+            return insert(Notificacao)
+        return insert_sem_conflito(Notificacao).on_conflict_do_nothing()
+    
+    @staticmethod
+    def _criar_notificacoes_em_lote(dados):
+        """
+        Insere as notificações (dicts de colunas) com um INSERT em lote em uma
+        única transação. Elas nascem pendentes na fila de envio; no modo de
+        entrega imediata, nascem reservadas para esta chamada e são enviadas
+        logo em seguida.
+        
+        Returns:
+            Lista das notificações criadas (sem os alertas que outra
+            verificação gravou no mesmo dia)
+        """
+        if not dados:
+            return []
         
-        # Buscar todas as etapas com configuração de alerta de inatividade
-        etapas = EtapaProcesso.query.filter(
-            EtapaProcesso.dias_alerta_inatividade > 0,
-            EtapaProcesso.ativo == True
-        ).all()
+        reserva = NotificacaoService._reserva_entrega_imediata()
+        dados = NotificacaoService._preparar(dados, reserva)
         
-        for etapa in etapas:
-            # Calcular data limite para inatividade
-            data_limite = datetime.utcnow() - timedelta(days=etapa.dias_alerta_inatividade)
-            
-            # Buscar cards inativos nesta etapa
-            cards = CardMobilizacao.query.filter(
-                CardMobilizacao.etapa_atual_id == etapa.id,
-                CardMobilizacao.ultima_atualizacao < data_limite,
-                CardMobilizacao.status_etapa != 'FINALIZADO'
-            ).all()
-            
-            # Gerar notificações para cards inativos
-            for card in cards:
-                NotificacaoService.criar_notificacao_card_inativo(card)
-                cards_inativos.append(card)
+        notificacoes = db.session.scalars(NotificacaoService._insert().returning(Notificacao), dados).all()
+        incrementar_versao('notificacoes')
+        db.session.commit()
+        
+        if reserva:
+            # A consulta por dono também recarrega os objetos expirados pelo commit
+            NotificacaoService._entregar_reservadas(reserva['lease_dono'])
+        
+        return notificacoes
+    
+    @staticmethod
+    def verificar_cards_inativos():
+        """
+        Verifica cards sem atividade recente e gera notificações.
         
-        return len(cards_inativos)
+        Uma única consulta compara a última atualização de cada card com o
+        limite de inatividade (dias_alerta_inatividade) da sua etapa.
+        """
+        agora = datetime.utcnow()
+        
+        consulta = db.session.query(
+            CardMobilizacao.id,
+            CardMobilizacao.nome_colaborador,
+            CardMobilizacao.etapa_atual_id,
+            CardMobilizacao.responsavel_atual,
+            CardMobilizacao.ultima_atualizacao,
+            EtapaProcesso.nome.label('nome_etapa'),
+            NotificacaoService._notificacao_recente('CARD_INATIVO', agora).exists().label('notificado')
+        ).join(
+            EtapaProcesso, CardMobilizacao.etapa_atual_id == EtapaProcesso.id
+        ).filter(
+            *NotificacaoService._filtros_alerta('CARD_INATIVO', agora)
+        ).order_by(
+            CardMobilizacao.id
+        )
+        
+        return NotificacaoService._gerar_em_blocos(
+            consulta,
+            lambda card: NotificacaoService._dados_card_inativo(card, card.nome_etapa, agora)
+        )
     
     @staticmethod
     def verificar_checklist_pendentes():
         """
         Verifica cards com itens obrigatórios de checklist pendentes e gera notificações.
+        
+        Uma consulta agregada retorna cada card com pendências e a quantidade de
+        itens obrigatórios pendentes; o resultado é lido em blocos (yield_per)
+        e as notificações são inseridas bloco a bloco, de modo que a memória
+        não cresce com o número de cards ativos.
         """
-        cards_com_pendencias = []
+        agora = datetime.utcnow()
         
-        # Buscar todos os cards ativos
-        cards = CardMobilizacao.query.filter(
-            CardMobilizacao.status_etapa != 'FINALIZADO'
-        ).all()
+        return NotificacaoService._gerar_em_blocos(
+            NotificacaoService._consulta_checklist_pendentes(agora),
+            lambda card: NotificacaoService._dados_checklist_pendente(card, card.nome_etapa, card.pendentes)
+        )
+    
+    @staticmethod
+    def _consulta_checklist_pendentes(agora):
+        """
+        Cards não finalizados com a quantidade de itens obrigatórios pendentes.
+        As colunas da etapa entram no GROUP BY: o PostgreSQL só aceita colunas
+        fora dele quando dependem da chave primária agrupada (cards).
+        """
+        return db.session.query(
+            CardMobilizacao.id,
+            CardMobilizacao.nome_colaborador,
+            CardMobilizacao.etapa_atual_id,
+            CardMobilizacao.responsavel_atual,
+            EtapaProcesso.nome.label('nome_etapa'),
+            func.count(ChecklistCard.id).label('pendentes'),
+            NotificacaoService._notificacao_recente('CHECKLIST_PENDENTE', agora).exists().label('notificado')
+        ).join(
+            ChecklistCard, ChecklistCard.card_id == CardMobilizacao.id
+        ).join(
+            ChecklistEtapa, ChecklistCard.checklist_etapa_id == ChecklistEtapa.id
+        ).join(
+            EtapaProcesso, CardMobilizacao.etapa_atual_id == EtapaProcesso.id
+        ).filter(
+            CardMobilizacao.status_etapa != 'FINALIZADO',
+            ChecklistEtapa.obrigatorio == True,
+            ChecklistCard.concluido.isnot(True)
+        ).group_by(
+            CardMobilizacao.id,
+            EtapaProcesso.id,
+            EtapaProcesso.nome
+        ).order_by(
+            CardMobilizacao.id
+        )
+    
+    @staticmethod
+    def _gerar_em_blocos(consulta, montar):
+        """
+        Lê a consulta de cards em blocos (yield_per) e insere, bloco a bloco e em
+        uma única transação, as notificações montadas por montar(card) para os
+        cards ainda não notificados (coluna 'notificado') e com responsável.
+        No modo de entrega imediata, elas nascem reservadas e são enviadas
+        após o commit, como em _criar_notificacoes_em_lote.
+        
+        Returns:
+            Número de cards retornados pela consulta
+        """
+        tamanho_bloco = _config_int('NOTIFICACOES_BLOCO_VERIFICACAO', 1000)
         
-        for card in cards:
-            # Verificar se tem itens obrigatórios pendentes
-            itens_obrigatorios = [item for item in card.checklist_items 
-                                if item.checklist_etapa.obrigatorio and not item.concluido]
-            
-            if itens_obrigatorios:
-                NotificacaoService.criar_notificacao_checklist_pendente(card, len(itens_obrigatorios))
-                cards_com_pendencias.append(card)
+        reserva = NotificacaoService._reserva_entrega_imediata()
+        
+        total = 0
+        ids = []
+        resultado = db.session.execute(consulta.statement, execution_options={'yield_per': tamanho_bloco})
+        for bloco in resultado.partitions():
+            total += len(bloco)
+            dados = [montar(card) for card in bloco if not card.notificado and card.responsavel_atual]
+            ids.extend(NotificacaoService._inserir_notificacoes(NotificacaoService._preparar(dados, reserva)))
+        
+        if ids:
+            incrementar_versao('notificacoes')
+        db.session.commit()
+        
+        if ids and reserva:
+            NotificacaoService._entregar_reservadas(reserva['lease_dono'])
         
-        return len(cards_com_pendencias)
+        return total
+    
+    @staticmethod
+    def _inserir_notificacoes(dados):
+        """
+        Insere as notificações sem confirmar a transação (uso por blocos).
+        
+        Returns:
+            Lista dos ids criados
+        """
+        if not dados:
+            return []
+        return db.session.scalars(NotificacaoService._insert().returning(Notificacao.id), dados).all()
+    
+    @staticmethod
+    def _notificacao_existente(tipo, card_id):
+        """Notificação do tipo criada para o card nas últimas 24h (ou None)"""
+        return Notificacao.query.filter(
+            Notificacao.tipo == tipo,
+            Notificacao.card_id == card_id,
+            Notificacao.data_criacao >= datetime.utcnow() - timedelta(hours=24)
+        ).first()
     
     @staticmethod
     def criar_notificacao_prazo_vencido(card):
@@ -109,32 +464,26 @@ class NotificacaoService:
         Cria uma notificação para um card com prazo vencido.
         """
         # Verificar se já existe notificação recente (últimas 24h)
-        notificacao_existente = Notificacao.query.filter(
-            Notificacao.tipo == 'PRAZO_VENCIDO',
-            Notificacao.card_id == card.id,
-            Notificacao.data_criacao >= datetime.utcnow() - timedelta(hours=24)
-        ).first()
-        
+        notificacao_existente = NotificacaoService._notificacao_existente('PRAZO_VENCIDO', card.id)
         if notificacao_existente:
             return notificacao_existente
         
-        # Criar nova notificação
-        notificacao = Notificacao(
+        criadas = NotificacaoService._criar_notificacoes_em_lote([
+            NotificacaoService._dados_prazo_vencido(card, card.etapa_atual.nome)
+        ])
+        # Gravada ao mesmo tempo por outra verificação: retorna a existente
+        return criadas[0] if criadas else NotificacaoService._notificacao_existente('PRAZO_VENCIDO', card.id)
+    
+    @staticmethod
+    def _dados_prazo_vencido(card, nome_etapa):
+        return dict(
             tipo='PRAZO_VENCIDO',
             titulo=f'Prazo vencido: {card.nome_colaborador}',
-            mensagem=f'O prazo para conclusão da etapa "{card.etapa_atual.nome}" do colaborador {card.nome_colaborador} venceu em {card.prazo_etapa.strftime("%d/%m/%Y")}.',
+            mensagem=f'O prazo para conclusão da etapa "{nome_etapa}" do colaborador {card.nome_colaborador} venceu em {card.prazo_etapa.strftime("%d/%m/%Y")}.',
             destinatario_email=card.responsavel_atual,
             card_id=card.id,
             etapa_id=card.etapa_atual_id
         )
-        
-        db.session.add(notificacao)
-        db.session.commit()
-        
-        # Tentar enviar email
-        NotificacaoService.enviar_email_notificacao(notificacao)
-        
-        return notificacao
     
     @staticmethod
     def criar_notificacao_prazo_vencendo(card):
@@ -142,35 +491,29 @@ class NotificacaoService:
         Cria uma notificação para um card com prazo próximo de vencer.
         """
         # Verificar se já existe notificação recente (últimas 24h)
-        notificacao_existente = Notificacao.query.filter(
-            Notificacao.tipo == 'PRAZO_VENCENDO',
-            Notificacao.card_id == card.id,
-            Notificacao.data_criacao >= datetime.utcnow() - timedelta(hours=24)
-        ).first()
-        
+        notificacao_existente = NotificacaoService._notificacao_existente('PRAZO_VENCENDO', card.id)
         if notificacao_existente:
             return notificacao_existente
         
+        criadas = NotificacaoService._criar_notificacoes_em_lote([
+            NotificacaoService._dados_prazo_vencendo(card, card.etapa_atual.nome, datetime.utcnow())
+        ])
+        # Gravada ao mesmo tempo por outra verificação: retorna a existente
+        return criadas[0] if criadas else NotificacaoService._notificacao_existente('PRAZO_VENCENDO', card.id)
+    
+    @staticmethod
+    def _dados_prazo_vencendo(card, nome_etapa, agora):
         # Calcular dias restantes
-        dias_restantes = (card.prazo_etapa - datetime.utcnow()).days + 1
+        dias_restantes = (card.prazo_etapa - agora).days + 1
         
-        # Criar nova notificação
-        notificacao = Notificacao(
+        return dict(
             tipo='PRAZO_VENCENDO',
             titulo=f'Prazo próximo: {card.nome_colaborador}',
-            mensagem=f'O prazo para conclusão da etapa "{card.etapa_atual.nome}" do colaborador {card.nome_colaborador} vence em {dias_restantes} dias ({card.prazo_etapa.strftime("%d/%m/%Y")}).',
+            mensagem=f'O prazo para conclusão da etapa "{nome_etapa}" do colaborador {card.nome_colaborador} vence em {dias_restantes} dias ({card.prazo_etapa.strftime("%d/%m/%Y")}).',
             destinatario_email=card.responsavel_atual,
             card_id=card.id,
             etapa_id=card.etapa_atual_id
         )
-        
-        db.session.add(notificacao)
-        db.session.commit()
-        
-        # Tentar enviar email
-        NotificacaoService.enviar_email_notificacao(notificacao)
-        
-        return notificacao
     
     @staticmethod
     def criar_notificacao_card_inativo(card):
@@ -178,35 +521,29 @@ class NotificacaoService:
         Cria uma notificação para um card inativo.
         """
         # Verificar se já existe notificação recente (últimas 24h)
-        notificacao_existente = Notificacao.query.filter(
-            Notificacao.tipo == 'CARD_INATIVO',
-            Notificacao.card_id == card.id,
-            Notificacao.data_criacao >= datetime.utcnow() - timedelta(hours=24)
-        ).first()
-        
+        notificacao_existente = NotificacaoService._notificacao_existente('CARD_INATIVO', card.id)
         if notificacao_existente:
             return notificacao_existente
         
+        criadas = NotificacaoService._criar_notificacoes_em_lote([
+            NotificacaoService._dados_card_inativo(card, card.etapa_atual.nome, datetime.utcnow())
+        ])
+        # Gravada ao mesmo tempo por outra verificação: retorna a existente
+        return criadas[0] if criadas else NotificacaoService._notificacao_existente('CARD_INATIVO', card.id)
+    
+    @staticmethod
+    def _dados_card_inativo(card, nome_etapa, agora):
         # Calcular dias de inatividade
-        dias_inativo = (datetime.utcnow() - card.ultima_atualizacao).days
+        dias_inativo = (agora - card.ultima_atualizacao).days
         
-        # Criar nova notificação
-        notificacao = Notificacao(
+        return dict(
             tipo='CARD_INATIVO',
             titulo=f'Card inativo: {card.nome_colaborador}',
-            mensagem=f'O card do colaborador {card.nome_colaborador} está sem atualizações há {dias_inativo} dias na etapa "{card.etapa_atual.nome}".',
+            mensagem=f'O card do colaborador {card.nome_colaborador} está sem atualizações há {dias_inativo} dias na etapa "{nome_etapa}".',
             destinatario_email=card.responsavel_atual,
             card_id=card.id,
             etapa_id=card.etapa_atual_id
         )
-        
-        db.session.add(notificacao)
-        db.session.commit()
-        
-        # Tentar enviar email
-        NotificacaoService.enviar_email_notificacao(notificacao)
-        
-        return notificacao
     
     @staticmethod
     def criar_notificacao_checklist_pendente(card, qtd_pendentes):
@@ -214,32 +551,26 @@ class NotificacaoService:
         Cria uma notificação para um card com itens obrigatórios de checklist pendentes.
         """
         # Verificar se já existe notificação recente (últimas 24h)
-        notificacao_existente = Notificacao.query.filter(
-            Notificacao.tipo == 'CHECKLIST_PENDENTE',
-            Notificacao.card_id == card.id,
-            Notificacao.data_criacao >= datetime.utcnow() - timedelta(hours=24)
-        ).first()
-        
+        notificacao_existente = NotificacaoService._notificacao_existente('CHECKLIST_PENDENTE', card.id)
         if notificacao_existente:
             return notificacao_existente
         
-        # Criar nova notificação
-        notificacao = Notificacao(
+        criadas = NotificacaoService._criar_notificacoes_em_lote([
+            NotificacaoService._dados_checklist_pendente(card, card.etapa_atual.nome, qtd_pendentes)
+        ])
+        # Gravada ao mesmo tempo por outra verificação: retorna a existente
+        return criadas[0] if criadas else NotificacaoService._notificacao_existente('CHECKLIST_PENDENTE', card.id)
+    
+    @staticmethod
+    def _dados_checklist_pendente(card, nome_etapa, qtd_pendentes):
+        return dict(
             tipo='CHECKLIST_PENDENTE',
             titulo=f'Checklist pendente: {card.nome_colaborador}',
-            mensagem=f'O card do colaborador {card.nome_colaborador} possui {qtd_pendentes} itens obrigatórios pendentes na etapa "{card.etapa_atual.nome}".',
+            mensagem=f'O card do colaborador {card.nome_colaborador} possui {qtd_pendentes} itens obrigatórios pendentes na etapa "{nome_etapa}".',
             destinatario_email=card.responsavel_atual,
             card_id=card.id,
             etapa_id=card.etapa_atual_id
         )
-        
-        db.session.add(notificacao)
-        db.session.commit()
-        
-        # Tentar enviar email
-        NotificacaoService.enviar_email_notificacao(notificacao)
-        
-        return notificacao
     
     @staticmethod
     def criar_notificacao_movimentacao(card, etapa_origem, etapa_destino, usuario):
@@ -247,7 +578,7 @@ class NotificacaoService:
         Cria uma notificação para movimentação de card entre etapas.
         """
         # Criar nova notificação para o responsável da etapa de destino
-        notificacao = Notificacao(
+        dados = dict(
             tipo='CARD_MOVIDO',
             titulo=f'Card movido: {card.nome_colaborador}',
             mensagem=f'O card do colaborador {card.nome_colaborador} foi movido da etapa "{etapa_origem.nome}" para "{etapa_destino.nome}" por {usuario.nome}.',
@@ -256,108 +587,264 @@ class NotificacaoService:
             etapa_id=etapa_destino.id
         )
         
-        db.session.add(notificacao)
-        db.session.commit()
-        
-        # Tentar enviar email
-        NotificacaoService.enviar_email_notificacao(notificacao)
-        
-        return notificacao
+        return NotificacaoService._criar_notificacoes_em_lote([dados])[0]
     
     @staticmethod
     def enviar_email_notificacao(notificacao):
         """
         Tenta enviar um email para a notificação.
         """
+        return NotificacaoService.entregar_notificacoes([notificacao])['enviadas'] == 1
+    
+    @staticmethod
+    def entregar_notificacoes(notificacoes):
+        """
+        Envia os emails de um lote de notificações pelo entregador do processo
+        (src/services/entrega_email.py) e registra o resultado de todas em um
+        único commit.
+        """
+        return NotificacaoService._entregar(
+            [[notificacao] for notificacao in notificacoes],
+            lambda grupo, from_email: NotificacaoService._montar_email(grupo[0], from_email)
+        )
+    
+    @staticmethod
+    def entregar_resumos(notificacoes):
+        """
+        Envia um único email de resumo por destinatário com todas as suas
+        notificações do lote. Cada notificação recebe o resultado do email
+        em que foi incluída.
+        """
+        grupos = {}
+        for notificacao in notificacoes:
+            grupos.setdefault(notificacao.destinatario_email, []).append(notificacao)
+        
+        return NotificacaoService._entregar(list(grupos.values()), NotificacaoService._montar_resumo)
+    
+    @staticmethod
+    def _entregar(grupos, montar):
+        """
+        Envia um email por grupo de notificações (montado por montar(grupo,
+        from_email)) e registra o resultado em cada notificação do grupo.
+        
+        Returns:
+            Dict com 'emails' enviados e as notificações 'enviadas' e com 'falhas'
+        """
+        resultado = {'emails': 0, 'enviadas': 0, 'falhas': 0}
+        if not grupos:
+            return resultado
+        
+        agora = datetime.utcnow()
+        from_email = os.environ.get('FROM_EMAIL', 'sistema@mobilizacao.com.br')
+        
         # Em ambiente de desenvolvimento, apenas simular o envio
         if os.environ.get('FLASK_ENV') == 'development':
-            logger.info(f"[SIMULAÇÃO DE EMAIL] Para: {notificacao.destinatario_email}, Assunto: {notificacao.titulo}")
-            logger.info(f"[SIMULAÇÃO DE EMAIL] Mensagem: {notificacao.mensagem}")
-            
-            # Marcar como enviado
-            notificacao.enviado = True
-            notificacao.data_envio = datetime.utcnow()
-            db.session.commit()
-            return True
-        
-        # Em produção, tentar enviar email real
-        try:
-            # Configurações de email (devem vir de variáveis de ambiente em produção)
-            smtp_server = os.environ.get('SMTP_SERVER', 'smtp.example.com')
-            smtp_port = int(os.environ.get('SMTP_PORT', 587))
-            smtp_user = os.environ.get('SMTP_USER', 'user@example.com')
-            smtp_password = os.environ.get('SMTP_PASSWORD', 'password')
-            from_email = os.environ.get('FROM_EMAIL', 'sistema@mobilizacao.com.br')
-            
-            # Criar mensagem
-            msg = MIMEMultipart()
-            msg['From'] = from_email
-            msg['To'] = notificacao.destinatario_email
-            msg['Subject'] = notificacao.titulo
-            
-            # Adicionar corpo do email
-            corpo_email = f"""
-            <html>
-            <body>
-                <h2>{notificacao.titulo}</h2>
-                <p>{notificacao.mensagem}</p>
-                <p>Esta é uma notificação automática do Sistema de Mobilização.</p>
-                <p>Para mais detalhes, acesse o sistema.</p>
-            </body>
-            </html>
-            """
-            msg.attach(MIMEText(corpo_email, 'html'))
-            
-            # Conectar ao servidor SMTP e enviar
-            server = smtplib.SMTP(smtp_server, smtp_port)
-            server.starttls()
-            server.login(smtp_user, smtp_password)
-            server.send_message(msg)
-            server.quit()
-            
-            # Marcar como enviado
-            notificacao.enviado = True
-            notificacao.data_envio = datetime.utcnow()
-            db.session.commit()
+            for grupo in grupos:
+                mensagem = montar(grupo, from_email)
+                logger.info(f"[SIMULAÇÃO DE EMAIL] Para: {mensagem['To']}, Assunto: {mensagem['Subject']}")
+                if len(grupo) == 1:
+                    logger.info(f"[SIMULAÇÃO DE EMAIL] Mensagem: {grupo[0].mensagem}")
+                
+                # Marcar como enviado
+                for notificacao in grupo:
+                    NotificacaoService._registrar_envio(notificacao, agora)
             
-            return True
-            
-        except Exception as e:
-            logger.error(f"Erro ao enviar email: {str(e)}")
-            
-            # Registrar erro
-            notificacao.enviado = False
-            notificacao.tentativas_envio += 1
-            notificacao.erro_envio = str(e)
             db.session.commit()
-            
-            return False
+            resultado['emails'] = len(grupos)
+            resultado['enviadas'] = sum(len(grupo) for grupo in grupos)
+            return resultado
+        
+        # Envio pelo entregador do processo (conexões SMTP reaproveitadas entre lotes)
+        lote = obter_entregador().enviar_lote([
+            (indice, montar(grupo, from_email))
+            for indice, grupo in enumerate(grupos)
+        ])
+        
+        for indice, grupo in enumerate(grupos):
+            erro = lote['resultados'][indice]
+            for notificacao in grupo:
+                if erro is None:
+                    # Marcar como enviado
+                    NotificacaoService._registrar_envio(notificacao, agora)
+                    resultado['enviadas'] += 1
+                else:
+                    NotificacaoService._registrar_falha_envio(notificacao, erro, agora)
+                    resultado['falhas'] += 1
+        
+        db.session.commit()
+        
+        logger.info(
+            f"Lote de emails: {lote['enviadas']} enviados, {lote['falhas']} falhas, "
+            f"{lote['mensagens_por_segundo']:.1f} mensagens/s"
+        )
+        
+        resultado['emails'] = lote['enviadas']
+        return resultado
     
     @staticmethod
-    def processar_notificacoes_pendentes():
+    def _montar_email(notificacao, from_email):
+        # Criar mensagem
+        msg = MIMEMultipart()
+        msg['From'] = from_email
+        msg['To'] = notificacao.destinatario_email
+        msg['Subject'] = notificacao.titulo
+        
+        # Adicionar corpo do email
+        corpo_email = f"""
+        <html>
+        <body>
+            <h2>{notificacao.titulo}</h2>
+            <p>{notificacao.mensagem}</p>
+            <p>Esta é uma notificação automática do Sistema de Mobilização.</p>
+            <p>Para mais detalhes, acesse o sistema.</p>
+        </body>
+        </html>
         """
-        Processa notificações pendentes de envio.
+        msg.attach(MIMEText(corpo_email, 'html'))
+        return msg
+    
+    @staticmethod
+    def _montar_resumo(notificacoes, from_email):
         """
-        # Buscar notificações não enviadas com menos de 5 tentativas
-        notificacoes = Notificacao.query.filter(
-            Notificacao.enviado == False,
-            Notificacao.tentativas_envio < 5
-        ).all()
-        
-        enviadas = 0
-        falhas = 0
+        Monta o email de resumo de um destinatário, com uma seção por tipo de
+        notificação (até NOTIFICACOES_RESUMO_MAX_POR_TIPO itens por seção).
+        """
+        max_por_tipo = _config_int('NOTIFICACOES_RESUMO_MAX_POR_TIPO', 50)
         
+        por_tipo = {}
         for notificacao in notificacoes:
-            if NotificacaoService.enviar_email_notificacao(notificacao):
-                enviadas += 1
-            else:
-                falhas += 1
+            por_tipo.setdefault(notificacao.tipo, []).append(notificacao)
+        
+        secoes = []
+        for tipo, itens in por_tipo.items():
+            linhas = ''.join(f"<li>{notificacao.mensagem}</li>" for notificacao in itens[:max_por_tipo])
+            if len(itens) > max_por_tipo:
+                linhas += f"<li>... e mais {len(itens) - max_por_tipo}</li>"
+            secoes.append(f"<h3>{TITULOS_RESUMO.get(tipo, tipo)} ({len(itens)})</h3><ul>{linhas}</ul>")
+        
+        msg = MIMEMultipart()
+        msg['From'] = from_email
+        msg['To'] = notificacoes[0].destinatario_email
+        msg['Subject'] = f'Resumo de notificações: {len(notificacoes)} pendência(s)'
+        
+        corpo_email = f"""
+        <html>
+        <body>
+            <h2>Resumo de notificações</h2>
+            {''.join(secoes)}
+            <p>Esta é uma notificação automática do Sistema de Mobilização.</p>
+            <p>Para mais detalhes, acesse o sistema.</p>
+        </body>
+        </html>
+        """
+        msg.attach(MIMEText(corpo_email, 'html'))
+        return msg
+    
+    @staticmethod
+    def _registrar_falha_envio(notificacao, erro, agora=None):
+        notificacao.enviado = False
+        notificacao.tentativas_envio = (notificacao.tentativas_envio or 0) + 1
+        notificacao.erro_envio = str(erro)
+        notificacao.proxima_tentativa = (agora or datetime.utcnow()) + timedelta(
+            seconds=NotificacaoService.calcular_espera(notificacao.tentativas_envio)
+        )
+        notificacao.lease_dono = None
+        notificacao.lease_ate = None
+    
+    @staticmethod
+    def _registrar_envio(notificacao, agora):
+        notificacao.enviado = True
+        notificacao.data_envio = agora
+        notificacao.proxima_tentativa = None
+        notificacao.lease_dono = None
+        notificacao.lease_ate = None
+    
+    @staticmethod
+    def calcular_espera(tentativas):
+        """
+        Espera, em segundos, antes da próxima tentativa de envio: backoff
+        exponencial (NOTIFICACOES_BACKOFF_BASE * 2^(tentativas-1), limitado a
+        NOTIFICACOES_BACKOFF_MAX) com metade do valor sorteada (jitter), para
+        que falhas simultâneas não voltem todas no mesmo instante.
+        """
+        base = _config_int('NOTIFICACOES_BACKOFF_BASE', 60)
+        maximo = _config_int('NOTIFICACOES_BACKOFF_MAX', 3600)
+        espera = min(maximo, base * 2 ** max(tentativas - 1, 0))
+        return espera / 2 + random.uniform(0, espera / 2)
+    
+    @staticmethod
+    def reivindicar_lote(dono, tamanho, duracao_lease, por_destinatario=False):
+        """
+        Reserva para o worker dono um lote de notificações prontas para envio:
+        não enviadas, abaixo do limite de tentativas, com a espera do backoff
+        cumprida e sem reserva válida. A reserva de um worker que parou expira
+        em lease_ate e a notificação volta à fila.
         
-        return {
-            'processadas': len(notificacoes),
-            'enviadas': enviadas,
-            'falhas': falhas
-        }
+        Com por_destinatario, tamanho é o número de destinatários e o lote traz
+        todas as notificações disponíveis de cada um (usado pelo modo resumo).
+        
+        Returns:
+            Lista das notificações reservadas
+        """
+        agora = datetime.utcnow()
+        disponivel = [
+            Notificacao.enviado == False,
+            Notificacao.tentativas_envio < _config_int('NOTIFICACOES_MAX_TENTATIVAS', 5),
+            or_(Notificacao.proxima_tentativa.is_(None), Notificacao.proxima_tentativa <= agora),
+            or_(Notificacao.lease_ate.is_(None), Notificacao.lease_ate < agora)
+        ]
+        
+        # Condições repetidas no UPDATE: dois workers não reservam a mesma linha
+        if por_destinatario:
+            destinatarios = select(Notificacao.destinatario_email).where(*disponivel).distinct().order_by(
+                Notificacao.destinatario_email
+            ).limit(tamanho)
+            candidatas = select(Notificacao.id).where(*disponivel, Notificacao.destinatario_email.in_(destinatarios))
+        else:
+            candidatas = select(Notificacao.id).where(*disponivel).order_by(Notificacao.id).limit(tamanho)
+        db.session.execute(
+            update(Notificacao).where(Notificacao.id.in_(candidatas), *disponivel).values(
+                lease_dono=dono,
+                lease_ate=agora + timedelta(seconds=duracao_lease)
+            ).execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        
+        return Notificacao.query.filter(Notificacao.lease_dono == dono).order_by(Notificacao.id).all()
+    
+    @staticmethod
+    def processar_notificacoes_pendentes(max_lotes=None):
+        """
+        Processa a fila de envio: reserva lotes de notificações pendentes,
+        envia e registra o resultado, até a fila esvaziar ou max_lotes.
+        """
+        duracao_lease = _config_int('NOTIFICACOES_LEASE_SEGUNDOS', 300)
+        resumo = NotificacaoService.modo_entrega() == MODO_ENTREGA_RESUMO
+        if resumo:
+            tamanho = _config_int('NOTIFICACOES_RESUMO_DESTINATARIOS', 50)
+            entregar = NotificacaoService.entregar_resumos
+        else:
+            tamanho = _config_int('NOTIFICACOES_LOTE', 200)
+            entregar = NotificacaoService.entregar_notificacoes
+        worker = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        
+        resultado = {'processadas': 0, 'emails': 0, 'enviadas': 0, 'falhas': 0}
+        lote = 0
+        while max_lotes is None or lote < max_lotes:
+            lote += 1
+            notificacoes = NotificacaoService.reivindicar_lote(
+                f"{worker}:{lote}", tamanho, duracao_lease, por_destinatario=resumo
+            )
+            if not notificacoes:
+                break
+            
+            entrega = entregar(notificacoes)
+            resultado['processadas'] += len(notificacoes)
+            resultado['emails'] += entrega['emails']
+            resultado['enviadas'] += entrega['enviadas']
+            resultado['falhas'] += entrega['falhas']
+        
+        return resultado
     
     @staticmethod
     def marcar_como_lida(notificacao_id, usuario_id):
@@ -371,6 +858,7 @@ class NotificacaoService:
         
         notificacao.lido = True
         notificacao.data_leitura = datetime.utcnow()
+        incrementar_versao('notificacoes')
         db.session.commit()
         
         return True
@@ -380,10 +868,7 @@ class NotificacaoService:
         """
         Lista notificações para um usuário específico.
         """
-        query = Notificacao.query.filter_by(destinatario_email=email)
-        
-        if not lidas:
-            query = query.filter_by(lido=False)
+        query = NotificacaoService.consultar_notificacoes_usuario(email, lidas)
         
         # Ordenar por data de criação (mais recentes primeiro)
         query = query.order_by(Notificacao.data_criacao.desc())
@@ -393,6 +878,18 @@ class NotificacaoService:
         
         return query.all()
     
+    @staticmethod
+    def consultar_notificacoes_usuario(email, lidas=False):
+        """
+        Retorna a query (sem ordenação) das notificações de um usuário.
+        """
+        query = Notificacao.query.filter_by(destinatario_email=email)
+        
+        if not lidas:
+            query = query.filter_by(lido=False)
+        
+        return query
+    
     @staticmethod
     def contar_notificacoes_nao_lidas(email):
         """
@@ -404,12 +901,12 @@ class NotificacaoService:
         ).count()
     
     @staticmethod
-    def executar_verificacoes_periodicas():
+    def executar_verificacoes_periodicas(completo=False):
         """
         Executa todas as verificações periódicas de uma vez.
         """
         resultados = {
-            'prazos': NotificacaoService.verificar_prazos_vencidos(),
+            'prazos': NotificacaoService.verificar_prazos_vencidos(completo=completo),
             'inativos': NotificacaoService.verificar_cards_inativos(),
             'checklist': NotificacaoService.verificar_checklist_pendentes(),
             'pendentes': NotificacaoService.processar_notificacoes_pendentes()
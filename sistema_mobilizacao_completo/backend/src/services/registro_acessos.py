@@ -0,0 +1,224 @@
+"""
+Gravação assíncrona e em lote dos logs de acesso.
+
+Os registros são enfileirados em memória (fila limitada) e uma thread em
+segundo plano os insere no banco a cada N milissegundos ou M registros,
+usando um único executemany por lote.
+"""
+
+import atexit
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+from src.models.mobilizacao import db
+from src.models.permissoes import LogAcesso
+
+logger = logging.getLogger(__name__)
+
+# Políticas de transbordo quando a fila está cheia
+POLITICA_BLOQUEAR = 'bloquear'
+POLITICA_DESCARTAR_ANTIGOS = 'descartar_antigos'
+POLITICA_AMOSTRAR = 'amostrar'
+POLITICAS = (POLITICA_BLOQUEAR, POLITICA_DESCARTAR_ANTIGOS, POLITICA_AMOSTRAR)
+
+# Registradores criados neste processo (drenados no encerramento)
+_registradores = []
+
+
+class RegistradorAcessos:
+    """
+    Fila limitada de logs de acesso com gravação em lote por uma thread dedicada.
+    """
+
+    def __init__(self, app, capacidade=10000, tamanho_lote=200, intervalo_ms=500,
+                 politica=POLITICA_BLOQUEAR, amostragem=10, timeout_bloqueio=1.0):
+        if politica not in POLITICAS:
+            raise ValueError(f"Política de transbordo inválida: {politica}")
+
+        self.app = app
+        self.capacidade = max(capacidade, tamanho_lote)
+        self.tamanho_lote = tamanho_lote
+        self.intervalo = intervalo_ms / 1000.0
+        self.politica = politica
+        self.amostragem = max(amostragem, 1)
+        self.timeout_bloqueio = timeout_bloqueio
+
+        self._fila = deque()
+        self._condicao = threading.Condition()
+        self._thread = None
+        self._pid = None
+        self._parando = False
+        self._excedentes = 0
+
+        # Contadores expostos em estatisticas()
+        self.enfileirados = 0
+        self.gravados = 0
+        self.descartados = 0
+        self.lotes = 0
+        self.falhas = 0
+
+    def registrar(self, dados):
+        """
+        Enfileira um registro de acesso. Retorna False se o registro foi descartado.
+        """
+        with self._condicao:
+            if self._parando:
+                self.descartados += 1
+                return False
+
+            self._garantir_thread()
+
+            if len(self._fila) >= self.capacidade and not self._liberar_espaco():
+                self.descartados += 1
+                return False
+
+            self._fila.append(dados)
+            self.enfileirados += 1
+
+            if len(self._fila) >= self.tamanho_lote:
+                self._condicao.notify_all()
+
+        return True
+
+    def _liberar_espaco(self):
+        """
+        Aplica a política de transbordo com a fila cheia (chamado com o lock adquirido).
+        """
+        if self.politica == POLITICA_BLOQUEAR:
+            self._condicao.notify_all()
+            return self._condicao.wait_for(
+                lambda: len(self._fila) < self.capacidade or self._parando,
+                timeout=self.timeout_bloqueio
+            ) and not self._parando
+
+        if self.politica == POLITICA_AMOSTRAR:
+            # Mantém apenas 1 a cada `amostragem` registros excedentes
+            self._excedentes += 1
+            if self._excedentes % self.amostragem:
+                return False
+
+        self._fila.popleft()
+        self.descartados += 1
+        return True
+
+    def _garantir_thread(self):
+        # Após um fork (ex: gunicorn com preload) a thread do processo pai não existe no filho
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            return
+
+        self._pid = os.getpid()
+        self._thread = threading.Thread(target=self._executar, name='registro-acessos', daemon=True)
+        self._thread.start()
+
+    def _executar(self):
+        while True:
+            with self._condicao:
+                limite = time.monotonic() + self.intervalo
+                while len(self._fila) < self.tamanho_lote and not self._parando:
+                    restante = limite - time.monotonic()
+                    if restante <= 0:
+                        break
+                    self._condicao.wait(restante)
+
+                lote = [self._fila.popleft() for _ in range(min(len(self._fila), self.tamanho_lote))]
+                encerrar = self._parando and not self._fila
+                # Libera produtores bloqueados aguardando espaço
+                self._condicao.notify_all()
+
+            if lote:
+                self._gravar(lote)
+
+            if encerrar:
+                return
+
+    def _gravar(self, lote):
+        try:
+            with self.app.app_context():
+                with db.engine.begin() as conexao:
+                    conexao.execute(LogAcesso.__table__.insert(), lote)
+
+            with self._condicao:
+                self.gravados += len(lote)
+                self.lotes += 1
+
+        except Exception as e:
+            logger.error(f"Erro ao gravar lote de logs de acesso: {str(e)}")
+
+            with self._condicao:
+                self.falhas += 1
+                self.descartados += len(lote)
+
+    def parar(self, timeout=10):
+        """
+        Interrompe a thread após drenar todos os registros pendentes.
+        """
+        with self._condicao:
+            self._parando = True
+            self._condicao.notify_all()
+            thread = self._thread if self._pid == os.getpid() else None
+
+        if thread is not None and thread.is_alive():
+            thread.join(timeout)
+
+        # Sem thread ativa (ou após timeout), drena o restante no próprio chamador
+        while True:
+            with self._condicao:
+                lote = [self._fila.popleft() for _ in range(min(len(self._fila), self.tamanho_lote))]
+            if not lote:
+                break
+            self._gravar(lote)
+
+    def estatisticas(self):
+        with self._condicao:
+            return {
+                'assincrono': True,
+                'politica': self.politica,
+                'capacidade': self.capacidade,
+                'pendentes': len(self._fila),
+                'enfileirados': self.enfileirados,
+                'gravados': self.gravados,
+                'descartados': self.descartados,
+                'lotes': self.lotes,
+                'falhas': self.falhas
+            }
+
+
+def _config(app, nome, padrao):
+    return app.config.get(nome, os.environ.get(nome, padrao))
+
+
+def iniciar_registro_acessos(app):
+    """
+    Cria o registrador assíncrono da aplicação, se habilitado.
+    """
+    assincrono = str(_config(app, 'REGISTRO_ACESSOS_ASSINCRONO', 'true')).lower() == 'true'
+    if not assincrono:
+        return None
+
+    registrador = RegistradorAcessos(
+        app,
+        capacidade=int(_config(app, 'REGISTRO_ACESSOS_CAPACIDADE', 10000)),
+        tamanho_lote=int(_config(app, 'REGISTRO_ACESSOS_LOTE', 200)),
+        intervalo_ms=int(_config(app, 'REGISTRO_ACESSOS_INTERVALO_MS', 500)),
+        politica=_config(app, 'REGISTRO_ACESSOS_POLITICA', POLITICA_BLOQUEAR),
+        amostragem=int(_config(app, 'REGISTRO_ACESSOS_AMOSTRAGEM', 10))
+    )
+
+    app.extensions['registro_acessos'] = registrador
+    _registradores.append(registrador)
+
+    return registrador
+
+
+def encerrar_registros_acessos():
+    """
+    Drena e encerra todos os registradores do processo (usado no desligamento do worker).
+    """
+    for registrador in _registradores:
+        registrador.parar()
+
+
+atexit.register(encerrar_registros_acessos)
@@ -0,0 +1,73 @@
+"""
+Utilitários para os testes que executam a API em processo.
+Diferente de test_api.py, estes testes não dependem do backend rodando em
+http://localhost:5000: cada teste cria a aplicação sobre um banco SQLite temporário.
+"""
+
+import os
+import sys
+import tempfile
+from contextlib import redirect_stdout
+from io import StringIO
+
+# Adicionar diretório raiz ao path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.models.mobilizacao import db
+
+# Credenciais de teste (criadas pelo seed_data)
+TEST_USER = {
+    'email': 'admin@empresa.com',
+    'senha': 'admin123'
+}
+
+
+def criar_app_teste(popular=True, **config):
+    """
+    Cria uma aplicação com todos os blueprints sobre um banco temporário.
+    """
+    from src.main import create_app
+
+    diretorio = tempfile.mkdtemp(prefix='mobilizacao_teste_')
+
+    app = create_app({
+        'SECRET_KEY': 'chave-de-teste-com-pelo-menos-32-bytes',
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(diretorio, 'teste.db')}",
+        'TESTING': True,
+        # Logs de acesso gravados na própria requisição
+        'REGISTRO_ACESSOS_ASSINCRONO': 'false',
+        **config
+    })
+
+    # Os caches do processo são de bancos anteriores
+    from src.models.permissoes import invalidar_permissoes
+    from src.services.etapas_service import EtapasService
+    invalidar_permissoes()
+    EtapasService.invalidar()
+
+    with app.app_context():
+        db.create_all()
+        if popular:
+            from src.utils.seed_data import criar_dados_iniciais
+            from src.utils.init_permissoes import inicializar_permissoes
+            with redirect_stdout(StringIO()):
+                criar_dados_iniciais()
+                inicializar_permissoes()
+
+            from src.services.contadores_service import ContadoresService
+            ContadoresService.reconciliar()
+
+    return app
+
+
+def obter_headers(cliente, usuario=TEST_USER):
+    """
+    Faz login e retorna os headers com o token de acesso.
+    """
+    response = cliente.post('/api/auth/login', json=usuario)
+    token = response.get_json()['data']['token']
+
+    return {
+        'Authorization': f"Bearer {token}",
+        'Content-Type': 'application/json'
+    }
@@ -0,0 +1,101 @@
+"""
+Servidor SMTP mínimo para os testes de entrega de emails.
+Aceita EHLO/HELO, MAIL, RCPT, DATA, RSET, NOOP e QUIT, guarda as mensagens
+recebidas e pode simular quedas de conexão (421), destinatários recusados (550)
+e adiados (450, como no greylisting).
+"""
+
+import socketserver
+import threading
+
+
+class _Manipulador(socketserver.StreamRequestHandler):
+
+    def responder(self, linha):
+        self.wfile.write(f"{linha}\r\n".encode())
+
+    def handle(self):
+        servidor = self.server.smtp
+        with servidor.lock:
+            servidor.conexoes += 1
+
+        recebidas = 0
+        destinatarios = []
+        self.responder('220 servidor-teste ESMTP')
+
+        while True:
+            linha = self.rfile.readline()
+            if not linha:
+                return
+            comando = linha.decode(errors='replace').strip()
+            verbo = comando.split(' ', 1)[0].upper()
+
+            if verbo in ('EHLO', 'HELO'):
+                self.responder('250-servidor-teste')
+                self.responder('250 8BITMIME')
+            elif verbo == 'MAIL':
+                if servidor.queda_apos and recebidas >= servidor.queda_apos:
+                    self.responder('421 Limite de mensagens por conexão')
+                    return
+                destinatarios = []
+                self.responder('250 OK')
+            elif verbo == 'RCPT':
+                endereco = comando.split(':', 1)[1].strip().strip('<>')
+                if endereco in servidor.recusados:
+                    self.responder('550 Destinatário inexistente')
+                elif endereco in servidor.adiados:
+                    self.responder('450 Tente novamente mais tarde')
+                else:
+                    destinatarios.append(endereco)
+                    self.responder('250 OK')
+            elif verbo == 'DATA':
+                self.responder('354 Envie a mensagem')
+                corpo = []
+                while True:
+                    linha = self.rfile.readline()
+                    if not linha or linha in (b'.\r\n', b'.\n'):
+                        break
+                    corpo.append(linha)
+                recebidas += 1
+                with servidor.lock:
+                    servidor.mensagens.append((destinatarios, b''.join(corpo)))
+                self.responder('250 OK')
+            elif verbo in ('RSET', 'NOOP'):
+                self.responder('250 OK')
+            elif verbo == 'QUIT':
+                self.responder('221 Até logo')
+                return
+            else:
+                self.responder('502 Comando não implementado')
+
+
+class _Servidor(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class ServidorSMTPTeste:
+    """
+    Servidor SMTP em uma thread, escutando em uma porta livre de localhost.
+    """
+
+    def __init__(self, queda_apos=None, recusados=(), adiados=()):
+        self.queda_apos = queda_apos
+        self.recusados = set(recusados)
+        self.adiados = set(adiados)
+        self.mensagens = []
+        self.conexoes = 0
+        self.lock = threading.Lock()
+
+        self._servidor = _Servidor(('127.0.0.1', 0), _Manipulador)
+        self._servidor.smtp = self
+        self.porta = self._servidor.server_address[1]
+        self._thread = threading.Thread(target=self._servidor.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self._servidor.shutdown()
+        self._servidor.server_close()
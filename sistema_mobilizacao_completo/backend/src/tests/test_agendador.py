@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Testes do agendador residente de notificações.
+"""
+
+import os
+import threading
+import unittest
+from datetime import datetime, timedelta
+from unittest import mock
+
+from app_teste import criar_app_teste, obter_headers
+
+from src.models.mobilizacao import db, ExecucaoAgendador, MarcaVerificacao
+from src.services.agendador import AgendadorNotificacoes
+from src.services.notificacao_service import NotificacaoService
+
+
+class TestAgendador(unittest.TestCase):
+    """Testes de AgendadorNotificacoes"""
+
+    def setUp(self):
+        # Entrega de email simulada
+        self.ambiente = mock.patch.dict(os.environ, {'FLASK_ENV': 'development'})
+        self.ambiente.start()
+        self.addCleanup(self.ambiente.stop)
+
+        self.app = criar_app_teste()
+
+    def test_01_executa_tarefas_vencidas_uma_vez(self):
+        """Na primeira passagem todas as tarefas rodam; em seguida nenhuma está vencida"""
+        with self.app.app_context():
+            agendador = AgendadorNotificacoes()
+
+            executadas = agendador.executar_pendentes()
+            self.assertEqual(set(executadas), {'prazos', 'inativos', 'checklist', 'pendentes'})
+            self.assertEqual(agendador.executar_pendentes(), {})
+            self.assertGreater(agendador.segundos_ate_proxima(), 0)
+
+            estado = {tarefa['tarefa']: tarefa for tarefa in AgendadorNotificacoes.estado()}
+            self.assertIn('notificacoes_criadas', estado['prazos']['resultado_ultima_execucao'])
+            self.assertIn('total', estado['inativos']['resultado_ultima_execucao'])
+            for tarefa in estado.values():
+                self.assertEqual(tarefa['execucoes'], 1)
+                self.assertIsNotNone(tarefa['duracao_ultima_execucao'])
+                self.assertIsNone(tarefa['erro_ultima_execucao'])
+                self.assertFalse(tarefa['em_execucao'])
+
+    def test_02_reserva_impede_execucao_simultanea(self):
+        """Duas instâncias não executam a mesma tarefa; o lease de uma instância parada expira"""
+        chamadas = []
+        tarefas = {'teste': (lambda: chamadas.append(1) or len(chamadas), 60)}
+
+        with self.app.app_context():
+            primeira = AgendadorNotificacoes(tarefas=tarefas, duracao_lease=300)
+            segunda = AgendadorNotificacoes(tarefas=tarefas, duracao_lease=300)
+
+            primeira._garantir_registros()
+            self.assertTrue(primeira.reservar('teste'))
+            self.assertFalse(segunda.reservar('teste'))
+            self.assertEqual(segunda.executar_pendentes(), {})
+
+            # A primeira instância parou sem concluir: após o lease a segunda assume
+            self.assertTrue(segunda.reservar('teste', agora=datetime.utcnow() + timedelta(seconds=301)))
+            self.assertEqual(segunda.executar_tarefa('teste'), 1)
+            self.assertEqual(chamadas, [1])
+
+            # A próxima execução vale para as duas instâncias
+            self.assertEqual(primeira.executar_pendentes(), {})
+
+    def test_03_erro_registrado_e_intervalo_com_jitter(self):
+        """Uma tarefa com erro é registrada e reagendada dentro do intervalo com jitter"""
+        def falhar():
+            raise RuntimeError('banco indisponível')
+
+        with self.app.app_context():
+            agendador = AgendadorNotificacoes(tarefas={'falha': (falhar, 100)}, jitter=0.2)
+            self.assertEqual(agendador.executar_pendentes(), {'falha': None})
+
+            execucao = db.session.get(ExecucaoAgendador, 'falha')
+            self.assertEqual(execucao.erro_ultima_execucao, 'banco indisponível')
+            espera = (execucao.proxima_execucao - execucao.fim_ultima_execucao).total_seconds()
+            self.assertGreaterEqual(espera, 80)
+            self.assertLessEqual(espera, 120)
+
+    def test_04_laco_para_com_evento(self):
+        """O laço executa as tarefas e termina quando o evento de parada é acionado"""
+        parar = threading.Event()
+        tarefas = {'teste': (lambda: parar.set() or 1, 60)}
+
+        with self.app.app_context():
+            AgendadorNotificacoes(tarefas=tarefas).executar(parar, espera_max=1)
+            self.assertEqual(db.session.get(ExecucaoAgendador, 'teste').execucoes, 1)
+
+    def test_05_endpoint_estado(self):
+        """Administradores consultam o estado das tarefas pela API"""
+        with self.app.app_context():
+            AgendadorNotificacoes().executar_pendentes()
+
+        cliente = self.app.test_client()
+        response = cliente.get('/api/notificacoes/agendador', headers=obter_headers(cliente))
+        self.assertEqual(response.status_code, 200)
+        tarefas = response.get_json()['data']['tarefas']
+        self.assertEqual([tarefa['tarefa'] for tarefa in tarefas], ['checklist', 'inativos', 'pendentes', 'prazos'])
+
+    def test_06_lease_assumido_nao_e_liberado(self):
+        """Uma tarefa que excede o lease não libera a reserva assumida por outra instância"""
+        with self.app.app_context():
+            segunda = AgendadorNotificacoes(tarefas={'teste': (lambda: 1, 60)}, duracao_lease=300)
+
+            def assumir():
+                # Durante a execução, o lease expira e a segunda instância assume a tarefa
+                self.assertTrue(segunda.reservar('teste', agora=datetime.utcnow() + timedelta(seconds=301)))
+                return 1
+
+            primeira = AgendadorNotificacoes(tarefas={'teste': (assumir, 60)}, duracao_lease=300)
+            self.assertEqual(primeira.executar_pendentes(), {'teste': 1})
+
+            execucao = db.session.get(ExecucaoAgendador, 'teste')
+            db.session.refresh(execucao)
+            self.assertEqual(execucao.lease_dono, segunda.dono)
+            self.assertIsNotNone(execucao.lease_ate)
+
+    def test_07_prazos_completo_periodico(self):
+        """A tarefa de prazos é completa na primeira vez e após intervalo_completo; incremental entre elas"""
+        with self.app.app_context():
+            verificar = lambda: NotificacaoService.verificar_prazos_vencidos(intervalo_completo=3600)
+
+            self.assertEqual(verificar()['modo'], 'completo')
+            self.assertEqual(verificar()['modo'], 'incremental')
+
+            db.session.get(MarcaVerificacao, 'prazos_completo').valor -= timedelta(seconds=3601)
+            db.session.commit()
+            self.assertEqual(verificar()['modo'], 'completo')
+            self.assertEqual(verificar()['modo'], 'incremental')
+            self.assertEqual(NotificacaoService.verificar_prazos_vencidos(completo=True)['modo'], 'completo')
+
+
+if __name__ == '__main__':
+    unittest.main()
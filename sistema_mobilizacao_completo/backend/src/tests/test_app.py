@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Testes da fábrica da aplicação e do comando bootstrap.
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+
+import app_teste  # noqa: F401 - ajusta o path
+
+from sqlalchemy import event
+from src.main import create_app, bootstrap, aquecer
+from src.models.mobilizacao import db, Usuario, EtapaProcesso
+from src.models.permissoes import (
+    Permissao, invalidar_permissoes, obter_grupos_etapa, obter_permissoes, obter_usuario_autenticado
+)
+from src.services.etapas_service import EtapasService
+
+
+class TestApp(unittest.TestCase):
+    """Testes de create_app e bootstrap"""
+
+    def setUp(self):
+        diretorio = tempfile.mkdtemp(prefix='mobilizacao_teste_')
+        self.caminho_banco = os.path.join(diretorio, 'app.db')
+        self.app = create_app({
+            'SQLALCHEMY_DATABASE_URI': f"sqlite:///{self.caminho_banco}",
+            'REGISTRO_ACESSOS_ASSINCRONO': 'false'
+        })
+
+    def test_01_criacao_sem_acessar_o_banco(self):
+        """Criar a aplicação não abre conexões com o banco"""
+        self.assertFalse(os.path.exists(self.caminho_banco))
+        self.assertIn('auth', self.app.blueprints)
+        self.assertIn('notificacoes', self.app.blueprints)
+
+    def test_01b_importacao_nao_cria_aplicacao(self):
+        """Importar src.main não cria a aplicação nem importa as rotas"""
+        raiz = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        saida = subprocess.run(
+            [sys.executable, '-c', "import sys, src.main; print(hasattr(src.main, 'app'), "
+                                   "any(m.startswith('src.routes') for m in sys.modules))"],
+            cwd=raiz, capture_output=True, text=True, check=True
+        ).stdout
+        self.assertEqual(saida.split(), ['False', 'False'])
+
+    def test_02_comando_bootstrap(self):
+        """`flask bootstrap` cria o esquema e os dados iniciais, e pode ser repetido"""
+        runner = self.app.test_cli_runner()
+        with redirect_stdout(StringIO()):
+            resultado = runner.invoke(args=['bootstrap'])
+        self.assertIsNone(resultado.exception)
+
+        with self.app.app_context():
+            contagens = (Usuario.query.count(), EtapaProcesso.query.count(), Permissao.query.count())
+            self.assertTrue(all(contagens))
+
+        with redirect_stdout(StringIO()):
+            resultado = runner.invoke(args=['bootstrap'])
+        self.assertIsNone(resultado.exception)
+
+        with self.app.app_context():
+            self.assertEqual((Usuario.query.count(), EtapaProcesso.query.count(), Permissao.query.count()), contagens)
+
+    def test_03_aquecer_para_preload(self):
+        """aquecer carrega os dados de referência e não deixa conexões abertas"""
+        with redirect_stdout(StringIO()):
+            bootstrap(self.app)
+        invalidar_permissoes()
+        EtapasService.invalidar()
+
+        aquecer(self.app)
+
+        with self.app.app_context():
+            self.assertEqual(db.engine.pool.checkedin(), 0)
+
+            consultas = []
+            event.listen(db.engine, 'before_cursor_execute', lambda *args: consultas.append(args[2]))
+            for etapa_id in range(1, 4):
+                obter_grupos_etapa(etapa_id)
+            admin = obter_usuario_autenticado(1)
+            self.assertTrue(admin.is_admin())
+            self.assertTrue(obter_permissoes(1).admin)
+            self.assertEqual(consultas, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Testes da verificação de tokens JWT em cache e da revogação por /logout.
+"""
+
+import time
+import unittest
+from datetime import datetime, timedelta
+from unittest import mock
+
+from app_teste import criar_app_teste, obter_headers
+
+import jwt
+from sqlalchemy import text
+from src.models.mobilizacao import db, RevogacaoToken, Usuario
+from src.routes import auth
+from src.routes.auth import decodificar_token, digest_token
+
+
+class TestAuth(unittest.TestCase):
+    """Testes de token_required com cache de tokens verificados"""
+
+    def setUp(self):
+        self.app = criar_app_teste()
+        self.cliente = self.app.test_client()
+        auth._cache_tokens.limpar()
+
+    def token(self, headers):
+        return headers['Authorization'].split(" ")[1]
+
+    def test_01_token_verificado_uma_vez(self):
+        """Requisições seguintes com o mesmo token não recalculam a assinatura"""
+        headers = obter_headers(self.cliente)
+
+        with mock.patch('src.routes.auth.jwt.decode', wraps=jwt.decode) as decode:
+            for _ in range(5):
+                self.assertEqual(self.cliente.get('/api/auth/me', headers=headers).status_code, 200)
+        self.assertEqual(decode.call_count, 1)
+
+    def test_02_logout_revoga_o_token(self):
+        """Após o logout o token é recusado, também por outro worker; outras sessões continuam válidas"""
+        headers = obter_headers(self.cliente)
+        outra_sessao = obter_headers(self.cliente)
+        self.assertNotEqual(headers, outra_sessao)
+
+        response = self.cliente.post('/api/auth/logout', headers=headers)
+        self.assertEqual(response.status_code, 200)
+
+        response = self.cliente.get('/api/auth/me', headers=headers)
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.get_json()['error']['code'], 'REVOKED_TOKEN')
+        self.assertEqual(self.cliente.get('/api/auth/me', headers=outra_sessao).status_code, 200)
+
+        # Um worker sem o token em cache consulta a tabela de revogações
+        auth._cache_tokens.limpar()
+        self.assertEqual(self.cliente.get('/api/auth/me', headers=headers).status_code, 401)
+
+        with self.app.app_context():
+            revogacao = db.session.get(RevogacaoToken, digest_token(self.token(headers)))
+            self.assertGreater(revogacao.expira_em, datetime.utcnow() + timedelta(hours=23))
+
+    def test_03_cache_respeita_expiracao(self):
+        """Um token não fica em cache além da sua expiração"""
+        with self.app.app_context():
+            token = jwt.encode({'user_id': 1, 'exp': datetime.utcnow() + timedelta(seconds=2)},
+                               self.app.config['SECRET_KEY'], algorithm='HS256')
+            decodificar_token(token)
+
+        _, expira_em = auth._cache_tokens._itens[digest_token(token)]
+        self.assertLessEqual(expira_em - time.monotonic(), 2)
+
+    def test_04_token_invalido(self):
+        """Tokens com assinatura inválida nunca entram no cache"""
+        token = jwt.encode({'user_id': 1, 'exp': datetime.utcnow() + timedelta(hours=1)},
+                           'outra-chave-com-pelo-menos-32-bytes!!', algorithm='HS256')
+        response = self.cliente.get('/api/auth/me', headers={'Authorization': f"Bearer {token}"})
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.get_json()['error']['code'], 'INVALID_TOKEN')
+        self.assertEqual(len(auth._cache_tokens), 0)
+
+    def test_05_me_de_usuario_excluido(self):
+        """/me de um usuário excluído após a emissão do token responde 401, não 500"""
+        headers = obter_headers(self.cliente, {'email': 'maria.rh@empresa.com', 'senha': 'senha123'})
+        self.assertEqual(self.cliente.get('/api/auth/me', headers=headers).status_code, 200)
+
+        # Exclusão direta no banco: o snapshot do usuário continua em cache
+        with self.app.app_context():
+            maria = Usuario.query.filter_by(email='maria.rh@empresa.com').first()
+            db.session.execute(text('DELETE FROM usuario_grupo WHERE usuario_id = :id'), {'id': maria.id})
+            db.session.execute(text('DELETE FROM usuarios WHERE id = :id'), {'id': maria.id})
+            db.session.commit()
+
+        response = self.cliente.get('/api/auth/me', headers=headers)
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.get_json()['error']['code'], 'INVALID_USER')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Testes da listagem de cards (carregamento em lote e serialização enxuta).
+"""
+
+import unittest
+from datetime import datetime
+
+from app_teste import criar_app_teste, obter_headers
+
+from sqlalchemy import event
+from src.models.mobilizacao import db, CardMobilizacao, EtapaProcesso
+from src.services.cards_service import CardsService
+
+
+class TestCardsListagem(unittest.TestCase):
+    """Testes de GET /api/cards"""
+
+    def setUp(self):
+        self.app = criar_app_teste()
+        self.cliente = self.app.test_client()
+        self.headers = obter_headers(self.cliente)
+
+        with self.app.app_context():
+            etapas = EtapaProcesso.query.order_by(EtapaProcesso.ordem).all()
+            for i in range(60):
+                card = CardMobilizacao(
+                    nome_colaborador=f"Colaborador {i}",
+                    etapa_atual=etapas[i % len(etapas)],
+                    data_entrada_etapa=datetime.utcnow()
+                )
+                db.session.add(card)
+                if i % 4 == 0 and card.checklist_items:
+                    card.checklist_items[0].concluido = True
+            db.session.commit()
+            self.engine = db.engine
+
+        CardsService.invalidar_contagem_por_etapa()
+
+    def listar(self, limite, consultas=None):
+        """Retorna (dados da resposta, número de consultas SQL)"""
+        consultas = [] if consultas is None else consultas
+
+        def registrar(*args):
+            consultas.append(args[2])
+
+        event.listen(self.engine, 'before_cursor_execute', registrar)
+        try:
+            response = self.cliente.get(f"/api/cards?limit={limite}", headers=self.headers)
+        finally:
+            event.remove(self.engine, 'before_cursor_execute', registrar)
+
+        self.assertEqual(response.status_code, 200)
+        return response.get_json()['data'], len(consultas)
+
+    def test_01_consultas_limitadas(self):
+        """Uma página de 50 cards usa o mesmo número de consultas que uma de 5"""
+        # Aquece o cache do usuário autenticado
+        self.listar(5)
+        CardsService.invalidar_contagem_por_etapa()
+        _, consultas_5 = self.listar(5)
+        CardsService.invalidar_contagem_por_etapa()
+        dados, consultas_50 = self.listar(50)
+
+        self.assertEqual(len(dados['cards']), 50)
+        self.assertEqual(consultas_50, consultas_5)
+        self.assertLessEqual(consultas_50, 20)
+
+    def test_02_etapas_e_progresso(self):
+        """Etapas vêm na tabela auxiliar e o progresso confere com o modelo"""
+        dados, _ = self.listar(50)
+
+        with self.app.app_context():
+            for card_dict in dados['cards']:
+                card = db.session.get(CardMobilizacao, card_dict['id'])
+                etapa_id = str(card.etapa_atual_id)
+
+                self.assertEqual(card_dict['etapa_atual'], {'id': card.etapa_atual_id, 'nome': card.etapa_atual.nome})
+                self.assertEqual(dados['etapas'][etapa_id], card.etapa_atual.to_dict())
+                self.assertEqual(card_dict['checklist_progresso'], card.get_progresso_checklist())
+
+    def test_03_contagem_por_etapa_em_cache(self):
+        """A contagem por etapa é reutilizada entre páginas e invalidada ao criar cards"""
+        consultas = []
+        dados, _ = self.listar(10, consultas)
+        self.listar(10, consultas)
+
+        agrupadas = [sql for sql in consultas if 'GROUP BY etapas_processo.id' in sql]
+        self.assertEqual(len(agrupadas), 1)
+
+        with self.app.app_context():
+            esperado = {
+                str(etapa.id): CardMobilizacao.query.filter_by(etapa_atual_id=etapa.id).count()
+                for etapa in EtapaProcesso.query.filter_by(ativo=True).all()
+            }
+            primeira_etapa = EtapaProcesso.query.order_by(EtapaProcesso.ordem).first().id
+        self.assertEqual(dados['por_etapa'], esperado)
+
+        response = self.cliente.post('/api/cards', json={'nome_colaborador': 'Novo'}, headers=self.headers)
+        self.assertEqual(response.status_code, 201)
+
+        dados, _ = self.listar(10)
+        self.assertEqual(dados['por_etapa'][str(primeira_etapa)], esperado[str(primeira_etapa)] + 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
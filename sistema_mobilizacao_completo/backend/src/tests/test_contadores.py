@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Testes dos contadores materializados do dashboard.
+"""
+
+import unittest
+
+from app_teste import criar_app_teste, obter_headers
+
+from src.models.mobilizacao import db, CardMobilizacao, EtapaProcesso, DashboardContador
+from src.services.contadores_service import ContadoresService
+
+
+class TestContadores(unittest.TestCase):
+    """Testes da manutenção incremental dos contadores"""
+
+    def setUp(self):
+        self.app = criar_app_teste()
+        self.cliente = self.app.test_client()
+        self.headers = obter_headers(self.cliente)
+
+    def contagem_real(self, centro_custo=None):
+        """Contagem por etapa calculada diretamente sobre os cards"""
+        contagem = {}
+        query = CardMobilizacao.query
+        if centro_custo:
+            query = query.filter_by(centro_custo=centro_custo)
+        for card in query.all():
+            por_status = contagem.setdefault(card.etapa_atual_id, {})
+            por_status[card.status_etapa or ''] = por_status.get(card.status_etapa or '', 0) + 1
+        return contagem
+
+    def test_01_mutacoes_mantem_contadores(self):
+        """Criar, atualizar, mover e excluir cards mantém os contadores exatos"""
+        ids = []
+        for i in range(4):
+            response = self.cliente.post('/api/cards', json={
+                'nome_colaborador': f"Colaborador {i}",
+                'centro_custo': 'TI' if i % 2 else 'RH'
+            }, headers=self.headers)
+            self.assertEqual(response.status_code, 201)
+            ids.append(response.get_json()['data']['id'])
+
+        with self.app.app_context():
+            segunda_etapa = EtapaProcesso.query.order_by(EtapaProcesso.ordem).offset(1).first().id
+
+        self.cliente.put(f"/api/cards/{ids[0]}", json={'status_etapa': 'EM_ANDAMENTO'}, headers=self.headers)
+        self.cliente.put(f"/api/cards/{ids[1]}", json={'centro_custo': 'FIN'}, headers=self.headers)
+        self.cliente.put(f"/api/cards/{ids[2]}/mover", json={'etapa_destino_id': segunda_etapa}, headers=self.headers)
+        self.cliente.delete(f"/api/cards/{ids[3]}", headers=self.headers)
+
+        with self.app.app_context():
+            self.assertEqual(ContadoresService.ler_por_etapa(), self.contagem_real())
+            self.assertEqual(ContadoresService.ler_por_etapa('FIN'), self.contagem_real('FIN'))
+            self.assertEqual(ContadoresService.reconciliar()['divergencias'], 0)
+
+    def test_02_reconciliacao_corrige_divergencias(self):
+        """Alterações feitas fora da API são detectadas e corrigidas"""
+        with self.app.app_context():
+            card = CardMobilizacao.query.first()
+            card.status_etapa = 'FINALIZADO'
+            db.session.add(DashboardContador(etapa_id=card.etapa_atual_id, status_etapa='X', total=3))
+            db.session.commit()
+
+            resultado = ContadoresService.reconciliar()
+            self.assertGreaterEqual(resultado['divergencias'], 2)
+            self.assertEqual(ContadoresService.ler_por_etapa(), self.contagem_real())
+            self.assertEqual(ContadoresService.reconciliar()['divergencias'], 0)
+
+    def test_03_dashboard_usa_contadores(self):
+        """O resumo do dashboard reflete os contadores"""
+        response = self.cliente.get('/api/dashboard/indicadores', headers=self.headers)
+        resumo = response.get_json()['data']['resumo']
+
+        with self.app.app_context():
+            total = CardMobilizacao.query.count()
+            finalizados = CardMobilizacao.query.filter_by(status_etapa='FINALIZADO').count()
+
+        self.assertEqual(resumo['total_cards'], total)
+        self.assertEqual(resumo['cards_finalizados'], finalizados)
+        self.assertEqual(resumo['cards_em_andamento'], total - finalizados)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Testes da entrega de emails com pool de conexões SMTP.
+"""
+
+import os
+import unittest
+from email.message import EmailMessage
+from unittest import mock
+
+from app_teste import criar_app_teste
+from servidor_smtp import ServidorSMTPTeste
+
+from src.models.mobilizacao import db, Notificacao
+from src.services.entrega_email import PoolSMTP, EntregadorEmail, encerrar_entregador
+from src.services.notificacao_service import NotificacaoService
+
+
+def mensagem(indice, destinatario=None):
+    msg = EmailMessage()
+    msg['From'] = 'sistema@mobilizacao.com.br'
+    msg['To'] = destinatario or f"colaborador{indice}@empresa.com"
+    msg['Subject'] = f"Notificação {indice}"
+    msg.set_content('Teste')
+    return (indice, msg)
+
+
+class TestEntregaEmail(unittest.TestCase):
+    """Testes do PoolSMTP e do EntregadorEmail"""
+
+    def criar_entregador(self, servidor, paralelismo=4):
+        pool = PoolSMTP('127.0.0.1', servidor.porta, usar_tls=False, tamanho=paralelismo, timeout=5)
+        self.addCleanup(pool.fechar)
+        return EntregadorEmail(pool, paralelismo=paralelismo)
+
+    def test_01_reaproveita_conexoes(self):
+        """Vários lotes usam as mesmas sessões SMTP"""
+        with ServidorSMTPTeste() as servidor:
+            entregador = self.criar_entregador(servidor)
+
+            for lote in range(3):
+                resultado = entregador.enviar_lote([mensagem(lote * 100 + i) for i in range(100)])
+                self.assertEqual(resultado['enviadas'], 100)
+                self.assertEqual(resultado['falhas'], 0)
+                self.assertGreater(resultado['mensagens_por_segundo'], 0)
+
+            self.assertEqual(len(servidor.mensagens), 300)
+            self.assertEqual(servidor.conexoes, 4)
+            self.assertEqual(entregador.estatisticas()['conexoes_abertas'], 4)
+
+    def test_02_reconecta_apos_421(self):
+        """Quedas com 421 levam à reconexão sem perder mensagens"""
+        with ServidorSMTPTeste(queda_apos=15) as servidor:
+            entregador = self.criar_entregador(servidor, paralelismo=2)
+
+            resultado = entregador.enviar_lote([mensagem(i) for i in range(100)])
+
+            self.assertEqual(resultado['enviadas'], 100)
+            self.assertGreater(resultado['reconexoes'], 0)
+            self.assertEqual(len(servidor.mensagens), 100)
+
+    def test_03_recusa_definitiva(self):
+        """Um 550 falha apenas a mensagem, sem reconectar"""
+        with ServidorSMTPTeste(recusados=['invalido@empresa.com']) as servidor:
+            entregador = self.criar_entregador(servidor, paralelismo=1)
+
+            mensagens = [mensagem(i) for i in range(10)] + [mensagem(10, 'invalido@empresa.com')]
+            resultado = entregador.enviar_lote(mensagens)
+
+            self.assertEqual(resultado['enviadas'], 10)
+            self.assertIsNotNone(resultado['resultados'][10])
+            self.assertEqual(resultado['reconexoes'], 0)
+            self.assertEqual(servidor.conexoes, 1)
+
+    def test_03b_recusa_temporaria_de_destinatario(self):
+        """Um 450 (greylisting) falha apenas a mensagem: a sessão segue com as demais"""
+        with ServidorSMTPTeste(adiados=['adiado@empresa.com']) as servidor:
+            entregador = self.criar_entregador(servidor, paralelismo=1)
+
+            mensagens = [mensagem(0, 'adiado@empresa.com')] + [mensagem(i) for i in range(1, 10)]
+            resultado = entregador.enviar_lote(mensagens)
+
+            self.assertEqual(resultado['enviadas'], 9)
+            self.assertIn(450, resultado['resultados'][0].recipients['adiado@empresa.com'])
+            self.assertEqual(resultado['reconexoes'], 0)
+            self.assertEqual(servidor.conexoes, 1)
+            self.assertEqual(len(servidor.mensagens), 9)
+
+    def test_04_servidor_indisponivel(self):
+        """Sem servidor, todas as mensagens falham sem travar o lote"""
+        with ServidorSMTPTeste() as servidor:
+            porta = servidor.porta
+
+        pool = PoolSMTP('127.0.0.1', porta, usar_tls=False, timeout=1)
+        resultado = EntregadorEmail(pool, paralelismo=2).enviar_lote([mensagem(i) for i in range(20)])
+
+        self.assertEqual(resultado['falhas'], 20)
+
+    def test_05_notificacoes_marcadas_como_enviadas(self):
+        """entregar_notificacoes usa o entregador e registra o resultado no banco"""
+        app = criar_app_teste(popular=False)
+
+        with ServidorSMTPTeste(recusados=['invalido@empresa.com']) as servidor:
+            ambiente = {
+                'FLASK_ENV': 'production',
+                'SMTP_SERVER': '127.0.0.1',
+                'SMTP_PORT': str(servidor.porta),
+                'SMTP_USER': '',
+                'SMTP_STARTTLS': 'false'
+            }
+            with mock.patch.dict(os.environ, ambiente), app.app_context():
+                encerrar_entregador()
+                self.addCleanup(encerrar_entregador)
+
+                notificacoes = [
+                    Notificacao(tipo='TESTE', titulo=f"Teste {i}", mensagem='Teste',
+                                destinatario_email='invalido@empresa.com' if i == 0 else f"usuario{i}@empresa.com")
+                    for i in range(20)
+                ]
+                db.session.add_all(notificacoes)
+                db.session.commit()
+
+                resultado = NotificacaoService.entregar_notificacoes(notificacoes)
+
+                self.assertEqual(resultado, {'emails': 19, 'enviadas': 19, 'falhas': 1})
+                self.assertEqual(Notificacao.query.filter_by(enviado=True).count(), 19)
+                falha = Notificacao.query.filter_by(enviado=False).one()
+                self.assertEqual(falha.tentativas_envio, 1)
+                self.assertIn('550', falha.erro_envio)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Testes do snapshot em memória das etapas do processo.
+"""
+
+import unittest
+from unittest import mock
+
+from app_teste import criar_app_teste, obter_headers
+
+from sqlalchemy import event, update
+from src.models.mobilizacao import db, EtapaProcesso, CardMobilizacao, VersaoDados
+from src.services import etapas_service
+from src.services.etapas_service import EtapasService
+from src.utils.consultas import incrementar
+
+
+class TestEtapasService(unittest.TestCase):
+    """Testes de EtapasService"""
+
+    def setUp(self):
+        self.app = criar_app_teste()
+        self.cliente = self.app.test_client()
+        self.headers = obter_headers(self.cliente)
+
+    def consultas_etapas(self, funcao):
+        """Executa funcao e retorna as consultas às tabelas de etapas"""
+        consultas = []
+        registrar = lambda *args: consultas.append(args[2])
+        with self.app.app_context():
+            event.listen(db.engine, 'before_cursor_execute', registrar)
+        try:
+            funcao()
+        finally:
+            with self.app.app_context():
+                event.remove(db.engine, 'before_cursor_execute', registrar)
+        return [sql for sql in consultas if 'etapas_processo' in sql or 'checklist_etapas' in sql]
+
+    def test_01_snapshot_equivale_ao_modelo(self):
+        """O snapshot tem as etapas em ordem, com os mesmos dados do modelo"""
+        with self.app.app_context():
+            snapshot = EtapasService.snapshot()
+            etapas = EtapaProcesso.query.order_by(EtapaProcesso.ordem).all()
+
+            self.assertEqual([etapa.id for etapa in snapshot.etapas], [etapa.id for etapa in etapas])
+            for etapa in etapas:
+                self.assertEqual(snapshot.obter(etapa.id).to_dict(), etapa.to_dict())
+                self.assertEqual(snapshot.obter(etapa.id).grupo_ids, {grupo.id for grupo in etapa.grupos_permitidos})
+            self.assertIsNone(snapshot.obter(999))
+
+    def test_02_leituras_sem_consultar_etapas(self):
+        """Listar etapas, obter etapa e serializar cards não consultam as tabelas de etapas"""
+        # Carrega o snapshot e a contagem por etapa (cache próprio, com TTL)
+        self.cliente.get('/api/etapas', headers=self.headers)
+        self.cliente.get('/api/cards?limit=20', headers=self.headers)
+        with self.app.app_context():
+            card_id = db.session.query(CardMobilizacao.id).first()[0]
+
+        def ler():
+            self.assertEqual(self.cliente.get('/api/etapas', headers=self.headers).status_code, 200)
+            self.assertEqual(self.cliente.get('/api/etapas/1', headers=self.headers).status_code, 200)
+            self.assertEqual(self.cliente.get('/api/etapas/1/checklist', headers=self.headers).status_code, 200)
+            self.assertEqual(self.cliente.get(f"/api/cards/{card_id}", headers=self.headers).status_code, 200)
+            self.assertEqual(self.cliente.get('/api/cards?limit=20', headers=self.headers).status_code, 200)
+
+        self.assertEqual(self.consultas_etapas(ler), [])
+
+    def test_03_alteracao_incrementa_versao(self):
+        """Alterações pela API incrementam a versão e valem na leitura seguinte"""
+        with self.app.app_context():
+            versao_inicial = EtapasService.snapshot().versao
+
+        response = self.cliente.put('/api/etapas/1', json={'nome': 'Requisição aprovada'}, headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+
+        response = self.cliente.post('/api/etapas/1/checklist', json={'tarefa': 'Nova tarefa'}, headers=self.headers)
+        self.assertEqual(response.status_code, 201)
+
+        etapa = self.cliente.get('/api/etapas/1', headers=self.headers).get_json()['data']
+        self.assertEqual(etapa['nome'], 'Requisição aprovada')
+        self.assertIn('Nova tarefa', [item['tarefa'] for item in etapa['checklist']])
+
+        with self.app.app_context():
+            self.assertEqual(db.session.get(VersaoDados, 'etapas').versao, EtapasService.snapshot().versao)
+            self.assertEqual(EtapasService.snapshot().versao, versao_inicial + 2)
+
+    def test_04_alteracao_de_outro_worker(self):
+        """Outro processo que incrementa a versão é percebido na verificação seguinte"""
+        with self.app.app_context():
+            EtapasService.snapshot()
+
+            # Alteração feita por outro worker: dados e versão, sem passar por este processo
+            db.session.execute(update(EtapaProcesso).where(EtapaProcesso.id == 1).values(nome='Alterada'))
+            incrementar(VersaoDados.__table__, {'nome': 'etapas'}, 'versao', 1)
+            db.session.commit()
+
+            # Dentro do intervalo, a versão não é consultada
+            self.assertNotEqual(EtapasService.snapshot().obter(1).nome, 'Alterada')
+
+            with mock.patch.object(etapas_service, '_INTERVALO_VERSAO', 0):
+                self.assertEqual(EtapasService.snapshot().obter(1).nome, 'Alterada')
+
+    def test_05_mover_card_usa_etapa_do_snapshot(self):
+        """Mover um card aplica prazo, responsável e checklist da etapa de destino"""
+        with self.app.app_context():
+            card = CardMobilizacao.query.filter_by(etapa_atual_id=1).first()
+            destino = EtapasService.snapshot().obter(2)
+            card_id = card.id
+
+        response = self.cliente.put(f"/api/cards/{card_id}/mover", json={'etapa_destino_id': 2}, headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        dados = response.get_json()['data']
+
+        self.assertEqual(dados['etapa_atual']['id'], 2)
+        self.assertEqual(dados['responsavel_atual'], destino.dono_email)
+        self.assertEqual(dados['checklist_progresso']['total'], len(destino.checklist_ativo()))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Testes de regressão dos planos de consulta (EXPLAIN QUERY PLAN).
+Falham se uma consulta dos endpoints mais usados voltar a percorrer uma
+tabela grande inteira em vez de usar um índice.
+"""
+
+import re
+import unittest
+from datetime import datetime, timedelta
+
+from app_teste import criar_app_teste, obter_headers
+
+from sqlalchemy import event, text
+from src.models.mobilizacao import db, Usuario, EtapaProcesso, MarcaVerificacao
+from src.utils.migracoes import aplicar_indices
+
+TABELAS_MONITORADAS = ('cards_mobilizacao', 'notificacoes', 'log_acessos', 'historico_movimentacao')
+
+# Varredura completa: "SCAN tabela" sem "USING [COVERING] INDEX"
+VARREDURA = re.compile(r'SCAN (%s)\b(?!.*USING)' % '|'.join(TABELAS_MONITORADAS))
+
+
+class TestIndices(unittest.TestCase):
+    """Planos das consultas dos endpoints com filtros"""
+
+    def setUp(self):
+        self.app = criar_app_teste()
+        self.cliente = self.app.test_client()
+        self.headers = obter_headers(self.cliente)
+
+        with self.app.app_context():
+            self.etapa_id = EtapaProcesso.query.order_by(EtapaProcesso.ordem).first().id
+            self.engine = db.engine
+
+    def planos(self, urls):
+        """Executa as requisições e retorna [(sql, plano)] das consultas emitidas"""
+        consultas = []
+
+        def registrar(conn, cursor, sql, parametros, context, executemany):
+            if sql.lstrip().upper().startswith('SELECT') and not executemany:
+                consultas.append((sql, parametros))
+
+        event.listen(self.engine, 'before_cursor_execute', registrar)
+        try:
+            for url in urls:
+                response = self.cliente.get(url, headers=self.headers)
+                self.assertEqual(response.status_code, 200, url)
+        finally:
+            event.remove(self.engine, 'before_cursor_execute', registrar)
+
+        resultado = []
+        with self.engine.connect() as conexao:
+            for sql, parametros in consultas:
+                linhas = conexao.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}", parametros).fetchall()
+                resultado.append((sql, '\n'.join(linha[-1] for linha in linhas)))
+        return resultado
+
+    def verificar_sem_varredura(self, urls):
+        varreduras = [
+            f"{sql}\n-> {plano}" for sql, plano in self.planos(urls) if VARREDURA.search(plano)
+        ]
+        self.assertEqual(varreduras, [], '\n\n'.join(varreduras))
+
+    def test_01_cards(self):
+        """Filtros e cursor da listagem de cards usam índices"""
+        self.verificar_sem_varredura([
+            f"/api/cards?cursor=&etapa_id={self.etapa_id}",
+            '/api/cards?cursor=&status=EM_ANDAMENTO',
+            '/api/cards?cursor=&responsavel=maria.rh@empresa.com',
+            '/api/cards?cursor=&prazo_vencido=true',
+            '/api/cards?cursor=&limit=1',
+        ])
+
+    def test_02_dashboard(self):
+        """Indicadores do dashboard usam índices"""
+        self.verificar_sem_varredura(['/api/dashboard/indicadores?periodo=30d'])
+
+    def test_03_notificacoes_e_logs(self):
+        """Notificações do usuário e logs de acesso usam índices"""
+        self.verificar_sem_varredura([
+            '/api/notificacoes',
+            '/api/notificacoes?cursor=',
+            '/api/notificacoes/contagem',
+            '/api/permissoes/logs?cursor=',
+        ])
+
+    def test_04_migracao_em_banco_existente(self):
+        """aplicar_indices cria os índices ausentes e é idempotente"""
+        with self.app.app_context():
+            db.session.execute(text('DROP INDEX ix_cards_prazo'))
+            db.session.execute(text('DROP INDEX ix_log_acessos_data'))
+            db.session.commit()
+
+            self.assertEqual(sorted(aplicar_indices()), ['ix_cards_prazo', 'ix_log_acessos_data'])
+            self.assertEqual(aplicar_indices(), [])
+
+    def test_05_migracao_adiciona_colunas(self):
+        """aplicar_colunas adiciona colunas novas a tabelas existentes"""
+        from src.utils.migracoes import aplicar_colunas
+
+        with self.app.app_context():
+            db.session.execute(text('DROP INDEX ix_notificacoes_fila'))
+            for coluna in ('lease_dono', 'lease_ate', 'proxima_tentativa'):
+                db.session.execute(text(f'ALTER TABLE notificacoes DROP COLUMN {coluna}'))
+            db.session.commit()
+
+            self.assertEqual(sorted(aplicar_colunas()), [
+                'notificacoes.lease_ate', 'notificacoes.lease_dono', 'notificacoes.proxima_tentativa'
+            ])
+            self.assertEqual(aplicar_colunas(), [])
+            self.assertEqual(aplicar_indices(), ['ix_notificacoes_fila'])
+
+    def test_06_prazos_incremental(self):
+        """A verificação incremental de prazos parte das mudanças, não do backlog vencido"""
+        from src.services.notificacao_service import NotificacaoService
+
+        consultas = []
+
+        def registrar(conn, cursor, sql, parametros, context, executemany):
+            if 'cards_mobilizacao' in sql and sql.lstrip().upper().startswith('SELECT'):
+                consultas.append((sql, parametros))
+
+        with self.app.app_context():
+            db.session.add(MarcaVerificacao(nome='prazos', valor=datetime.utcnow() - timedelta(hours=1)))
+            db.session.commit()
+
+            event.listen(self.engine, 'before_cursor_execute', registrar)
+            try:
+                NotificacaoService.verificar_prazos_vencidos()
+            finally:
+                event.remove(self.engine, 'before_cursor_execute', registrar)
+
+        self.assertEqual(len(consultas), 2)
+        with self.engine.connect() as conexao:
+            for sql, parametros in consultas:
+                plano = '\n'.join(
+                    linha[-1] for linha in conexao.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}", parametros)
+                )
+                self.assertIn('ix_cards_ultima_atualizacao (ultima_atualizacao>?)', plano)
+                self.assertNotIn('ix_cards_prazo (prazo_etapa<?)', plano)
+                self.assertIsNone(VARREDURA.search(plano), plano)
+
+
+if __name__ == '__main__':
+    unittest.main()
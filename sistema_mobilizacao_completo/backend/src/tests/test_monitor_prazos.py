@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Testes do monitor de prazos em memória.
+"""
+
+import os
+import unittest
+from datetime import datetime, timedelta
+from unittest import mock
+
+from app_teste import criar_app_teste, obter_headers
+
+from sqlalchemy import event
+from src.models.mobilizacao import db, CardMobilizacao, EtapaProcesso, Notificacao
+from src.services.monitor_prazos import MonitorPrazos, registrar_monitor
+from src.services.notificacao_service import NotificacaoService
+
+
+class TestMonitorPrazos(unittest.TestCase):
+    """Testes de MonitorPrazos"""
+
+    def setUp(self):
+        # Entrega de email simulada
+        self.ambiente = mock.patch.dict(os.environ, {'FLASK_ENV': 'development'})
+        self.ambiente.start()
+        self.addCleanup(self.ambiente.stop)
+
+        self.app = criar_app_teste(popular=False)
+        self.agora = datetime.utcnow()
+
+        with self.app.app_context():
+            etapa = EtapaProcesso(nome='Documentação', ordem=1, prazo_dias=5, dias_alerta_inatividade=2,
+                                  dono_email='rh@empresa.com')
+            db.session.add(etapa)
+            db.session.flush()
+
+            self.ids = {}
+            for nome, prazo, ultima in [
+                ('vence_em_3_dias', self.agora + timedelta(days=3), self.agora),
+                ('vence_em_1_hora', self.agora + timedelta(hours=1), self.agora),
+                ('inativo_amanha', self.agora + timedelta(days=30), self.agora - timedelta(days=1)),
+            ]:
+                card = CardMobilizacao(nome_colaborador=nome, etapa_atual_id=etapa.id, status_etapa='EM_ANDAMENTO',
+                                       responsavel_atual='maria.rh@empresa.com', data_entrada_etapa=self.agora,
+                                       prazo_etapa=prazo, ultima_atualizacao=ultima)
+                db.session.add(card)
+                db.session.flush()
+                self.ids[nome] = card.id
+            db.session.commit()
+
+    def notificados(self, tipo):
+        return {card_id for card_id, in db.session.query(Notificacao.card_id).filter_by(tipo=tipo)}
+
+    def test_01_dispara_ao_atingir_cada_limite(self):
+        """Cada alerta sai quando o seu momento chega, e só uma vez"""
+        with self.app.app_context():
+            monitor = MonitorPrazos()
+            monitor.carregar()
+            self.assertEqual(monitor.estatisticas()['cards'], 3)
+
+            self.assertEqual(monitor.disparar(self.agora), {})
+
+            self.assertEqual(monitor.disparar(self.agora + timedelta(hours=1, seconds=1)), {'PRAZO_VENCIDO': 1})
+            self.assertEqual(self.notificados('PRAZO_VENCIDO'), {self.ids['vence_em_1_hora']})
+
+            criadas = monitor.disparar(self.agora + timedelta(days=1, seconds=1))
+            self.assertEqual(criadas, {'PRAZO_VENCENDO': 1, 'CARD_INATIVO': 1})
+            self.assertEqual(self.notificados('PRAZO_VENCENDO'), {self.ids['vence_em_3_dias']})
+            self.assertEqual(self.notificados('CARD_INATIVO'), {self.ids['inativo_amanha']})
+
+            self.assertEqual(monitor.disparar(self.agora + timedelta(days=1, minutes=1)), {})
+
+    def test_02_sincroniza_cards_alterados(self):
+        """Cards alterados entram com os novos limites; os antigos e os finalizados são ignorados"""
+        with self.app.app_context():
+            monitor = MonitorPrazos()
+            monitor.carregar()
+
+            card = db.session.get(CardMobilizacao, self.ids['vence_em_1_hora'])
+            card.prazo_etapa = self.agora + timedelta(days=10)
+            card.ultima_atualizacao = datetime.utcnow()
+            finalizado = db.session.get(CardMobilizacao, self.ids['vence_em_3_dias'])
+            finalizado.status_etapa = 'FINALIZADO'
+            finalizado.ultima_atualizacao = datetime.utcnow()
+            db.session.commit()
+
+            consultas = []
+            registrar = lambda *args: consultas.append(args[2])
+            event.listen(db.engine, 'before_cursor_execute', registrar)
+            try:
+                self.assertEqual(monitor.sincronizar(), 2)
+            finally:
+                event.remove(db.engine, 'before_cursor_execute', registrar)
+            self.assertEqual(len(consultas), 1)
+
+            # O prazo antigo (1 hora) e o card finalizado não geram alertas
+            self.assertEqual(monitor.disparar(self.agora + timedelta(days=1, seconds=1)), {'CARD_INATIVO': 1})
+            self.assertEqual(self.notificados('PRAZO_VENCIDO'), set())
+
+            monitor.disparar(self.agora + timedelta(days=10, seconds=1))
+            self.assertEqual(self.notificados('PRAZO_VENCIDO'), {self.ids['vence_em_1_hora']})
+            self.assertNotIn(self.ids['vence_em_3_dias'], self.notificados('PRAZO_VENCENDO'))
+
+    def test_03_limite_ja_ultrapassado_em_card_alterado(self):
+        """Um card movido para um prazo já próximo recebe o alerta na sincronização seguinte"""
+        with self.app.app_context():
+            monitor = MonitorPrazos()
+            monitor.carregar()
+
+            card = db.session.get(CardMobilizacao, self.ids['inativo_amanha'])
+            card.prazo_etapa = self.agora + timedelta(days=1)
+            card.ultima_atualizacao = datetime.utcnow()
+            db.session.commit()
+
+            monitor.sincronizar()
+            self.assertEqual(monitor.disparar(), {'PRAZO_VENCENDO': 1})
+
+    def test_04_rotas_avisam_o_monitor(self):
+        """Atualizar um card pela API avisa o monitor do processo"""
+        monitor = MonitorPrazos()
+        registrar_monitor(monitor)
+        self.addCleanup(registrar_monitor, None)
+
+        app = criar_app_teste()
+        with app.app_context():
+            card_id = db.session.query(CardMobilizacao.id).first()[0]
+
+        cliente = app.test_client()
+        response = cliente.put(f"/api/cards/{card_id}", json={'observacoes': 'Atualizado'},
+                               headers=obter_headers(cliente))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(card_id, monitor._alterados)
+
+    def test_05_lease_de_um_monitor_por_vez(self):
+        """Só um monitor detém o lease; o de uma instância parada expira e passa a outra"""
+        with self.app.app_context():
+            primeiro = MonitorPrazos(duracao_lease=60)
+            segundo = MonitorPrazos(duracao_lease=60)
+
+            self.assertTrue(primeiro.reservar())
+            self.assertFalse(segundo.reservar())
+            self.assertTrue(primeiro.reservar())
+
+            self.assertTrue(segundo.reservar(agora=datetime.utcnow() + timedelta(seconds=61)))
+            self.assertFalse(primeiro.reservar())
+
+            segundo.liberar()
+            self.assertTrue(primeiro.reservar())
+
+    def test_06_disparos_simultaneos_nao_duplicam(self):
+        """Dois disparos do mesmo limite ao mesmo tempo geram uma única notificação"""
+        momento = self.agora + timedelta(hours=1, seconds=1)
+
+        with self.app.app_context():
+            primeiro, segundo = MonitorPrazos(), MonitorPrazos()
+            primeiro.carregar()
+            segundo.carregar()
+
+            criar_em_lote = NotificacaoService._criar_notificacoes_em_lote
+            concorrentes = []
+
+            def criar_com_concorrencia(dados):
+                # O segundo monitor grava o mesmo alerta entre a consulta e o INSERT do primeiro
+                if not concorrentes:
+                    concorrentes.append(None)
+                    concorrentes[0] = segundo.disparar(momento)
+                return criar_em_lote(dados)
+
+            with mock.patch.object(NotificacaoService, '_criar_notificacoes_em_lote', side_effect=criar_com_concorrencia):
+                criadas = primeiro.disparar(momento)
+
+            self.assertEqual(concorrentes, [{'PRAZO_VENCIDO': 1}])
+            self.assertEqual(criadas, {'PRAZO_VENCIDO': 0})
+            self.assertEqual(Notificacao.query.filter_by(tipo='PRAZO_VENCIDO').count(), 1)
+
+    def test_07_monitor_em_espera_nao_dispara(self):
+        """Sem o lease, o laço do monitor não carrega o heap nem dispara"""
+        with self.app.app_context():
+            self.assertTrue(MonitorPrazos().reservar())
+
+            monitor = MonitorPrazos(intervalo_sincronizacao=1)
+            parar = mock.Mock()
+            parar.is_set.side_effect = [False, True]
+            with mock.patch.object(monitor, 'disparar') as disparar:
+                monitor.executar(parar)
+
+            disparar.assert_not_called()
+            self.assertFalse(monitor.ativo)
+            self.assertEqual(monitor.estatisticas()['cards'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,381 @@
+#!/usr/bin/env python3
+"""
+Testes da geração de notificações em lote.
+"""
+
+import email
+import os
+import unittest
+from datetime import datetime, timedelta
+from unittest import mock
+
+from app_teste import criar_app_teste
+from servidor_smtp import ServidorSMTPTeste
+
+from sqlalchemy import event
+from sqlalchemy.dialects import postgresql
+from src.models.mobilizacao import db, CardMobilizacao, EtapaProcesso, Notificacao, ChecklistEtapa, ChecklistCard, MarcaVerificacao
+from src.services.notificacao_service import NotificacaoService
+from src.services.entrega_email import encerrar_entregador
+
+
+class TestNotificacoes(unittest.TestCase):
+    """Testes da geração de notificações e da fila de envio"""
+
+    def setUp(self):
+        # Entrega de email simulada
+        self.ambiente = mock.patch.dict(os.environ, {'FLASK_ENV': 'development'})
+        self.ambiente.start()
+        self.addCleanup(self.ambiente.stop)
+
+        self.app = criar_app_teste(popular=False)
+        with self.app.app_context():
+            db.session.add(EtapaProcesso(nome='Documentação', ordem=1, prazo_dias=5, dono_email='rh@empresa.com'))
+            db.session.commit()
+
+    def criar_cards(self, quantidade, prazo, **campos):
+        with self.app.app_context():
+            etapa_id = EtapaProcesso.query.first().id
+            dados = {'etapa_atual_id': etapa_id, 'status_etapa': 'EM_ANDAMENTO',
+                     'prazo_etapa': prazo, 'responsavel_atual': 'maria.rh@empresa.com'}
+            dados.update(campos)
+            db.session.execute(CardMobilizacao.__table__.insert(), [
+                dict(dados, nome_colaborador=f"Colaborador {i}") for i in range(quantidade)
+            ])
+            db.session.commit()
+
+    def verificar(self, completo=False):
+        """Executa a verificação e retorna (resultado, número de consultas)"""
+        with self.app.app_context():
+            consultas = []
+            registrar = lambda *args: consultas.append(args[2])
+            event.listen(db.engine, 'before_cursor_execute', registrar)
+            try:
+                resultado = NotificacaoService.verificar_prazos_vencidos(completo=completo)
+            finally:
+                event.remove(db.engine, 'before_cursor_execute', registrar)
+            return resultado, len(consultas)
+
+    def test_01_gera_e_entrega_uma_por_card(self):
+        """Cada card vencido ou vencendo recebe uma notificação, já entregue"""
+        agora = datetime.utcnow()
+        self.criar_cards(30, agora - timedelta(days=1))
+        self.criar_cards(20, agora + timedelta(days=1))
+        self.criar_cards(5, agora - timedelta(days=1), status_etapa='FINALIZADO')
+        self.criar_cards(5, agora - timedelta(days=1), responsavel_atual=None)
+
+        resultado, _ = self.verificar()
+        self.assertEqual(resultado['notificacoes_criadas'], 50)
+        self.assertEqual(resultado['vencidos'], 35)
+        self.assertEqual(resultado['vencendo'], 20)
+
+        with self.app.app_context():
+            self.assertEqual(Notificacao.query.filter_by(tipo='PRAZO_VENCIDO').count(), 30)
+            self.assertEqual(Notificacao.query.filter_by(tipo='PRAZO_VENCENDO').count(), 20)
+
+            # Criadas pendentes na fila; o envio fica com o worker
+            self.assertEqual(Notificacao.query.filter_by(enviado=False).count(), 50)
+            self.assertEqual(NotificacaoService.processar_notificacoes_pendentes()['enviadas'], 50)
+            self.assertEqual(Notificacao.query.filter_by(enviado=False).count(), 0)
+
+            mensagem = Notificacao.query.filter_by(tipo='PRAZO_VENCIDO').first().mensagem
+            self.assertIn('"Documentação"', mensagem)
+
+    def test_02_nao_repete_em_24h(self):
+        """Cards já notificados nas últimas 24h são excluídos pela consulta"""
+        self.criar_cards(10, datetime.utcnow() - timedelta(days=1))
+        self.verificar()
+        self.criar_cards(3, datetime.utcnow() - timedelta(days=1))
+
+        resultado, _ = self.verificar()
+        self.assertEqual(resultado['notificacoes_criadas'], 3)
+
+    def test_02b_criacao_individual(self):
+        """criar_notificacao_prazo_* cria uma notificação por card e não repete em 24h"""
+        self.criar_cards(1, datetime.utcnow() - timedelta(days=1))
+
+        with self.app.app_context():
+            card = CardMobilizacao.query.first()
+            vencido = NotificacaoService.criar_notificacao_prazo_vencido(card)
+            vencendo = NotificacaoService.criar_notificacao_prazo_vencendo(card)
+
+            self.assertEqual((vencido.tipo, vencendo.tipo), ('PRAZO_VENCIDO', 'PRAZO_VENCENDO'))
+            self.assertEqual(NotificacaoService.criar_notificacao_prazo_vencido(card).id, vencido.id)
+            self.assertEqual(Notificacao.query.count(), 2)
+
+    def test_03_consultas_nao_dependem_da_quantidade(self):
+        """O número de consultas não cresce com o número de cards"""
+        self.criar_cards(10, datetime.utcnow() - timedelta(days=1))
+        _, consultas_10 = self.verificar(completo=True)
+
+        with self.app.app_context():
+            Notificacao.query.delete()
+            db.session.commit()
+        self.criar_cards(290, datetime.utcnow() - timedelta(days=1))
+        _, consultas_300 = self.verificar(completo=True)
+
+        self.assertEqual(consultas_10, consultas_300)
+
+    def criar_pendentes(self, quantidade):
+        with self.app.app_context():
+            db.session.add_all([
+                Notificacao(tipo='TESTE', titulo=f"Teste {i}", mensagem='Teste',
+                            destinatario_email=f"usuario{i}@empresa.com")
+                for i in range(quantidade)
+            ])
+            db.session.commit()
+
+    def test_04_criacao_nao_envia(self):
+        """Criar notificações não aciona o envio de emails"""
+        self.criar_cards(5, datetime.utcnow() - timedelta(days=1))
+
+        with mock.patch.dict(os.environ, {'FLASK_ENV': 'production'}), \
+                mock.patch('src.services.notificacao_service.obter_entregador') as entregador:
+            self.verificar()
+            entregador.assert_not_called()
+
+    def test_05_falha_volta_com_backoff(self):
+        """Falhas incrementam as tentativas e só voltam à fila após a espera"""
+        self.criar_pendentes(3)
+        falha = Exception('421 Servidor ocupado')
+
+        entregador = mock.Mock()
+        entregador.enviar_lote.side_effect = lambda mensagens: {
+            'resultados': {chave: falha for chave, _ in mensagens},
+            'enviadas': 0, 'falhas': len(mensagens), 'mensagens_por_segundo': 0.0
+        }
+
+        ambiente = {'FLASK_ENV': 'production', 'NOTIFICACOES_BACKOFF_BASE': '100'}
+        with mock.patch.dict(os.environ, ambiente), self.app.app_context(), \
+                mock.patch('src.services.notificacao_service.obter_entregador', return_value=entregador):
+            inicio = datetime.utcnow()
+            self.assertEqual(NotificacaoService.processar_notificacoes_pendentes()['falhas'], 3)
+
+            for notificacao in Notificacao.query.all():
+                self.assertEqual(notificacao.tentativas_envio, 1)
+                self.assertIsNone(notificacao.lease_dono)
+                self.assertGreaterEqual(notificacao.proxima_tentativa, inicio + timedelta(seconds=50))
+                self.assertLessEqual(notificacao.proxima_tentativa, datetime.utcnow() + timedelta(seconds=100))
+
+            # Ainda dentro da espera: nada a processar
+            self.assertEqual(NotificacaoService.processar_notificacoes_pendentes()['processadas'], 0)
+
+            Notificacao.query.update({'proxima_tentativa': datetime.utcnow() - timedelta(seconds=1)})
+            db.session.commit()
+            self.assertEqual(NotificacaoService.processar_notificacoes_pendentes()['processadas'], 3)
+
+        self.assertLessEqual(NotificacaoService.calcular_espera(30), 3600)
+
+    def test_06_lease_expirado_volta_a_fila(self):
+        """Notificações reservadas por um worker que parou voltam à fila"""
+        self.criar_pendentes(5)
+
+        with self.app.app_context():
+            reservadas = NotificacaoService.reivindicar_lote('worker-a', 3, 300)
+            self.assertEqual(len(reservadas), 3)
+
+            # Outro worker só recebe as que não estão reservadas
+            outras = NotificacaoService.reivindicar_lote('worker-b', 10, 300)
+            self.assertEqual(len(outras), 2)
+            self.assertFalse({n.id for n in reservadas} & {n.id for n in outras})
+            self.assertEqual(NotificacaoService.reivindicar_lote('worker-c', 10, 300), [])
+
+            # worker-a parou sem enviar: o lease expira
+            Notificacao.query.filter_by(lease_dono='worker-a').update(
+                {'lease_ate': datetime.utcnow() - timedelta(seconds=1)}
+            )
+            db.session.commit()
+            self.assertEqual(len(NotificacaoService.reivindicar_lote('worker-c', 10, 300)), 3)
+
+    def test_07_modo_resumo_um_email_por_destinatario(self):
+        """No modo resumo cada destinatário recebe um email com todas as suas notificações"""
+        agora = datetime.utcnow()
+        self.criar_cards(120, agora - timedelta(days=1))
+        self.criar_cards(40, agora + timedelta(days=1))
+        self.criar_cards(30, agora - timedelta(days=1), responsavel_atual='joao.rh@empresa.com')
+        self.verificar()
+
+        with ServidorSMTPTeste() as servidor:
+            ambiente = {
+                'FLASK_ENV': 'production',
+                'NOTIFICACOES_MODO_ENTREGA': 'resumo',
+                'NOTIFICACOES_RESUMO_MAX_POR_TIPO': '100',
+                'SMTP_SERVER': '127.0.0.1',
+                'SMTP_PORT': str(servidor.porta),
+                'SMTP_USER': '',
+                'SMTP_STARTTLS': 'false'
+            }
+            with mock.patch.dict(os.environ, ambiente), self.app.app_context():
+                encerrar_entregador()
+                self.addCleanup(encerrar_entregador)
+
+                resultado = NotificacaoService.processar_notificacoes_pendentes()
+                self.assertEqual(resultado['processadas'], 190)
+                self.assertEqual(resultado['enviadas'], 190)
+                self.assertEqual(resultado['emails'], 2)
+                self.assertEqual(Notificacao.query.filter_by(enviado=False).count(), 0)
+
+        self.assertEqual(len(servidor.mensagens), 2)
+        corpos = {
+            destinatarios[0]: email.message_from_bytes(corpo).get_payload()[0].get_payload(decode=True).decode()
+            for destinatarios, corpo in servidor.mensagens
+        }
+        corpo = corpos['maria.rh@empresa.com']
+        self.assertIn('Prazos vencidos (120)', corpo)
+        self.assertIn('Prazos próximos do vencimento (40)', corpo)
+        self.assertIn('... e mais 20', corpo)
+        self.assertIn('Prazos vencidos (30)', corpos['joao.rh@empresa.com'])
+
+    def test_08_checklist_pendente_agregado(self):
+        """A verificação de checklist conta só itens obrigatórios pendentes, em blocos"""
+        agora = datetime.utcnow()
+        self.criar_cards(25, agora + timedelta(days=10))
+        self.criar_cards(5, agora + timedelta(days=10), status_etapa='FINALIZADO')
+
+        with self.app.app_context():
+            etapa_id = EtapaProcesso.query.first().id
+            obrigatorios = [ChecklistEtapa(etapa_id=etapa_id, tarefa=f"Tarefa {i}", ordem=i) for i in range(3)]
+            opcional = ChecklistEtapa(etapa_id=etapa_id, tarefa='Opcional', ordem=3, obrigatorio=False)
+            db.session.add_all(obrigatorios + [opcional])
+            db.session.flush()
+
+            for indice, card in enumerate(CardMobilizacao.query.order_by(CardMobilizacao.id)):
+                # Cards de índice múltiplo de 5 concluíram os obrigatórios; os demais têm 1 a 3 pendentes
+                concluidos = 3 if indice % 5 == 0 else indice % 3
+                for posicao, item in enumerate(obrigatorios):
+                    db.session.add(ChecklistCard(card_id=card.id, checklist_etapa_id=item.id,
+                                                 concluido=posicao < concluidos))
+                db.session.add(ChecklistCard(card_id=card.id, checklist_etapa_id=opcional.id))
+            db.session.commit()
+
+            esperado = {}
+            for indice, card in enumerate(CardMobilizacao.query.order_by(CardMobilizacao.id)):
+                if card.status_etapa != 'FINALIZADO' and indice % 5 != 0:
+                    esperado[card.id] = 3 - indice % 3
+
+            consultas = []
+            registrar = lambda *args: consultas.append(args[2])
+            event.listen(db.engine, 'before_cursor_execute', registrar)
+            try:
+                with mock.patch.dict(os.environ, {'NOTIFICACOES_BLOCO_VERIFICACAO': '4'}):
+                    self.assertEqual(NotificacaoService.verificar_checklist_pendentes(), len(esperado))
+            finally:
+                event.remove(db.engine, 'before_cursor_execute', registrar)
+
+            # Uma consulta agregada e um INSERT por bloco, independente do número de itens
+            self.assertLessEqual(len(consultas), 2 + len(esperado) // 4 + 1)
+
+            notificacoes = Notificacao.query.filter_by(tipo='CHECKLIST_PENDENTE').all()
+            self.assertEqual({n.card_id for n in notificacoes}, set(esperado))
+            for notificacao in notificacoes:
+                self.assertIn(f"possui {esperado[notificacao.card_id]} itens", notificacao.mensagem)
+
+            # Cards já notificados nas últimas 24h não recebem outra notificação
+            self.assertEqual(NotificacaoService.verificar_checklist_pendentes(), len(esperado))
+            self.assertEqual(Notificacao.query.filter_by(tipo='CHECKLIST_PENDENTE').count(), len(esperado))
+
+    def test_08b_checklist_pendente_group_by_postgresql(self):
+        """No PostgreSQL, as colunas da etapa selecionadas fazem parte do GROUP BY"""
+        with self.app.app_context():
+            consulta = NotificacaoService._consulta_checklist_pendentes(datetime.utcnow())
+            sql = str(consulta.statement.compile(dialect=postgresql.dialect()))
+
+        agrupamento = sql.split('GROUP BY')[1].split('ORDER BY')[0]
+        for coluna in ('cards_mobilizacao.id', 'etapas_processo.id', 'etapas_processo.nome'):
+            self.assertIn(coluna, agrupamento)
+
+    def test_09_modo_incremental(self):
+        """Depois da marca d'água, só entram prazos que cruzaram os limites ou cards atualizados"""
+        agora = datetime.utcnow()
+        antigo = agora - timedelta(days=3)
+
+        # Backlog já avaliado antes da marca: vencidos e vencendo, sem atualização recente
+        self.criar_cards(200, agora - timedelta(days=5), ultima_atualizacao=antigo)
+        self.criar_cards(100, agora + timedelta(days=1), ultima_atualizacao=antigo)
+
+        # Mudanças desde a marca (1 hora atrás)
+        self.criar_cards(3, agora - timedelta(minutes=30), ultima_atualizacao=antigo)
+        self.criar_cards(2, agora + timedelta(days=2) - timedelta(minutes=10), ultima_atualizacao=antigo)
+        self.criar_cards(4, agora - timedelta(days=5), ultima_atualizacao=agora - timedelta(minutes=5))
+
+        with self.app.app_context():
+            db.session.add(MarcaVerificacao(nome='prazos', valor=agora - timedelta(hours=1)))
+            db.session.commit()
+
+        resultado, consultas = self.verificar()
+        self.assertEqual(resultado['modo'], 'incremental')
+        self.assertEqual(resultado['vencidos'], 7)
+        self.assertEqual(resultado['vencendo'], 2)
+        self.assertEqual(resultado['notificacoes_criadas'], 9)
+
+        # Sem mudanças, a execução seguinte não considera nenhum card
+        resultado, consultas_sem_mudancas = self.verificar()
+        self.assertEqual((resultado['vencidos'], resultado['vencendo']), (0, 0))
+        self.assertLessEqual(consultas_sem_mudancas, consultas)
+
+        # A reavaliação completa volta a lembrar o backlog fora da janela de 24h
+        resultado, _ = self.verificar(completo=True)
+        self.assertEqual(resultado['modo'], 'completo')
+        self.assertEqual(resultado['notificacoes_criadas'], 300)
+
+    def test_09b_escrita_confirmada_durante_a_verificacao(self):
+        """Um card gravado antes de agora, mas confirmado após a leitura, entra na execução seguinte"""
+        antes = datetime.utcnow()
+        self.criar_cards(1, antes - timedelta(days=5), ultima_atualizacao=antes - timedelta(days=3),
+                         responsavel_atual=None)
+
+        criar_em_lote = NotificacaoService._criar_notificacoes_em_lote
+
+        def confirmar_durante_a_verificacao(dados):
+            # Transação concorrente: atualizada em `antes`, confirmada após a leitura dos candidatos
+            db.session.execute(CardMobilizacao.__table__.update().values(
+                responsavel_atual='maria.rh@empresa.com', ultima_atualizacao=antes
+            ))
+            db.session.commit()
+            return criar_em_lote(dados)
+
+        with mock.patch.object(NotificacaoService, '_criar_notificacoes_em_lote', side_effect=confirmar_durante_a_verificacao):
+            resultado, _ = self.verificar()
+        self.assertEqual(resultado['notificacoes_criadas'], 0)
+
+        resultado, _ = self.verificar()
+        self.assertEqual(resultado['modo'], 'incremental')
+        self.assertEqual(resultado['notificacoes_criadas'], 1)
+
+        resultado, _ = self.verificar()
+        self.assertEqual(resultado['notificacoes_criadas'], 0)
+
+    def test_10_entrega_imediata_uma_vez(self):
+        """No modo imediato, o worker da fila não reivindica as notificações antes do envio em linha"""
+        agora = datetime.utcnow()
+        self.criar_cards(6, agora - timedelta(days=1))
+        self.criar_cards(4, agora + timedelta(days=10), ultima_atualizacao=agora - timedelta(days=10))
+
+        envios = []
+        montar_email = NotificacaoService._montar_email
+        entregar = NotificacaoService.entregar_notificacoes
+        concorrentes = []
+
+        def entregar_com_concorrencia(notificacoes):
+            # O worker da fila roda entre o commit do INSERT e o envio em linha
+            concorrentes.append(NotificacaoService.processar_notificacoes_pendentes())
+            return entregar(notificacoes)
+
+        with self.app.app_context(), \
+                mock.patch.dict(os.environ, {'NOTIFICACOES_MODO_ENTREGA': 'imediata'}), \
+                mock.patch.object(NotificacaoService, 'entregar_notificacoes', side_effect=entregar_com_concorrencia), \
+                mock.patch.object(NotificacaoService, '_montar_email',
+                                  side_effect=lambda n, de: envios.append(n.id) or montar_email(n, de)):
+            NotificacaoService.verificar_prazos_vencidos()
+            NotificacaoService.verificar_cards_inativos()
+
+            ids = [notificacao.id for notificacao in Notificacao.query.all()]
+            self.assertEqual(len(ids), 10)
+            self.assertEqual(sorted(envios), sorted(ids))
+            self.assertEqual([resultado['processadas'] for resultado in concorrentes], [0] * len(concorrentes))
+            self.assertEqual(Notificacao.query.filter_by(enviado=False).count(), 0)
+            self.assertEqual(Notificacao.query.filter(Notificacao.lease_dono.isnot(None)).count(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
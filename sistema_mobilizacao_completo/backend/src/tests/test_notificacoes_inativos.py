@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Testes da verificação de cards inativos em consulta única.
+"""
+
+import os
+import random
+import unittest
+from datetime import datetime, timedelta
+from unittest import mock
+
+from app_teste import criar_app_teste
+
+from sqlalchemy import event
+from src.models.mobilizacao import db, CardMobilizacao, EtapaProcesso, Notificacao
+from src.services.notificacao_service import NotificacaoService
+
+
+def inativos_por_etapa(agora):
+    """Implementação de referência: uma consulta por etapa, com o limite da etapa"""
+    cards = set()
+    etapas = EtapaProcesso.query.filter(
+        EtapaProcesso.dias_alerta_inatividade > 0,
+        EtapaProcesso.ativo == True
+    ).all()
+    for etapa in etapas:
+        data_limite = agora - timedelta(days=etapa.dias_alerta_inatividade)
+        cards.update(card.id for card in CardMobilizacao.query.filter(
+            CardMobilizacao.etapa_atual_id == etapa.id,
+            CardMobilizacao.ultima_atualizacao < data_limite,
+            CardMobilizacao.status_etapa != 'FINALIZADO'
+        ))
+    return cards
+
+
+class TestNotificacoesInativos(unittest.TestCase):
+    """Testes de NotificacaoService.verificar_cards_inativos"""
+
+    def setUp(self):
+        # Entrega de email simulada
+        self.ambiente = mock.patch.dict(os.environ, {'FLASK_ENV': 'development'})
+        self.ambiente.start()
+        self.addCleanup(self.ambiente.stop)
+
+    def popular(self, semente):
+        """Cria etapas com limites de inatividade e cards com datas aleatórias"""
+        aleatorio = random.Random(semente)
+        agora = datetime.utcnow()
+
+        with self.app.app_context():
+            etapas = [
+                EtapaProcesso(nome=f"Etapa {i}", ordem=i, prazo_dias=5, dono_email="rh@empresa.com",
+                              dias_alerta_inatividade=aleatorio.choice([0, 1, 2, 3, 5, 7, 10]),
+                              ativo=aleatorio.random() > 0.2)
+                for i in range(8)
+            ]
+            db.session.add_all(etapas)
+            db.session.flush()
+
+            db.session.execute(CardMobilizacao.__table__.insert(), [
+                {
+                    'nome_colaborador': f"Colaborador {i}",
+                    'etapa_atual_id': aleatorio.choice(etapas).id,
+                    'status_etapa': aleatorio.choice(['EM_ANDAMENTO', 'EM_ANDAMENTO', 'PENDENTE', 'FINALIZADO']),
+                    'responsavel_atual': f"responsavel{i % 7}@empresa.com",
+                    'data_entrada_etapa': agora,
+                    'ultima_atualizacao': agora - timedelta(seconds=aleatorio.uniform(0, 15 * 86400))
+                }
+                for i in range(400)
+            ])
+            db.session.commit()
+
+    def test_01_igual_a_verificacao_por_etapa(self):
+        """A consulta única encontra os mesmos cards que a verificação etapa a etapa"""
+        for semente in range(5):
+            with self.subTest(semente=semente):
+                self.app = criar_app_teste(popular=False)
+                self.popular(semente)
+
+                with self.app.app_context():
+                    esperado = inativos_por_etapa(datetime.utcnow())
+                    self.assertTrue(esperado)
+
+                    self.assertEqual(NotificacaoService.verificar_cards_inativos(), len(esperado))
+                    notificados = {
+                        card_id for card_id, in
+                        db.session.query(Notificacao.card_id).filter_by(tipo='CARD_INATIVO')
+                    }
+                    self.assertEqual(notificados, esperado)
+
+    def test_02_consultas_constantes_e_sem_repeticao(self):
+        """A verificação usa poucas consultas e não repete notificações em 24h"""
+        self.app = criar_app_teste(popular=False)
+        self.popular(42)
+
+        with self.app.app_context():
+            consultas = []
+            registrar = lambda *args: consultas.append(args[2])
+            event.listen(db.engine, 'before_cursor_execute', registrar)
+            try:
+                total = NotificacaoService.verificar_cards_inativos()
+            finally:
+                event.remove(db.engine, 'before_cursor_execute', registrar)
+
+            # Uma consulta para os cards, um INSERT em lote e a versão das notificações
+            self.assertLessEqual(len(consultas), 3)
+
+            notificacao = Notificacao.query.filter_by(tipo='CARD_INATIVO').first()
+            self.assertRegex(notificacao.mensagem, r'há \d+ dias na etapa "Etapa \d"')
+
+            self.assertEqual(NotificacaoService.verificar_cards_inativos(), total)
+            self.assertEqual(Notificacao.query.filter_by(tipo='CARD_INATIVO').count(), total)
+
+
+if __name__ == '__main__':
+    unittest.main()
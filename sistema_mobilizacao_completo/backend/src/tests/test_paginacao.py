@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Testes da paginação por cursor (keyset).
+"""
+
+import unittest
+from datetime import datetime, timedelta
+
+from app_teste import criar_app_teste, obter_headers
+
+from sqlalchemy import event
+from src.models.mobilizacao import db, CardMobilizacao, EtapaProcesso
+from src.models.permissoes import LogAcesso
+
+
+class TestPaginacao(unittest.TestCase):
+    """Testes do modo ?cursor= das listagens"""
+
+    def setUp(self):
+        self.app = criar_app_teste()
+        self.cliente = self.app.test_client()
+        self.headers = obter_headers(self.cliente)
+
+        with self.app.app_context():
+            etapa_id = EtapaProcesso.query.order_by(EtapaProcesso.ordem).first().id
+            base = datetime(2024, 1, 1)
+
+            # Datas repetidas para exercitar o desempate pelo id
+            db.session.execute(CardMobilizacao.__table__.insert(), [
+                {'nome_colaborador': f"Colaborador {i}", 'etapa_atual_id': etapa_id,
+                 'data_criacao': base + timedelta(hours=i // 3)}
+                for i in range(23)
+            ])
+            db.session.execute(LogAcesso.__table__.insert(), [
+                {'usuario_id': 1, 'tipo_operacao': 'visualizar', 'recurso': 'card',
+                 'data_acesso': base + timedelta(minutes=i // 4)}
+                for i in range(37)
+            ])
+            db.session.commit()
+            self.engine = db.engine
+
+    def percorrer(self, url, chave, limite):
+        """Segue os cursores até a última página, retornando todos os ids"""
+        ids = []
+        cursor = ''
+        paginas = 0
+        while cursor is not None:
+            response = self.cliente.get(f"{url}?limit={limite}&cursor={cursor}", headers=self.headers)
+            self.assertEqual(response.status_code, 200)
+            dados = response.get_json()['data']
+            self.assertLessEqual(len(dados[chave]), limite)
+            ids.extend(item['id'] for item in dados[chave])
+            cursor = dados['proximo_cursor']
+            paginas += 1
+        return ids, paginas
+
+    def test_01_cards_em_ordem_sem_repeticao(self):
+        """O cursor percorre todos os cards na ordem (data_criacao, id)"""
+        ids, paginas = self.percorrer('/api/cards', 'cards', 5)
+
+        with self.app.app_context():
+            esperado = [card.id for card in CardMobilizacao.query.order_by(
+                CardMobilizacao.data_criacao, CardMobilizacao.id
+            ).all()]
+
+        self.assertEqual(ids, esperado)
+        self.assertEqual(paginas, -(-len(esperado) // 5))
+
+    def test_02_logs_decrescentes(self):
+        """Logs são percorridos do mais recente para o mais antigo"""
+        with self.app.app_context():
+            esperado = [log.id for log in LogAcesso.query.order_by(
+                LogAcesso.data_acesso.desc(), LogAcesso.id.desc()
+            ).all()]
+
+        # A própria requisição da primeira página gera um log; os gravados
+        # depois dela são mais recentes que o cursor e não aparecem
+        ids, _ = self.percorrer('/api/permissoes/logs', 'logs', 10)
+        self.assertEqual([log_id for log_id in ids if log_id in esperado], esperado)
+        self.assertLessEqual(len(ids) - len(esperado), 1)
+
+    def test_03_sem_count_nem_offset(self):
+        """O total só é calculado quando solicitado e não há OFFSET"""
+        consultas = []
+        event.listen(self.engine, 'before_cursor_execute', lambda *args: consultas.append(args[2:4]))
+
+        dados = self.cliente.get('/api/usuarios?limit=2&cursor=', headers=self.headers).get_json()['data']
+        dados = self.cliente.get(f"/api/usuarios?limit=2&cursor={dados['proximo_cursor']}", headers=self.headers).get_json()['data']
+        self.assertNotIn('total', dados)
+        self.assertFalse([sql for sql, _ in consultas if 'count(*)' in sql.lower()])
+        # O SQLite emite "LIMIT ? OFFSET ?" mesmo sem deslocamento
+        self.assertFalse([sql for sql, parametros in consultas if 'OFFSET' in sql and parametros[-1] != 0])
+
+        dados = self.cliente.get('/api/usuarios?limit=2&cursor=&incluir_total=true', headers=self.headers).get_json()['data']
+        with self.app.app_context():
+            from src.models.mobilizacao import Usuario
+            self.assertEqual(dados['total'], Usuario.query.count())
+
+    def test_04_cursor_invalido(self):
+        """Um cursor malformado retorna erro de validação"""
+        for url in ['/api/cards', '/api/permissoes/logs', '/api/usuarios', '/api/notificacoes']:
+            response = self.cliente.get(f"{url}?cursor=invalido", headers=self.headers)
+            self.assertEqual(response.status_code, 400, url)
+            self.assertEqual(response.get_json()['error']['code'], 'VALIDATION_ERROR')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Testes do snapshot compilado de permissões por usuário.
+"""
+
+import unittest
+
+from app_teste import criar_app_teste, obter_headers
+
+from sqlalchemy import event
+from src.models.mobilizacao import db, Usuario, Grupo, EtapaProcesso
+from src.models.permissoes import (
+    PermissaoEspecial, verificar_permissao, obter_permissoes, invalidar_permissoes,
+    obter_usuario_autenticado
+)
+
+
+class TestPermissoes(unittest.TestCase):
+    """Testes de verificar_permissao com cache de permissões"""
+
+    def setUp(self):
+        self.app = criar_app_teste()
+        invalidar_permissoes()
+
+    def test_01_permissoes_de_grupo(self):
+        """Permissões vêm dos grupos do usuário e o admin pode tudo"""
+        with self.app.app_context():
+            admin = Usuario.query.filter_by(email='admin@empresa.com').first()
+            maria = Usuario.query.filter_by(email='maria.rh@empresa.com').first()
+
+            self.assertTrue(verificar_permissao(admin, 'excluir', 'usuario'))
+            self.assertTrue(verificar_permissao(maria, 'visualizar', 'card'))
+            self.assertTrue(verificar_permissao(maria, 'criar', 'card'))
+            self.assertFalse(verificar_permissao(maria, 'excluir', 'card'))
+            self.assertIn(('visualizar', 'dashboard'), maria.listar_permissoes())
+
+    def test_02_verificacao_sem_consultas(self):
+        """Após compilado, o snapshot atende verificações sem acessar o banco"""
+        with self.app.app_context():
+            maria = Usuario.query.filter_by(email='maria.rh@empresa.com').first()
+            verificar_permissao(maria, 'visualizar', 'card')
+
+            consultas = []
+            event.listen(db.engine, 'before_cursor_execute', lambda *args: consultas.append(args[2]))
+
+            for _ in range(20):
+                verificar_permissao(maria, 'editar', 'card')
+                verificar_permissao(maria, 'excluir', 'etapa', 3)
+
+            self.assertEqual(consultas, [])
+
+    def test_03_permissoes_especiais(self):
+        """Negações e concessões especiais valem para o recurso_id exato"""
+        with self.app.app_context():
+            maria = Usuario.query.filter_by(email='maria.rh@empresa.com').first()
+            self.assertTrue(verificar_permissao(maria, 'editar', 'card', 7))
+
+            db.session.add(PermissaoEspecial('editar', 'card', usuario_id=maria.id, recurso_id=7, concedido=False))
+            db.session.add(PermissaoEspecial('excluir', 'etapa', usuario_id=maria.id, recurso_id=2))
+            db.session.commit()
+
+            # Snapshot antigo continua válido até a invalidação
+            self.assertTrue(verificar_permissao(maria, 'editar', 'card', 7))
+
+            invalidar_permissoes(maria.id)
+
+            self.assertFalse(verificar_permissao(maria, 'editar', 'card', 7))
+            self.assertTrue(verificar_permissao(maria, 'editar', 'card'))
+            self.assertTrue(verificar_permissao(maria, 'excluir', 'etapa', 2))
+            self.assertFalse(verificar_permissao(maria, 'excluir', 'etapa', 3))
+
+    def test_04_alteracao_de_grupos_invalida(self):
+        """Alterar os grupos do usuário pela API invalida o snapshot"""
+        cliente = self.app.test_client()
+        headers = obter_headers(cliente)
+
+        with self.app.app_context():
+            joao = Usuario.query.filter_by(email='joao.treinamento@empresa.com').first()
+            self.assertFalse(verificar_permissao(joao, 'visualizar', 'dashboard'))
+            joao_id = joao.id
+
+        response = cliente.put(f"/api/usuarios/{joao_id}", json={'grupos': ['RH']}, headers=headers)
+        self.assertEqual(response.status_code, 200)
+
+        with self.app.app_context():
+            joao = db.session.get(Usuario, joao_id)
+            self.assertTrue(verificar_permissao(joao, 'visualizar', 'dashboard'))
+
+        # Renomear o grupo Administrador retira o acesso irrestrito
+        with self.app.app_context():
+            grupo_id = Grupo.query.filter_by(nome='Administrador').first().id
+        response = cliente.put(f"/api/usuarios/grupos/{grupo_id}", json={'nome': 'Admin antigo'}, headers=headers)
+        self.assertEqual(response.status_code, 200)
+
+        with self.app.app_context():
+            admin = Usuario.query.filter_by(email='admin@empresa.com').first()
+            self.assertFalse(obter_permissoes(admin.id).admin)
+            # As permissões atribuídas ao grupo continuam valendo
+            self.assertTrue(verificar_permissao(admin, 'excluir', 'usuario'))
+
+    def test_05_autenticacao_sem_consultar_usuario(self):
+        """Após a primeira requisição, o token_required não lê usuários nem grupos"""
+        cliente = self.app.test_client()
+        headers = obter_headers(cliente)
+        # A primeira leitura da versão das permissões no processo descarta os caches
+        cliente.get('/api/permissoes/minhas', headers=headers)
+        cliente.get('/api/permissoes/minhas', headers=headers)
+
+        consultas = []
+        registrar = lambda *args: consultas.append(args[2])
+        with self.app.app_context():
+            event.listen(db.engine, 'before_cursor_execute', registrar)
+        try:
+            for _ in range(5):
+                response = cliente.get('/api/permissoes/minhas', headers=headers)
+                self.assertEqual(response.status_code, 200)
+        finally:
+            with self.app.app_context():
+                event.remove(db.engine, 'before_cursor_execute', registrar)
+
+        leituras = [sql for sql in consultas if 'usuarios' in sql or 'grupos' in sql]
+        self.assertEqual(leituras, [])
+
+    def test_06_snapshot_equivale_ao_modelo(self):
+        """O usuário autenticado decide como o modelo Usuario"""
+        with self.app.app_context():
+            etapa_ids = [etapa_id for etapa_id, in db.session.query(EtapaProcesso.id)] + [999]
+            for usuario in Usuario.query.all():
+                autenticado = obter_usuario_autenticado(usuario.id)
+                self.assertEqual((autenticado.email, autenticado.ativo), (usuario.email, usuario.ativo))
+                self.assertEqual(autenticado.is_admin(), usuario.is_admin())
+                self.assertEqual(autenticado.pode_criar_cards(), usuario.pode_criar_cards())
+                for etapa_id in etapa_ids:
+                    self.assertEqual(autenticado.pode_editar_etapa(etapa_id), usuario.pode_editar_etapa(etapa_id))
+
+            self.assertIsNone(obter_usuario_autenticado(999))
+
+    def test_07_alteracoes_invalidam_usuario_autenticado(self):
+        """Desativar o usuário e alterar grupos de etapas valem na requisição seguinte"""
+        cliente = self.app.test_client()
+        headers = obter_headers(cliente)
+        maria = {'email': 'maria.rh@empresa.com', 'senha': 'senha123'}
+        headers_maria = obter_headers(cliente, maria)
+
+        with self.app.app_context():
+            maria_id = Usuario.query.filter_by(email=maria['email']).first().id
+            etapa = EtapaProcesso.query.filter(~EtapaProcesso.grupos_permitidos.any(Grupo.nome == 'RH')).first()
+            etapa_id, grupos = etapa.id, [grupo.nome for grupo in etapa.grupos_permitidos]
+            self.assertFalse(obter_usuario_autenticado(maria_id).pode_editar_etapa(etapa_id))
+
+        response = cliente.put(f"/api/etapas/{etapa_id}", json={'grupos_permitidos': grupos + ['RH']}, headers=headers)
+        self.assertEqual(response.status_code, 200)
+        with self.app.app_context():
+            self.assertTrue(obter_usuario_autenticado(maria_id).pode_editar_etapa(etapa_id))
+
+        self.assertEqual(cliente.get('/api/auth/me', headers=headers_maria).status_code, 200)
+        response = cliente.put(f"/api/usuarios/{maria_id}", json={'ativo': False}, headers=headers)
+        self.assertEqual(response.status_code, 200)
+
+        response = cliente.get('/api/auth/me', headers=headers_maria)
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.get_json()['error']['code'], 'INVALID_USER')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Testes da gravação assíncrona e em lote dos logs de acesso.
+"""
+
+import unittest
+
+from app_teste import criar_app_teste, obter_headers
+
+from src.models.permissoes import LogAcesso
+from src.services.registro_acessos import (
+    RegistradorAcessos, POLITICA_DESCARTAR_ANTIGOS, POLITICA_AMOSTRAR
+)
+
+
+def _dados(detalhes):
+    return {
+        'usuario_id': None,
+        'tipo_operacao': 'acessar',
+        'recurso': 'teste',
+        'detalhes': detalhes
+    }
+
+
+class TestRegistroAcessos(unittest.TestCase):
+    """Testes do RegistradorAcessos"""
+
+    def setUp(self):
+        self.app = criar_app_teste(popular=False)
+
+    def test_01_drena_ao_parar(self):
+        """Todos os registros enfileirados são gravados ao encerrar"""
+        registrador = RegistradorAcessos(self.app, tamanho_lote=50, intervalo_ms=10000)
+
+        for i in range(120):
+            self.assertTrue(registrador.registrar(_dados(f"registro {i}")))
+
+        registrador.parar()
+
+        with self.app.app_context():
+            self.assertEqual(LogAcesso.query.count(), 120)
+
+        estatisticas = registrador.estatisticas()
+        self.assertEqual(estatisticas['enfileirados'], 120)
+        self.assertEqual(estatisticas['gravados'], 120)
+        self.assertEqual(estatisticas['descartados'], 0)
+        self.assertEqual(estatisticas['pendentes'], 0)
+
+    def test_02_descartar_antigos(self):
+        """Com a fila cheia, a política descartar_antigos remove os registros mais antigos"""
+        registrador = RegistradorAcessos(
+            self.app, capacidade=10, tamanho_lote=10, intervalo_ms=10000,
+            politica=POLITICA_DESCARTAR_ANTIGOS
+        )
+        # Impede a gravação para manter a fila cheia durante o teste
+        registrador._garantir_thread = lambda: None
+
+        for i in range(15):
+            registrador.registrar(_dados(f"registro {i}"))
+
+        self.assertEqual(registrador.estatisticas()['descartados'], 5)
+        self.assertEqual(registrador._fila[0]['detalhes'], 'registro 5')
+
+    def test_03_amostrar(self):
+        """Com a fila cheia, a política amostrar mantém 1 a cada N excedentes"""
+        registrador = RegistradorAcessos(
+            self.app, capacidade=10, tamanho_lote=10, intervalo_ms=10000,
+            politica=POLITICA_AMOSTRAR, amostragem=5
+        )
+        registrador._garantir_thread = lambda: None
+
+        for i in range(20):
+            registrador.registrar(_dados(f"registro {i}"))
+
+        # 10 excedentes: 2 amostrados (cada um substitui o mais antigo) e 8 descartados
+        self.assertEqual(registrador.estatisticas()['descartados'], 10)
+        self.assertEqual(len(registrador._fila), 10)
+        self.assertEqual(registrador._fila[-1]['detalhes'], 'registro 19')
+
+    def test_04_token_required_enfileira(self):
+        """Requisições autenticadas não gravam o log de forma síncrona"""
+        app = criar_app_teste()
+        registrador = RegistradorAcessos(app, intervalo_ms=10000)
+        app.extensions['registro_acessos'] = registrador
+        cliente = app.test_client()
+        headers = obter_headers(cliente)
+
+        with app.app_context():
+            antes = LogAcesso.query.count()
+
+        for _ in range(5):
+            self.assertEqual(cliente.get('/api/etapas', headers=headers).status_code, 200)
+
+        with app.app_context():
+            self.assertEqual(LogAcesso.query.count(), antes)
+
+        registrador.parar()
+
+        with app.app_context():
+            self.assertEqual(LogAcesso.query.count(), antes + 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Testes do serializador JSON e da compressão das respostas.
+"""
+
+import gzip
+import json
+import unittest
+import uuid
+from datetime import datetime
+from decimal import Decimal
+
+from app_teste import criar_app_teste, obter_headers
+
+from flask.json.provider import DefaultJSONProvider
+from werkzeug.datastructures import Accept
+from werkzeug.http import parse_accept_header
+from src.config import respostas
+from src.config.respostas import SERIALIZADORES, escolher_codificacao
+
+
+class TestRespostas(unittest.TestCase):
+    """Testes de configurar_respostas"""
+
+    def setUp(self):
+        self.app = criar_app_teste(COMPRESSAO_MIN_BYTES=200)
+        self.cliente = self.app.test_client()
+        self.headers = obter_headers(self.cliente)
+
+    @unittest.skipUnless(respostas.orjson, 'orjson não instalado')
+    def test_01_orjson_equivale_ao_padrao(self):
+        """O provedor orjson gera o mesmo JSON que o provedor padrão do Flask"""
+        dados = {
+            'b': [1, 2.5, None, True], 'a': 'Mobilização', 'data': datetime(2024, 5, 17, 10, 30),
+            'valor': Decimal('10.50'), 'id': uuid.UUID(int=1), 'aninhado': {'z': {'y': []}, '3': 'chave'}
+        }
+        orjson = SERIALIZADORES['orjson'](self.app)
+        padrao = DefaultJSONProvider(self.app)
+
+        self.assertEqual(json.loads(orjson.dumps(dados)), json.loads(padrao.dumps(dados)))
+        self.assertEqual(json.loads(orjson.dumps(dados))['data'], 'Fri, 17 May 2024 10:30:00 GMT')
+        with self.app.app_context():
+            self.assertEqual(orjson.response(dados).get_data(),
+                             padrao.response(dados).get_data().decode('unicode_escape').encode())
+
+        self.assertIsInstance(self.app.json, SERIALIZADORES['orjson'])
+
+    def test_02_serializador_configuravel(self):
+        """JSON_SERIALIZADOR escolhe o provedor; nomes desconhecidos são rejeitados"""
+        app = criar_app_teste(popular=False, JSON_SERIALIZADOR='stdlib')
+        self.assertIs(type(app.json), DefaultJSONProvider)
+
+        with self.assertRaises(ValueError):
+            criar_app_teste(popular=False, JSON_SERIALIZADOR='inexistente')
+
+    def test_03_compressao_gzip(self):
+        """Respostas acima do limite são comprimidas conforme o Accept-Encoding"""
+        original = self.cliente.get('/api/etapas', headers=self.headers)
+        self.assertNotIn('Content-Encoding', original.headers)
+        self.assertGreater(len(original.data), 200)
+
+        response = self.cliente.get('/api/etapas', headers={**self.headers, 'Accept-Encoding': 'gzip'})
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response.headers['Vary'])
+        self.assertEqual(int(response.headers['Content-Length']), len(response.data))
+        self.assertLess(len(response.data), len(original.data))
+        self.assertEqual(gzip.decompress(response.data), original.data)
+
+    def test_04_sem_compressao(self):
+        """Respostas pequenas, 304 e codificações recusadas não são comprimidas"""
+        response = self.cliente.get('/api/notificacoes/contagem', headers={**self.headers, 'Accept-Encoding': 'gzip'})
+        self.assertLess(len(response.data), 200)
+        self.assertNotIn('Content-Encoding', response.headers)
+
+        response = self.cliente.get('/api/etapas', headers={**self.headers, 'Accept-Encoding': 'gzip;q=0, deflate'})
+        self.assertNotIn('Content-Encoding', response.headers)
+
+        etag = response.headers['ETag']
+        response = self.cliente.get('/api/etapas', headers={
+            **self.headers, 'Accept-Encoding': 'gzip', 'If-None-Match': etag
+        })
+        self.assertEqual(response.status_code, 304)
+        self.assertNotIn('Content-Encoding', response.headers)
+
+        app = criar_app_teste(COMPRESSAO='false', COMPRESSAO_MIN_BYTES=200)
+        cliente = app.test_client()
+        response = cliente.get('/api/etapas', headers={**obter_headers(cliente), 'Accept-Encoding': 'gzip'})
+        self.assertNotIn('Content-Encoding', response.headers)
+
+    def test_05_escolher_codificacao(self):
+        """A codificação de maior qualidade para o cliente vence; empates seguem a preferência"""
+        disponiveis = [('br', None), ('gzip', None)]
+        escolher = lambda cabecalho: escolher_codificacao(parse_accept_header(cabecalho, Accept), disponiveis)
+
+        self.assertEqual(escolher('gzip, br')[0], 'br')
+        self.assertEqual(escolher('gzip;q=1.0, br;q=0.5')[0], 'gzip')
+        self.assertEqual(escolher('*')[0], 'br')
+        self.assertIsNone(escolher('deflate'))
+        self.assertIsNone(escolher(''))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Testes do GET condicional (ETag / 304) das rotas de leitura.
+"""
+
+import unittest
+
+from app_teste import criar_app_teste, obter_headers
+
+from sqlalchemy import event
+from src.models.mobilizacao import db, Usuario, Notificacao
+from src.models.permissoes import PermissaoEspecial
+from src.utils.versoes import incrementar_versao
+
+
+class TestRespostasCondicionais(unittest.TestCase):
+    """Testes de resposta_condicional"""
+
+    def setUp(self):
+        self.app = criar_app_teste()
+        self.cliente = self.app.test_client()
+        self.headers = obter_headers(self.cliente)
+
+    def revalidar(self, url, etag, headers=None):
+        return self.cliente.get(url, headers={**(headers or self.headers), 'If-None-Match': etag})
+
+    def test_01_etag_e_304(self):
+        """As rotas devolvem ETag fraco e respondem 304 ao mesmo If-None-Match"""
+        for url in ('/api/etapas', '/api/usuarios/grupos', '/api/permissoes/tipos',
+                    '/api/permissoes/minhas', '/api/notificacoes/contagem'):
+            response = self.cliente.get(url, headers=self.headers)
+            self.assertEqual(response.status_code, 200, url)
+            etag = response.headers['ETag']
+            self.assertTrue(etag.startswith('W/"'), url)
+            self.assertEqual(response.headers['Cache-Control'], 'private, no-cache')
+
+            response = self.revalidar(url, etag)
+            self.assertEqual(response.status_code, 304, url)
+            self.assertEqual(response.data, b'')
+            self.assertEqual(response.headers['ETag'], etag)
+
+            self.assertEqual(self.revalidar(url, 'W/"outro"').status_code, 200, url)
+
+    def test_02_304_sem_executar_a_rota(self):
+        """O 304 lê apenas as versões, sem as consultas da rota"""
+        etag = self.cliente.get('/api/usuarios/grupos', headers=self.headers).headers['ETag']
+
+        consultas = []
+        registrar = lambda *args: consultas.append(args[2])
+        with self.app.app_context():
+            event.listen(db.engine, 'before_cursor_execute', registrar)
+        try:
+            self.assertEqual(self.revalidar('/api/usuarios/grupos', etag).status_code, 304)
+        finally:
+            with self.app.app_context():
+                event.remove(db.engine, 'before_cursor_execute', registrar)
+
+        self.assertTrue(any('versoes_dados' in sql for sql in consultas))
+        self.assertEqual([sql for sql in consultas if 'FROM grupos' in sql], [])
+
+    def test_03_alteracao_invalida_etag(self):
+        """Alterações pela API mudam o ETag e a resposta seguinte traz os dados novos"""
+        etag = self.cliente.get('/api/etapas', headers=self.headers).headers['ETag']
+        self.cliente.put('/api/etapas/1', json={'nome': 'Etapa renomeada'}, headers=self.headers)
+
+        response = self.revalidar('/api/etapas', etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers['ETag'], etag)
+        self.assertIn('Etapa renomeada', [etapa['nome'] for etapa in response.get_json()['data']])
+
+        etag = self.cliente.get('/api/usuarios/grupos', headers=self.headers).headers['ETag']
+        self.cliente.post('/api/usuarios/grupos', json={'nome': 'Auditoria'}, headers=self.headers)
+        response = self.revalidar('/api/usuarios/grupos', etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Auditoria', [grupo['nome'] for grupo in response.get_json()['data']])
+
+    def test_04_etag_por_usuario(self):
+        """Contagem de notificações: ETag por usuário, alterado pela leitura das notificações"""
+        headers_maria = obter_headers(self.cliente, {'email': 'maria.rh@empresa.com', 'senha': 'senha123'})
+        with self.app.app_context():
+            db.session.add(Notificacao(tipo='TESTE', titulo='Teste', mensagem='Teste',
+                                       destinatario_email='maria.rh@empresa.com'))
+            incrementar_versao('notificacoes')
+            db.session.commit()
+
+        etag_admin = self.cliente.get('/api/notificacoes/contagem', headers=self.headers).headers['ETag']
+        response = self.cliente.get('/api/notificacoes/contagem', headers=headers_maria)
+        etag_maria = response.headers['ETag']
+        self.assertNotEqual(etag_admin, etag_maria)
+        self.assertEqual(self.revalidar('/api/notificacoes/contagem', etag_maria).status_code, 200)
+
+        nao_lidas = response.get_json()['data']['nao_lidas']
+        self.cliente.post('/api/notificacoes/todas/ler', headers=headers_maria)
+        response = self.revalidar('/api/notificacoes/contagem', etag_maria, headers_maria)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['data']['nao_lidas'], 0)
+        self.assertGreater(nao_lidas, 0)
+
+    def test_05_alteracao_de_outro_worker(self):
+        """Uma versão nova no banco descarta o cache de permissões do processo"""
+        headers_maria = obter_headers(self.cliente, {'email': 'maria.rh@empresa.com', 'senha': 'senha123'})
+        response = self.cliente.get('/api/permissoes/minhas', headers=headers_maria)
+        etag = response.headers['ETag']
+        self.assertNotIn(['excluir', 'card'], response.get_json()['data']['permissoes'])
+
+        # Concessão gravada por outro processo: o cache deste não é invalidado diretamente
+        with self.app.app_context():
+            maria = Usuario.query.filter_by(email='maria.rh@empresa.com').first()
+            db.session.add(PermissaoEspecial(usuario_id=maria.id, tipo='excluir', recurso='card'))
+            incrementar_versao('permissoes')
+            db.session.commit()
+
+        response = self.revalidar('/api/permissoes/minhas', etag, headers_maria)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(['excluir', 'card'], response.get_json()['data']['permissoes'])
+
+    def test_06_autenticacao_antes_do_304(self):
+        """Sem token, If-None-Match não evita o 401"""
+        etag = self.cliente.get('/api/etapas', headers=self.headers).headers['ETag']
+        response = self.cliente.get('/api/etapas', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 401)
+
+
+if __name__ == '__main__':
+    unittest.main()
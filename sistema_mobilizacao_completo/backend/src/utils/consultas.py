@@ -0,0 +1,64 @@
+from sqlalchemy import and_, insert, update, Float
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+from src.models.mobilizacao import db
+
+_INSERTS_COM_UPSERT = {
+    'sqlite': sqlite.insert,
+    'postgresql': postgresql.insert
+}
+
+
+def incrementar(tabela, chaves, coluna, delta):
+    """
+    Soma delta à coluna da linha identificada por chaves, criando a linha se
+    necessário. Executa na transação da sessão atual.
+
+    Args:
+        tabela: Objeto Table (ex: Modelo.__table__)
+        chaves: Dict coluna -> valor, cobertas por uma restrição única
+        coluna: Nome da coluna numérica a incrementar
+        delta: Valor a somar (pode ser negativo)
+    """
+    insert_upsert = _INSERTS_COM_UPSERT.get(db.session.get_bind().dialect.name)
+
+    if insert_upsert is not None:
+        stmt = insert_upsert(tabela).values(**chaves, **{coluna: delta})
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(chaves),
+            set_={coluna: tabela.c[coluna] + delta}
+        )
+        db.session.execute(stmt)
+        return
+
+    # Outros bancos: atualiza e, se a linha não existir, insere
+    condicao = and_(*[tabela.c[nome] == valor for nome, valor in chaves.items()])
+    resultado = db.session.execute(
+        update(tabela).where(condicao).values({coluna: tabela.c[coluna] + delta})
+    )
+    if resultado.rowcount == 0:
+        db.session.execute(insert(tabela).values(**chaves, **{coluna: delta}))
+
+
+class DiasDecorridos(FunctionElement):
+    """
+    Dias (com fração) decorridos entre duas datas: DiasDecorridos(inicio, fim).
+    Permite comparar, no próprio SQL, uma data com um limite em dias que vem
+    de outra coluna.
+    """
+    type = Float()
+    inherit_cache = True
+    name = 'dias_decorridos'
+
+
+@compiles(DiasDecorridos)
+def _dias_decorridos(elemento, compilador, **kw):
+    inicio, fim = [compilador.process(arg, **kw) for arg in elemento.clauses]
+    return f"(EXTRACT(EPOCH FROM ({fim} - {inicio})) / 86400.0)"
+
+
+@compiles(DiasDecorridos, 'sqlite')
+def _dias_decorridos_sqlite(elemento, compilador, **kw):
+    inicio, fim = [compilador.process(arg, **kw) for arg in elemento.clauses]
+    return f"(julianday({fim}) - julianday({inicio}))"
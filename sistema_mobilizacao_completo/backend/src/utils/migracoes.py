@@ -0,0 +1,85 @@
+from sqlalchemy import inspect
+from src.models.mobilizacao import db
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def aplicar_colunas():
+    """
+    Adiciona às tabelas existentes as colunas declaradas nos modelos que ainda
+    não existem no banco (apenas colunas que aceitam nulo, via ALTER TABLE).
+
+    Returns:
+        Lista com as colunas adicionadas no formato tabela.coluna
+    """
+    inspetor = inspect(db.engine)
+    tabelas_existentes = set(inspetor.get_table_names())
+    dialeto = db.engine.dialect
+
+    adicionadas = []
+    with db.engine.begin() as conexao:
+        for tabela in db.metadata.sorted_tables:
+            if tabela.name not in tabelas_existentes:
+                continue
+
+            existentes = {coluna['name'] for coluna in inspetor.get_columns(tabela.name)}
+            for coluna in tabela.columns:
+                if coluna.name in existentes:
+                    continue
+                if not coluna.nullable:
+                    raise RuntimeError(
+                        f"Coluna obrigatória {tabela.name}.{coluna.name} exige migração manual"
+                    )
+
+                tipo = coluna.type.compile(dialect=dialeto)
+                conexao.exec_driver_sql(f'ALTER TABLE {tabela.name} ADD COLUMN {coluna.name} {tipo}')
+                adicionadas.append(f"{tabela.name}.{coluna.name}")
+
+    if adicionadas:
+        logger.info(f"Colunas adicionadas: {', '.join(adicionadas)}")
+
+    return adicionadas
+
+
+def aplicar_indices():
+    """
+    Cria nos bancos existentes os índices declarados nos modelos.
+
+    db.create_all() não altera tabelas que já existem, então índices adicionados
+    depois da criação do banco (ex: app.db antigos) são aplicados aqui.
+
+    Returns:
+        Lista com os nomes dos índices criados
+    """
+    inspetor = inspect(db.engine)
+    tabelas_existentes = set(inspetor.get_table_names())
+
+    criados = []
+    for tabela in db.metadata.sorted_tables:
+        if tabela.name not in tabelas_existentes:
+            continue
+
+        existentes = {indice['name'] for indice in inspetor.get_indexes(tabela.name)}
+        for indice in tabela.indexes:
+            if indice.name not in existentes:
+                indice.create(db.engine)
+                criados.append(indice.name)
+
+    if criados:
+        logger.info(f"Índices criados: {', '.join(criados)}")
+
+    return criados
+
+
+def migrar():
+    """
+    Executa todas as etapas de migração do esquema.
+    """
+    # Colunas antes dos índices, que podem depender delas
+    colunas = aplicar_colunas()
+
+    return {
+        'colunas_adicionadas': colunas,
+        'indices_criados': aplicar_indices()
+    }
@@ -0,0 +1,104 @@
+import base64
+import json
+from datetime import date, datetime
+from sqlalchemy import tuple_
+
+
+class CursorInvalido(ValueError):
+    """Cursor de paginação malformado ou incompatível com a ordenação"""
+
+
+def codificar_cursor(valores):
+    """
+    Codifica os valores da chave de ordenação em um token opaco.
+    """
+    serializaveis = [
+        valor.isoformat() if isinstance(valor, (date, datetime)) else valor
+        for valor in valores
+    ]
+    texto = json.dumps(serializaveis, separators=(',', ':'))
+    return base64.urlsafe_b64encode(texto.encode()).decode().rstrip('=')
+
+
+def decodificar_cursor(token, colunas):
+    """
+    Decodifica um token gerado por codificar_cursor, convertendo cada valor
+    para o tipo Python da coluna correspondente.
+
+    Raises:
+        CursorInvalido: Se o token não puder ser interpretado
+    """
+    try:
+        texto = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)).decode()
+        valores = json.loads(texto)
+    except (ValueError, UnicodeDecodeError):
+        raise CursorInvalido('Cursor inválido')
+
+    if not isinstance(valores, list) or len(valores) != len(colunas):
+        raise CursorInvalido('Cursor inválido')
+
+    convertidos = []
+    for coluna, valor in zip(colunas, valores):
+        if valor is None:
+            raise CursorInvalido('Cursor inválido')
+
+        tipo = coluna.type.python_type
+        try:
+            if tipo is datetime:
+                valor = datetime.fromisoformat(valor)
+            elif tipo is date:
+                valor = date.fromisoformat(valor)
+            elif not isinstance(valor, tipo):
+                valor = tipo(valor)
+        except (TypeError, ValueError):
+            raise CursorInvalido('Cursor inválido')
+        convertidos.append(valor)
+
+    return convertidos
+
+
+def paginar_por_cursor(query, colunas, cursor, limite, descendente=False, incluir_total=False):
+    """
+    Paginação por chave (keyset): em vez de OFFSET, busca os registros
+    posteriores à última chave entregue com WHERE (colunas) > (valores),
+    que o banco resolve com um índice sobre as mesmas colunas.
+
+    Args:
+        query: Query com os filtros aplicados, sem ordenação
+        colunas: Colunas da chave de ordenação; a última deve ser única (ex: id)
+        cursor: Token recebido (None ou '' para a primeira página)
+        limite: Quantidade de itens por página
+        descendente: Ordena do maior para o menor
+        incluir_total: Executa também o COUNT(*) dos filtros
+
+    Returns:
+        Dict com 'itens', 'proximo_cursor' (None na última página) e,
+        se solicitado, 'total'
+
+    Raises:
+        CursorInvalido: Se o cursor não puder ser interpretado
+    """
+    limite = max(limite, 1)
+    total = query.order_by(None).count() if incluir_total else None
+
+    if cursor:
+        chave = tuple_(*colunas)
+        valores = tuple_(*decodificar_cursor(cursor, colunas))
+        query = query.filter(chave < valores if descendente else chave > valores)
+
+    ordenacao = [coluna.desc() if descendente else coluna.asc() for coluna in colunas]
+    itens = query.order_by(*ordenacao).limit(limite + 1).all()
+
+    proximo_cursor = None
+    if len(itens) > limite:
+        itens = itens[:limite]
+        proximo_cursor = codificar_cursor([getattr(itens[-1], coluna.key) for coluna in colunas])
+
+    resultado = {
+        'itens': itens,
+        'proximo_cursor': proximo_cursor
+    }
+    if incluir_total:
+        resultado['total'] = total
+
+    return resultado
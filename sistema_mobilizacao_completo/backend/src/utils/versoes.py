@@ -0,0 +1,97 @@
+import hashlib
+import threading
+from functools import wraps
+
+from flask import current_app, make_response, request
+from src.models.mobilizacao import db, VersaoDados
+from src.utils.consultas import incrementar
+
+# Última versão de cada nome lida por este processo e funções chamadas
+# quando ela muda (descartam caches locais derivados daqueles dados)
+_observadas = {}
+_ao_alterar = {}
+_lock = threading.Lock()
+
+
+def incrementar_versao(nome):
+    """
+    Incrementa a versão dos dados na transação atual (chamar antes do commit).
+    """
+    incrementar(VersaoDados.__table__, {'nome': nome}, 'versao', 1)
+
+
+def ao_alterar(nome, funcao):
+    """
+    Registra funcao(versao), chamada quando obter_versoes encontra uma versão
+    de nome diferente da última lida pelo processo (ex: alteração feita por
+    outro worker).
+    """
+    _ao_alterar.setdefault(nome, []).append(funcao)
+
+
+def obter_versoes(nomes):
+    """
+    Lê as versões com uma única consulta. Nomes sem linha têm versão 0.
+
+    Returns:
+        Tupla com as versões, na ordem de nomes
+    """
+    if not nomes:
+        return ()
+
+    linhas = dict(db.session.query(VersaoDados.nome, VersaoDados.versao).filter(VersaoDados.nome.in_(nomes)))
+    versoes = tuple(linhas.get(nome, 0) for nome in nomes)
+
+    alteradas = []
+    with _lock:
+        for nome, versao in zip(nomes, versoes):
+            if _observadas.get(nome) != versao:
+                _observadas[nome] = versao
+                alteradas.append((nome, versao))
+
+    for nome, versao in alteradas:
+        for funcao in _ao_alterar.get(nome, ()):
+            funcao(versao)
+
+    return versoes
+
+
+def resposta_condicional(*nomes, por_usuario=False):
+    """
+    GET condicional (ETag fraco / 304) para rotas de leitura. Usar abaixo de
+    token_required.
+
+    O ETag é calculado a partir das versões em versoes_dados (nomes), do
+    caminho com a query string e, com por_usuario, do usuário autenticado,
+    sem executar a rota. Se o cliente enviar If-None-Match com o mesmo ETag,
+    responde 304 sem corpo. As versões são lidas antes da rota: uma alteração
+    concorrente resulta, no pior caso, em um corpo mais novo que o ETag, que
+    será revalidado na próxima requisição.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated(current_user, *args, **kwargs):
+            try:
+                partes = [request.full_path, obter_versoes(nomes)]
+            except Exception as e:
+                current_app.logger.error(f"Erro ao ler versões para o ETag: {str(e)}")
+                return f(current_user, *args, **kwargs)
+
+            if por_usuario:
+                partes.append((current_user.id, current_user.email))
+            etag = hashlib.sha256(repr(partes).encode()).hexdigest()[:32]
+
+            if request.if_none_match.contains_weak(etag):
+                response = current_app.response_class(status=304)
+            else:
+                response = make_response(f(current_user, *args, **kwargs))
+                if response.status_code != 200:
+                    return response
+
+            response.set_etag(etag, weak=True)
+            # O cliente pode guardar a resposta, mas deve revalidá-la a cada uso
+            response.headers['Cache-Control'] = 'private, no-cache'
+            return response
+
+        return decorated
+    return decorator
@@ -35,7 +35,7 @@ import {
 } from 'lucide-react'
 import { cardsAPI, etapasAPI } from '../lib/api'
 
-export default function CardDetailsDialog({ card, open, onOpenChange, onUpdate }) {
+export default function CardDetailsDialog({ card, etapasReferenciadas = {}, open, onOpenChange, onUpdate }) {
   const [activeTab, setActiveTab] = useState('details')
   const [etapas, setEtapas] = useState([])
   const [checklist, setChecklist] = useState([])
@@ -314,7 +314,9 @@ export default function CardDetailsDialog({ card, open, onOpenChange, onUpdate }
               <Label>Etapa Atual</Label>
               <div className="p-2 bg-blue-50 rounded border border-blue-200">
                 <div className="font-medium">{card.etapa_atual?.nome}</div>
-                <div className="text-sm text-gray-600">{card.etapa_atual?.descricao}</div>
+                <div className="text-sm text-gray-600">
+                  {card.etapa_atual?.descricao ?? etapasReferenciadas[card.etapa_atual?.id]?.descricao}
+                </div>
                 {card.prazo_etapa && (
                   <div className="text-sm text-gray-500 mt-1">
                     Prazo: {formatDate(card.prazo_etapa)}
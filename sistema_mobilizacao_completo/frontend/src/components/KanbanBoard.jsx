@@ -21,6 +21,8 @@ import CreateCardDialog from './CreateCardDialog'
 export default function KanbanBoard() {
   const [etapas, setEtapas] = useState([])
   const [cards, setCards] = useState([])
+  // Etapas referenciadas pelos cards da listagem, por id (etapa_atual traz só id e nome)
+  const [etapasReferenciadas, setEtapasReferenciadas] = useState({})
   const [loading, setLoading] = useState(true)
   const [error, setError] = useState('')
   const [showCreateDialog, setShowCreateDialog] = useState(false)
@@ -43,6 +45,7 @@ export default function KanbanBoard() {
 
       if (cardsResponse.data.success) {
         setCards(cardsResponse.data.data.cards)
+        setEtapasReferenciadas(cardsResponse.data.data.etapas || {})
       }
     } catch (error) {
       console.error('Erro ao carregar dados:', error)
@@ -179,6 +182,7 @@ export default function KanbanBoard() {
                     <KanbanCard
                       key={card.id}
                       card={card}
+                      etapasReferenciadas={etapasReferenciadas}
                       onUpdate={handleCardUpdated}
                     />
                   ))}
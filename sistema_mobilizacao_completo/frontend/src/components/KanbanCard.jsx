@@ -24,7 +24,7 @@ import {
 } from 'lucide-react'
 import CardDetailsDialog from './CardDetailsDialog'
 
-export default function KanbanCard({ card, onUpdate }) {
+export default function KanbanCard({ card, etapasReferenciadas, onUpdate }) {
   const [showDetails, setShowDetails] = useState(false)
 
   const getStatusColor = (statusPrazo) => {
@@ -202,6 +202,7 @@ export default function KanbanCard({ card, onUpdate }) {
       {/* Dialog de Detalhes */}
       <CardDetailsDialog
         card={card}
+        etapasReferenciadas={etapasReferenciadas}
         open={showDetails}
         onOpenChange={setShowDetails}
         onUpdate={onUpdate}